@@ -0,0 +1,71 @@
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from .models import User
+
+class ClaimsUser(TokenUser):
+    """
+    User built from access-token claims without touching the database.
+
+    Claimed fields are read from the token. Anything else (``email``,
+    ``profile_picture``...) or a claim missing from an older token loads
+    the real ``User`` row on first access and is served from it afterwards.
+    """
+
+    @cached_property
+    def instance(self):
+        try:
+            return User.objects.get(pk=self.id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found", code='user_not_found')
+
+    def _claim(self, name):
+        if name in self.token:
+            return self.token[name]
+        return getattr(self.instance, name)
+
+    @cached_property
+    def username(self):
+        return self._claim('username')
+
+    @cached_property
+    def is_admin(self):
+        return self._claim('is_admin')
+
+    @cached_property
+    def is_learner(self):
+        return self._claim('is_learner')
+
+    @cached_property
+    def is_staff(self):
+        return self._claim('is_staff')
+
+    @cached_property
+    def is_superuser(self):
+        return self._claim('is_superuser')
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.instance, attr)
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Opt-in replacement for ``JWTAuthentication`` that skips the per-request
+    user query. Views that need the full model row should keep the default
+    authentication class or go through ``get_user_instance()``.
+
+    As with any stateless scheme, a deactivated or demoted user keeps their
+    access until their access token expires; refreshing re-reads the user.
+    """
+
+    def get_user(self, validated_token):
+        super().get_user(validated_token)  # validates the user id claim
+        return ClaimsUser(validated_token)
+
+def get_user_instance(user):
+    """Return the ``User`` row behind ``request.user``, loading it if needed."""
+    if isinstance(user, ClaimsUser):
+        return user.instance
+    return user
@@ -0,0 +1,40 @@
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+from django.db.models.functions import Lower
+from .models import User
+
+class EmailOrUsernameBackend(ModelBackend):
+    """
+    Authenticate with either an email address or a username.
+
+    Both are matched case-insensitively in a single query against the
+    ``LOWER()`` functional indexes on ``User``, and the password is checked
+    once. An email match wins if one account's email equals another's
+    username.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        identifier = username.lower()
+        candidates = list(
+            User.objects.annotate(
+                email_lower=Lower('email'),
+                username_lower=Lower('username')
+            ).filter(
+                Q(email_lower=identifier) | Q(username_lower=identifier)
+            )[:2]
+        )
+        if not candidates:
+            # Run the password hasher anyway so response times don't reveal
+            # which identifiers exist
+            User().set_password(password)
+            return None
+
+        user = next((u for u in candidates if u.email_lower == identifier), candidates[0])
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted JWTs in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TOKEN_PRUNE_BATCH_SIZE,
+            help="Tokens deleted per transaction"
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            # Short transactions keep logins and refreshes from queueing
+            # behind one huge DELETE
+            with transaction.atomic():
+                ids = list(
+                    OutstandingToken.objects.filter(expires_at__lte=now)
+                    .order_by()
+                    .values_list('id', flat=True)[:options['batch_size']]
+                )
+                if not ids:
+                    break
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                OutstandingToken.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} expired token(s)"))
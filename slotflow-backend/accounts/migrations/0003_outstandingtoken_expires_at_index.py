@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Index simplejwt's outstanding tokens by expiry so prune_tokens can find
+    expired rows without scanning the table. The model belongs to a
+    third-party app, hence raw SQL.
+    """
+
+    dependencies = [
+        ('accounts', '0002_user_lower_indexes'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS token_outstanding_expires_idx '
+                'ON token_blacklist_outstandingtoken (expires_at);',
+            reverse_sql='DROP INDEX IF EXISTS token_outstanding_expires_idx;',
+        ),
+    ]
@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
+from uploads.images import register_picture
 
 class User(AbstractUser):
     username = models.CharField(max_length=150, unique=True)
@@ -7,6 +11,30 @@ class User(AbstractUser):
     is_admin = models.BooleanField(default=False)
     is_learner = models.BooleanField(default=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', null=True, blank=True)
+    # Resized copies of profile_picture, filled in by uploads.images
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive login lookups (see accounts.backends)
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+        ]
 
     def __str__(self):
         return self.email
+
+    def record_login(self):
+        """
+        Update ``last_login``, at most once per ``LAST_LOGIN_UPDATE_INTERVAL``.
+
+        Repeated logins inside the interval cost no write at all.
+        """
+        now = timezone.now()
+        if self.last_login and now - self.last_login < settings.LAST_LOGIN_UPDATE_INTERVAL:
+            return False
+        self.last_login = now
+        User.objects.filter(pk=self.pk).update(last_login=now)
+        return True
+
+register_picture(User, 'profile_picture')
@@ -0,0 +1,11 @@
+from rest_framework import permissions
+
+
+class IsCourseAdmin(permissions.BasePermission):
+    """
+    Platform admins (``User.is_admin``), as opposed to Django staff. Works
+    with claims-only users, since ``is_admin`` is one of the token claims.
+    """
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.is_admin)
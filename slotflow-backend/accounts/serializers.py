@@ -1,15 +1,24 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import User
+from .tokens import RevocableRefreshToken
+from uploads.serializers import ImageVariantsField
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 
 class UserSerializer(serializers.ModelSerializer):
+    profile_picture_variants = ImageVariantsField()
+
     class Meta:
         model = User
-        fields = ('id', 'username', 'email', 'is_admin', 'is_learner', 'profile_picture')
+        fields = (
+            'id', 'username', 'email', 'is_admin', 'is_learner',
+            'profile_picture', 'profile_picture_variants'
+        )
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
@@ -89,26 +98,54 @@ class RegisterSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
+def set_user_claims(token, user):
+    # Enough for ClaimsJWTAuthentication to authorise without a query
+    token['username'] = user.username
+    token['is_admin'] = user.is_admin
+    token['is_learner'] = user.is_learner
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RevocableRefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        token['is_admin'] = user.is_admin
-        token['is_learner'] = user.is_learner
+        set_user_claims(token, user)
         return token
 
     def validate(self, attrs):
-        credentials = {
-            'username': '',
-            'password': attrs.get("password")
-        }
-        
-        user_obj = User.objects.filter(email=attrs.get("username")).first() or User.objects.filter(username=attrs.get("username")).first()
-        
-        if not user_obj:
-            raise serializers.ValidationError({
-                "detail": "No active account found with the given credentials"
-            })
-            
-        credentials['username'] = user_obj.username
-        return super().validate(credentials)
+        # The email-or-username lookup happens once, in EmailOrUsernameBackend
+        data = super().validate(attrs)
+        self.user.record_login()
+        return data
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refreshes with the user's current role claims, so promotions and
+    demotions take effect at the next refresh, and refuses inactive users.
+    """
+    # Checks the in-process revocation cache before the blacklist table
+    token_class = RevocableRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.payload.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        # The access token copies its claims from the refresh token
+        set_user_claims(refresh, user)
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+
+        return data
@@ -1,3 +1,238 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.testing import authenticate, make_course
+from .models import User
+from .serializers import CustomTokenObtainPairSerializer
+from .tokens import RevocableRefreshToken, revoked_tokens
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def make_user(username='learner1', email='learner1@slotflow.com', password='Learner@1234', **kwargs):
+    user = User(username=username, email=email, **kwargs)
+    user.set_password(password)
+    user.save()
+    return user
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LoginTests(TestCase):
+    def setUp(self):
+        self.user = make_user(username='Learner1', email='Learner1@SlotFlow.com')
+        self.client = APIClient()
+
+    def login(self, username, password='Learner@1234'):
+        return self.client.post('/api/auth/token/', {'username': username, 'password': password})
+
+    def test_login_with_email_or_username_case_insensitively(self):
+        for identifier in ['learner1', 'LEARNER1', 'learner1@slotflow.com', 'Learner1@SlotFlow.com']:
+            response = self.login(identifier)
+            self.assertEqual(response.status_code, 200, identifier)
+            self.assertIn('access', response.data)
+
+    def test_wrong_password_and_unknown_user_are_rejected_alike(self):
+        wrong_password = self.login('learner1', 'Nope@1234')
+        unknown_user = self.login('nobody')
+
+        self.assertEqual(wrong_password.status_code, 401)
+        self.assertEqual(unknown_user.status_code, 401)
+        self.assertEqual(wrong_password.data, unknown_user.data)
+
+    def test_email_match_wins_over_username_match(self):
+        other = make_user(username='learner1@slotflow.com', email='other@slotflow.com', password='Other@1234')
+
+        response = self.login('learner1@slotflow.com')
+        self.assertEqual(AccessToken(response.data['access'])['user_id'], self.user.pk)
+        self.assertEqual(self.login('learner1@slotflow.com', 'Other@1234').status_code, 401)
+        response = self.login('other@slotflow.com', 'Other@1234')
+        self.assertEqual(AccessToken(response.data['access'])['user_id'], other.pk)
+
+    def test_inactive_user_cannot_log_in(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.login('learner1').status_code, 401)
+
+    def test_login_reads_user_once(self):
+        self.user.record_login()
+        # One user lookup plus the outstanding refresh token insert
+        with self.assertNumQueries(2):
+            self.login('learner1')
+
+    def test_last_login_updates_are_coalesced(self):
+        self.login('learner1')
+        first = User.objects.get(pk=self.user.pk).last_login
+        self.assertIsNotNone(first)
+
+        self.login('learner1')
+        self.assertEqual(User.objects.get(pk=self.user.pk).last_login, first)
+
+        User.objects.filter(pk=self.user.pk).update(last_login=timezone.now() - timedelta(hours=1))
+        self.login('learner1')
+        self.assertGreater(User.objects.get(pk=self.user.pk).last_login, first)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client = APIClient()
+        revoked_tokens.clear()
+
+    def obtain(self):
+        response = self.client.post(
+            '/api/auth/token/', {'username': 'learner1', 'password': 'Learner@1234'}
+        )
+        return response.data
+
+    def logout(self, tokens):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        return self.client.post('/api/auth/logout/', {'refresh_token': tokens['refresh']})
+
+    def test_logout_blacklists_refresh_token(self):
+        tokens = self.obtain()
+
+        self.assertEqual(self.logout(tokens).status_code, 205)
+
+        jti = RevocableRefreshToken(tokens['refresh'], verify=False)['jti']
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=jti).exists())
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_recently_revoked_token_is_rejected_without_db(self):
+        tokens = self.obtain()
+        self.logout(tokens)
+
+        with self.assertNumQueries(0):
+            with self.assertRaisesMessage(TokenError, 'blacklisted'):
+                RevocableRefreshToken(tokens['refresh'])
+
+    def test_revocation_from_another_process_still_applies(self):
+        tokens = self.obtain()
+        self.logout(tokens)
+        revoked_tokens.clear()
+
+        with self.assertRaises(TokenError):
+            RevocableRefreshToken(tokens['refresh'])
+
+    def test_revocation_from_another_process_applies_to_checked_token(self):
+        tokens = self.obtain()
+        token = RevocableRefreshToken(tokens['refresh'])
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+
+        with self.assertRaisesMessage(TokenError, 'blacklisted'):
+            RevocableRefreshToken(tokens['refresh'])
+
+    def test_rotation_revokes_previous_refresh_token(self):
+        tokens = self.obtain()
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_prune_removes_only_expired_tokens_in_batches(self):
+        live = self.obtain()
+        for _ in range(5):
+            self.logout(self.obtain())
+        OutstandingToken.objects.exclude(
+            jti=RevocableRefreshToken(live['refresh'], verify=False)['jti']
+        ).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        out = StringIO()
+        call_command('prune_tokens', batch_size=2, stdout=out)
+
+        self.assertIn('Pruned 5', out.getvalue())
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        self.learner = make_user()
+        self.admin = make_user(
+            username='admin1', email='admin1@slotflow.com', is_admin=True, is_learner=False, is_staff=True
+        )
+        self.course = make_course(self.admin, title='Tiling', slots_total=4)
+        self.client = APIClient()
+
+    def test_booking_list_skips_user_query(self):
+        authenticate(self.client, self.learner)
+        # Conditional-GET validator plus the list itself; no user lookup
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/bookings/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_booking_and_cancelling_with_claims_user(self):
+        authenticate(self.client, self.learner)
+
+        response = self.client.post('/api/bookings/', {'course': self.course.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['learner'], self.learner.pk)
+
+        response = self.client.patch(
+            f"/api/bookings/{response.data['id']}/cancel/", {'confirm': True}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_cannot_cancel_someone_elses_booking(self):
+        authenticate(self.client, self.learner)
+        booking_id = self.client.post('/api/bookings/', {'course': self.course.pk}).data['id']
+
+        authenticate(self.client, self.admin)
+        response = self.client.patch(f'/api/bookings/{booking_id}/cancel/', {'confirm': True})
+        self.assertEqual(response.status_code, 403)
+
+    def test_staff_claim_authorises_admin_only_list(self):
+        authenticate(self.client, self.admin)
+        self.assertEqual(self.client.get('/api/courses/inactive/').status_code, 200)
+
+        authenticate(self.client, self.learner)
+        self.assertEqual(self.client.get('/api/courses/inactive/').status_code, 403)
+
+    def refresh(self, refresh):
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': str(refresh)})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data.get('access')}")
+        return response
+
+    def test_refresh_picks_up_demotion(self):
+        refresh = CustomTokenObtainPairSerializer.get_token(self.admin)
+        self.admin.is_admin = self.admin.is_staff = False
+        self.admin.save()
+
+        response = self.refresh(refresh)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(RevocableRefreshToken(response.data['refresh'])['is_admin'])
+        bulk = self.client.post(
+            '/api/bookings/bulk/', {'course': self.course.pk, 'learners': [self.learner.pk]}, format='json'
+        )
+        self.assertEqual(bulk.status_code, 403)
+        self.assertEqual(self.client.get('/api/courses/inactive/').status_code, 403)
+
+    def test_refresh_refuses_inactive_user(self):
+        refresh = CustomTokenObtainPairSerializer.get_token(self.learner)
+        self.learner.is_active = False
+        self.learner.save()
+
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_token_without_claims_falls_back_to_database(self):
+        token = AccessToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        self.assertEqual(self.client.get('/api/courses/inactive/').status_code, 200)
+
+    def test_views_needing_full_user_still_work(self):
+        authenticate(self.client, self.learner)
+
+        response = self.client.get('/api/auth/me/')
+        self.assertEqual(response.data['email'], 'learner1@slotflow.com')
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+class RevokedTokenCache:
+    """
+    Bounded, TTL-limited set of recently revoked token ids (jti).
+
+    Lets this process reject a revoked refresh token without a database
+    round trip. It is only a shortcut: a miss always falls through to the
+    blacklist table, so revocations made by other processes still apply.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, jti, exp=None):
+        # No point remembering a token past its own expiry
+        expires = time.time() + self.ttl
+        if exp is not None:
+            expires = min(expires, exp)
+        with self._lock:
+            self._entries[jti] = expires
+            self._entries.move_to_end(jti)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, jti):
+        with self._lock:
+            expires = self._entries.get(jti)
+            if expires is None:
+                return False
+            if expires < time.time():
+                del self._entries[jti]
+                return False
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+revoked_tokens = RevokedTokenCache(
+    maxsize=settings.REVOKED_TOKEN_CACHE_SIZE,
+    ttl=settings.REVOKED_TOKEN_CACHE_TTL.total_seconds()
+)
+
+class RevocableRefreshToken(RefreshToken):
+    """Refresh token whose revocation is keyed by jti and cached in-process."""
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in revoked_tokens:
+            raise TokenError("Token is blacklisted")
+        super().check_blacklist()
+
+    def revoke(self):
+        """
+        Blacklist this token by its jti. Returns ``False`` if the token was
+        never issued (no outstanding record).
+        """
+        jti = self.payload[api_settings.JTI_CLAIM]
+        outstanding_id = OutstandingToken.objects.filter(
+            jti=jti
+        ).values_list('id', flat=True).first()
+        if outstanding_id is None:
+            return False
+
+        BlacklistedToken.objects.get_or_create(token_id=outstanding_id)
+        revoked_tokens.add(jti, self.payload.get('exp'))
+        return True
+
+    def blacklist(self):
+        # Used by refresh-token rotation
+        if not self.revoke():
+            super().blacklist()
+            revoked_tokens.add(self.payload[api_settings.JTI_CLAIM], self.payload.get('exp'))
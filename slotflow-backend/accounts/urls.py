@@ -1,9 +1,9 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     RegisterView,
     UserDetailView,
     CustomTokenObtainPairView,
+    CustomTokenRefreshView,
     LogoutView,
     ChangePasswordView,
     ProfilePictureView
@@ -12,7 +12,7 @@ from .views import (
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('me/', UserDetailView.as_view(), name='user_detail'),
     path('me/profile-picture/', ProfilePictureView.as_view(), name='profile_picture'),
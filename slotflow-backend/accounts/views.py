@@ -1,13 +1,20 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
-from .serializers import RegisterSerializer, UserSerializer, CustomTokenObtainPairSerializer
+from .serializers import (
+    RegisterSerializer,
+    UserSerializer,
+    CustomTokenObtainPairSerializer,
+    CustomTokenRefreshSerializer
+)
 from .models import User
+from .tokens import RevocableRefreshToken
 from rest_framework.parsers import MultiPartParser, FormParser
+from django.core.exceptions import ValidationError as DjangoValidationError
+from uploads.images import replace_picture
+from uploads.serializers import save_with_picture
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -50,8 +57,8 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
                 {"errors": serializer.errors},
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
-        serializer.save()
+
+        save_with_picture(serializer, 'profile_picture')
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 class ProfilePictureView(APIView):
@@ -65,10 +72,15 @@ class ProfilePictureView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        user = request.user
-        user.profile_picture = request.FILES['profile_picture']
-        user.save()
-        
+        # Normalised here; variants are generated after commit
+        try:
+            replace_picture(request.user, 'profile_picture', request.FILES['profile_picture'])
+        except DjangoValidationError as e:
+            return Response(
+                {"detail": e.messages[0]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         return Response(
             {"detail": "Profile picture updated successfully"},
             status=status.HTTP_200_OK
@@ -81,11 +93,9 @@ class ProfilePictureView(APIView):
                 {"detail": "No profile picture to delete"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
-        user.profile_picture.delete()
-        user.profile_picture = None
-        user.save()
-        
+
+        replace_picture(user, 'profile_picture', None)
+
         return Response(
             {"detail": "Profile picture deleted successfully"},
             status=status.HTTP_200_OK
@@ -94,6 +104,9 @@ class ProfilePictureView(APIView):
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
 class LogoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -106,27 +119,17 @@ class LogoutView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Verify and blacklist the refresh token
-            token = RefreshToken(refresh_token)
-            
-            # Check if token exists in outstanding tokens
-            outstanding_token = OutstandingToken.objects.filter(token=str(token)).first()
-            if not outstanding_token:
+            # Verify and blacklist the refresh token, looked up by its jti
+            token = RevocableRefreshToken(refresh_token)
+            if not token.revoke():
                 return Response(
                     {"detail": "Token not found"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            # Blacklist both tokens
-            token.blacklist()
-            
-            # Also blacklist the current access token if it exists
-            if hasattr(request, 'auth'):
-                access_token = str(request.auth)
-                outstanding_access_token = OutstandingToken.objects.filter(token=access_token).first()
-                if outstanding_access_token:
-                    BlacklistedToken.objects.create(token=outstanding_access_token)
-            
+
+            # Access tokens are never recorded as outstanding, so there is
+            # nothing to blacklist for them; they expire on their own
+
             return Response(
                 {"detail": "Successfully logged out"},
                 status=status.HTTP_205_RESET_CONTENT
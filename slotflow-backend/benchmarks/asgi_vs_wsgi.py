@@ -0,0 +1,192 @@
+"""
+The hot read endpoints served by a thread pool through Django's WSGI handler
+against the same endpoints served through its ASGI handler, at increasing
+numbers of concurrent requests.
+
+    python -m benchmarks.asgi_vs_wsgi
+
+Requests are handed to the handlers in-process, so the numbers leave out the
+HTTP server and measure only how each handler copes with concurrency. Each of
+``concurrency`` clients keeps one request outstanding. The WSGI side gets
+``WSGI_THREADS`` workers, as a threaded gunicorn worker would, and requests
+beyond that wait for a free thread; latency includes that wait. Run a real
+load generator against ``uvicorn core.asgi:application`` for numbers that
+include the server and the network.
+
+Each handler serves the views as it would in production: sync under WSGI
+and, with ``ASYNC_VIEWS`` on as ``core/asgi.py`` sets it, async under ASGI.
+A third run serves the async views through WSGI to show what that costs.
+
+Django runs each ASGI request's sync work, async ORM queries included, in a
+thread of its own, so the peak thread count follows the concurrency there.
+"""
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import benchmark_database, create_admin, print_table, seed_courses
+
+COURSES = 200
+REQUESTS = 2000
+CONCURRENCY = (10, 100, 500)
+WSGI_THREADS = 32
+
+
+class PeakThreads:
+    """Samples the number of live threads while a run is in progress."""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._sampler.join()
+
+
+def summarise(latencies, elapsed, threads):
+    latencies.sort()
+    return (
+        f'{len(latencies) / elapsed:.0f}',
+        f'{statistics.median(latencies):.1f}',
+        f'{latencies[int(len(latencies) * 0.99) - 1]:.1f}',
+        threads,
+    )
+
+
+def run_wsgi(path, headers, concurrency):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import RequestFactory
+
+    handler = WSGIHandler()
+    factory = RequestFactory()
+
+    def start_response(status, response_headers, exc_info=None):
+        assert status.startswith('200'), status
+
+    def one_request(issued):
+        environ = factory.get(path, headers=headers).environ
+        body = handler(environ, start_response)
+        b''.join(body)
+        body.close()
+        return (time.perf_counter() - issued) * 1000
+
+    # ``concurrency`` clients each keep one request outstanding; requests
+    # the pool can't take yet wait in its queue, like a server backlog
+    outstanding = threading.Semaphore(concurrency)
+    futures = []
+    with PeakThreads() as threads, ThreadPoolExecutor(WSGI_THREADS) as pool:
+        started = time.perf_counter()
+        for _ in range(REQUESTS):
+            outstanding.acquire()
+            future = pool.submit(one_request, time.perf_counter())
+            future.add_done_callback(lambda _: outstanding.release())
+            futures.append(future)
+        latencies = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+    return summarise(latencies, elapsed, threads.peak)
+
+
+def run_asgi(path, headers, concurrency):
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'testserver')] + [
+            (name.lower().encode(), value.encode()) for name, value in headers.items()
+        ],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+
+    async def one_request(outstanding):
+        async with outstanding:
+            issued = time.perf_counter()
+            sent = []
+
+            async def receive():
+                if not sent:
+                    sent.append(True)
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # Block like an idle client until the handler is done
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    assert message['status'] == 200, message['status']
+
+            await handler(dict(scope), receive, send)
+            return (time.perf_counter() - issued) * 1000
+
+    async def main():
+        outstanding = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(one_request(outstanding) for _ in range(REQUESTS)))
+        return list(latencies), time.perf_counter() - started
+
+    with PeakThreads() as threads:
+        latencies, elapsed = asyncio.run(main())
+    return summarise(latencies, elapsed, threads.peak)
+
+
+def main():
+    from accounts.models import User
+    from accounts.serializers import CustomTokenObtainPairSerializer
+    from bookings.models import Booking
+    from courses.models import Course
+
+    seed_courses(create_admin(), COURSES)
+    learner = User.objects.create(username='bench-learner', email='bench-learner@slotflow.com')
+    for course in Course.objects.all()[:10]:
+        Booking.objects.reserve(course, learner)
+    token = CustomTokenObtainPairSerializer.get_token(learner).access_token
+
+    endpoints = [
+        ('course list', '/api/courses/', {}),
+        ('booking list', '/api/bookings/', {'Authorization': f'Bearer {token}'}),
+    ]
+    from django.test import override_settings
+
+    handlers = [
+        ('wsgi', run_wsgi, False),
+        ('asgi', run_asgi, True),
+        ('wsgi', run_wsgi, True),
+    ]
+    rows = []
+    for name, path, headers in endpoints:
+        for concurrency in CONCURRENCY:
+            for server, run, async_views in handlers:
+                with override_settings(ASYNC_VIEWS=async_views):
+                    rows.append((
+                        name, server, 'async' if async_views else 'sync', concurrency,
+                        *run(path, headers, concurrency)
+                    ))
+
+    print_table(
+        ['endpoint', 'handler', 'views', 'concurrency', 'req/s', 'p50 ms', 'p99 ms', 'peak threads'], rows
+    )
+
+
+if __name__ == '__main__':
+    with benchmark_database():
+        main()
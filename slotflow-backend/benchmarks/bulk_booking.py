@@ -0,0 +1,87 @@
+"""
+Enrolling a whole class on a course: one POST /api/bookings/ per learner
+versus a single POST /api/bookings/bulk/ from a coordinator.
+
+    python -m benchmarks.bulk_booking
+"""
+import time
+
+from benchmarks.utils import benchmark_database, create_admin, print_table, seed_courses
+
+CLASS_SIZES = [50, 200, 500]
+
+
+def make_learners(prefix, count):
+    from accounts.models import User
+    return User.objects.bulk_create([
+        User(username=f'{prefix}-{i}', email=f'{prefix}-{i}@slotflow.com')
+        for i in range(count)
+    ])
+
+
+def enrol_one_by_one(client, course, learners):
+    for learner in learners:
+        client.force_authenticate(learner)
+        client.post('/api/bookings/', {'course': course.pk})
+
+
+def enrol_in_bulk(client, course, learners, admin):
+    client.force_authenticate(admin)
+    client.post(
+        '/api/bookings/bulk/',
+        {'course': course.pk, 'learners': [learner.pk for learner in learners]},
+        format='json'
+    )
+
+
+def timed(fn, *args):
+    """Return the wall time in ms and the number of queries of ``fn(*args)``."""
+    from django.db import connection
+
+    queries = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        started = time.perf_counter()
+        fn(*args)
+        elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, queries
+
+
+def main():
+    from rest_framework.test import APIClient
+    from bookings.models import Booking
+    from courses.models import Course
+
+    admin = create_admin()
+    seed_courses(admin, 2 * len(CLASS_SIZES))
+    Course.objects.update(slots_total=max(CLASS_SIZES))
+    courses = list(Course.objects.order_by('id'))
+    client = APIClient()
+
+    rows = []
+    for i, size in enumerate(CLASS_SIZES):
+        single_ms, single_queries = timed(
+            enrol_one_by_one, client, courses[2 * i], make_learners(f'single{size}', size)
+        )
+        bulk_ms, bulk_queries = timed(
+            enrol_in_bulk, client, courses[2 * i + 1], make_learners(f'bulk{size}', size), admin
+        )
+        assert Booking.objects.filter(course=courses[2 * i + 1]).count() == size
+        rows.append((
+            size, f'{single_ms:.0f}', single_queries, f'{bulk_ms:.0f}', bulk_queries,
+            f'{single_ms / bulk_ms:.0f}x',
+        ))
+
+    print_table(
+        ['learners', 'one by one ms', 'queries', 'bulk ms', 'queries', 'speedup'], rows
+    )
+
+
+if __name__ == '__main__':
+    with benchmark_database():
+        main()
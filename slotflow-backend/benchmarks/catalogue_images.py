@@ -0,0 +1,91 @@
+"""
+Bytes a client downloads for one catalogue page (JSON plus one picture per
+course card) when cards use the uploaded originals versus the pre-generated
+``card`` variants.
+
+    python -m benchmarks.catalogue_images
+"""
+import random
+import shutil
+import tempfile
+from io import BytesIO
+
+from benchmarks.utils import benchmark_database, create_admin, print_table, seed_courses
+
+PAGE = 20
+PHOTO_SIZE = (3000, 2000)
+
+
+def camera_photo(seed):
+    """A camera-sized JPEG with shapes, edges and sensor noise, like a photo."""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = random.Random(seed)
+    image = Image.new('RGB', PHOTO_SIZE, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    width, height = PHOTO_SIZE
+    for _ in range(300):
+        x, y = rng.randrange(width), rng.randrange(height)
+        w, h = rng.randrange(20, width // 4), rng.randrange(20, height // 4)
+        colour = tuple(rng.randrange(256) for _ in range(3))
+        shape = draw.ellipse if rng.random() < 0.5 else draw.rectangle
+        shape([x, y, x + w, y + h], fill=colour)
+    image = image.filter(ImageFilter.GaussianBlur(2))
+    noise = Image.effect_noise(PHOTO_SIZE, 30).convert('RGB')
+    image = Image.blend(image, noise, 0.08)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=92)
+    return buffer.getvalue()
+
+
+def page_bytes(client, pick):
+    from django.core.files.storage import default_storage
+    from courses.models import Course
+
+    response = client.get('/api/courses/', {'page_size': PAGE})
+    total = len(response.content)
+    for course in Course.objects.filter(pk__in=[c['id'] for c in response.data['results']]):
+        total += default_storage.size(pick(course))
+    return total
+
+
+def main():
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from rest_framework.test import APIClient
+    from courses.models import Course
+    from uploads.images import build_variants, replace_picture
+
+    seed_courses(create_admin(), PAGE)
+    photos = [camera_photo(i) for i in range(PAGE)]
+    client = APIClient()
+
+    # Before: originals stored as uploaded
+    for course, photo in zip(Course.objects.all(), photos):
+        course.course_picture.save(f'photo{course.pk}.jpg', SimpleUploadedFile('p.jpg', photo))
+    before = page_bytes(client, lambda course: course.course_picture.name)
+
+    # After: normalised uploads with variants
+    for course, photo in zip(Course.objects.all(), photos):
+        replace_picture(course, 'course_picture', SimpleUploadedFile(f'photo{course.pk}.jpg', photo))
+        build_variants(Course, course.pk, 'course_picture')
+    after_jpeg = page_bytes(client, lambda course: course.course_picture_variants['card']['jpeg'])
+    after_webp = page_bytes(client, lambda course: course.course_picture_variants['card']['webp'])
+
+    rows = [
+        ('original upload', f'{before / 1024:.0f}', '1.0x'),
+        ('card (JPEG)', f'{after_jpeg / 1024:.0f}', f'{before / after_jpeg:.1f}x'),
+        ('card (WebP)', f'{after_webp / 1024:.0f}', f'{before / after_webp:.1f}x'),
+    ]
+    print(f'{PAGE} course cards, {PHOTO_SIZE[0]}x{PHOTO_SIZE[1]} uploads')
+    print_table(['card image', 'page KiB', 'reduction'], rows)
+
+
+if __name__ == '__main__':
+    from django.test import override_settings
+
+    media_root = tempfile.mkdtemp()
+    try:
+        with benchmark_database(), override_settings(MEDIA_ROOT=media_root):
+            main()
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
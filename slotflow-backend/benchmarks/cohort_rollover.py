@@ -0,0 +1,68 @@
+"""
+Rolling 100,000 expired courses over to their next cohort, each with its
+running cohort and one live booking, in ``ROLLOVER_BATCH_SIZE`` batches.
+
+    python -m benchmarks.cohort_rollover
+"""
+import time
+
+from benchmarks.utils import benchmark_database, create_admin, print_table
+
+COURSES = 100000
+BATCH_SIZES = [1000, 5000]
+
+
+def seed(admin, learner):
+    from datetime import timedelta
+    from django.db.models import OuterRef, Subquery
+    from django.utils import timezone
+    from bookings.models import Booking
+    from courses.models import Cohort, Course
+
+    Course.objects.all().delete()
+    today = timezone.now().date()
+    Course.objects.bulk_create([
+        Course(
+            title=f'Course {i}', description='Expired', instructor=admin,
+            start_date=today - timedelta(days=30), end_date=today - timedelta(days=1 + i % 20),
+            duration_hours=10, slots_total=20, slots_booked=1
+        )
+        for i in range(COURSES)
+    ], batch_size=5000)
+    cohorts = Cohort.objects.bulk_create([
+        Cohort(course_id=course_id, number=1, slots_total=20)
+        for course_id in Course.objects.values_list('id', flat=True)
+    ], batch_size=5000)
+    Course.objects.update(current_cohort=Subquery(
+        Cohort.objects.filter(course=OuterRef('pk')).values('pk')[:1]
+    ))
+    Booking.objects.bulk_create([
+        Booking(course_id=cohort.course_id, cohort=cohort, learner=learner)
+        for cohort in cohorts
+    ], batch_size=5000)
+
+
+def main():
+    from accounts.models import User
+    from bookings.models import Booking
+    from courses.rollover import rollover_expired_courses
+
+    admin = create_admin()
+    learner = User.objects.create(username='bench-learner', email='bench-learner@slotflow.com')
+    rows = []
+    for batch_size in BATCH_SIZES:
+        seed(admin, learner)
+        started = time.perf_counter()
+        rolled = rollover_expired_courses(batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        assert rolled == COURSES
+        assert not Booking.objects.filter(is_archived=False).exists()
+        rows.append((batch_size, rolled, f'{elapsed:.2f}', f'{rolled / elapsed:.0f}'))
+
+    print(f'{COURSES} expired courses, one live booking each')
+    print_table(['batch size', 'rolled over', 'seconds', 'courses/s'], rows)
+
+
+if __name__ == '__main__':
+    with benchmark_database():
+        main()
@@ -0,0 +1,53 @@
+"""
+Throughput of the course list and detail endpoints with and without the
+versioned response cache.
+
+    python -m benchmarks.course_cache
+"""
+import time
+
+from benchmarks.utils import benchmark_database, create_admin, print_table, seed_courses
+
+REQUESTS = 500
+COURSES = 2000
+
+
+def throughput(client, url):
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        client.get(url)
+    return REQUESTS / (time.perf_counter() - started)
+
+
+def main():
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+    from courses.cache import cache_stats, reset_cache_stats
+    from courses.models import Course
+
+    client = APIClient()
+    seed_courses(create_admin(), COURSES)
+    course_id = Course.objects.values_list('id', flat=True).first()
+    endpoints = [
+        ('list', '/api/courses/'),
+        ('detail', f'/api/courses/{course_id}/'),
+    ]
+
+    rows = []
+    for name, url in endpoints:
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            uncached = throughput(client, url)
+        reset_cache_stats()
+        cached = throughput(client, url)
+        stats = cache_stats()
+        rows.append((
+            name, f'{uncached:.0f}', f'{cached:.0f}',
+            f'{cached / uncached:.1f}x', f"{stats['hits']}/{stats['misses']}"
+        ))
+
+    print_table(['endpoint', 'uncached req/s', 'cached req/s', 'speedup', 'hits/misses'], rows)
+
+
+if __name__ == '__main__':
+    with benchmark_database():
+        main()
@@ -0,0 +1,92 @@
+"""
+Filtered course list pages and facet counts on a 100,000-course catalogue.
+
+Each request goes through ``/api/courses/active/`` with an empty cache,
+first with the composite indexes from migration 0009 and then
+with them dropped, to show what they are worth for the common filter combinations.
+
+    python -m benchmarks.course_filters
+"""
+import random
+
+from benchmarks.utils import benchmark_database, create_admin, measure, print_table
+
+COURSES = 100000
+INSTRUCTORS = 50
+SEED = 11
+LANGUAGES = ['English', 'Welsh', 'Polish', 'Urdu', 'Romanian', 'Punjabi']
+INDEXES = ['course_start_date_idx', 'course_instructor_created_idx']
+
+
+def seed():
+    from datetime import timedelta
+    from django.utils import timezone
+    from courses.models import Course, CourseLanguage
+
+    rng = random.Random(SEED)
+    instructors = [create_admin(f'bench-instructor-{i}') for i in range(INSTRUCTORS)]
+    today = timezone.now().date()
+    for offset in range(0, COURSES, 5000):
+        courses = []
+        for i in range(5000):
+            start = today + timedelta(days=rng.randrange(365))
+            slots_total = rng.choice([10, 20, 30])
+            courses.append(Course(
+                title=f'Course {offset + i}',
+                description='Hands-on vocational training',
+                instructor=rng.choice(instructors),
+                start_date=start,
+                end_date=start + timedelta(days=rng.randrange(1, 60)),
+                duration_hours=rng.randrange(4, 80),
+                slots_total=slots_total,
+                # About a third of the catalogue is fully booked
+                slots_booked=slots_total if rng.random() < 0.3 else rng.randrange(slots_total),
+                languages=rng.sample(LANGUAGES, rng.randrange(1, 3)),
+            ))
+        CourseLanguage.objects.index(Course.objects.bulk_create(courses), replace=False)
+    return instructors
+
+
+def main():
+    from datetime import timedelta
+    from django.core.cache import cache
+    from django.db import connection
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+
+    instructors = seed()
+    today = timezone.now().date()
+    next_30_days = {'start_from': today, 'start_to': today + timedelta(days=30)}
+    requests = [
+        ('next 30 days', next_30_days),
+        ('next 30 days, free, < 40h', {**next_30_days, 'has_free_slots': 'true', 'max_hours': 39}),
+        ('10-19 hours', {'min_hours': 10, 'max_hours': 19}),
+        ('one instructor', {'instructor': instructors[0].pk}),
+        ('facets, whole catalogue', {'facets': 'true'}),
+        ('facets, next 30 days, free', {**next_30_days, 'has_free_slots': 'true', 'facets': 'true'}),
+    ]
+
+    client = APIClient()
+
+    def fetch(params):
+        cache.clear()
+        response = client.get('/api/courses/active/', params)
+        assert response.status_code == 200, response.content
+        return response
+
+    indexed = {label: measure(lambda: fetch(params), repeat=10) for label, params in requests}
+    with connection.cursor() as cursor:
+        for name in INDEXES:
+            cursor.execute(f'DROP INDEX {name}')
+    unindexed = {label: measure(lambda: fetch(params), repeat=10) for label, params in requests}
+
+    print(f'{COURSES} courses, first page of /api/courses/active/, cold cache')
+    print_table(
+        ['request', 'indexed ms', 'unindexed ms'],
+        [(label, f'{indexed[label]:.2f}', f'{unindexed[label]:.2f}') for label, _ in requests]
+    )
+
+
+if __name__ == '__main__':
+    with benchmark_database():
+        main()
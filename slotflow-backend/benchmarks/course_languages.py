@@ -0,0 +1,76 @@
+"""
+Filtering the catalogue by language: in Python versus in the database.
+
+Before ``languages`` had an index, finding the courses taught in a language
+meant decoding every course's JSON list and picking matches in Python. That
+is compared with the indexed ``Course.objects.taught_in()`` lookup, for a
+common language (every course), an uncommon one (1 in 10) and a rare one
+(1 in 200), fetching the first catalogue page of matches.
+
+    python -m benchmarks.course_languages
+"""
+from benchmarks.utils import benchmark_database, create_admin, measure, print_table
+
+SIZES = [1000, 10000, 50000]
+PAGE = 20
+LANGUAGES = [('English', 1), ('Welsh', 10), ('Polish', 200)]
+
+
+def seed(instructor, start, count):
+    from datetime import timedelta
+    from django.utils import timezone
+    from courses.models import Course, CourseLanguage
+
+    today = timezone.now().date()
+    courses = Course.objects.bulk_create([
+        Course(
+            title=f'Course {i}',
+            description='Hands-on vocational training',
+            instructor=instructor,
+            start_date=today + timedelta(days=7),
+            end_date=today + timedelta(days=14),
+            duration_hours=10,
+            languages=[name for name, every in LANGUAGES if i % every == 0],
+            slots_total=20,
+        )
+        for i in range(start, start + count)
+    ], batch_size=5000)
+    CourseLanguage.objects.index(courses, replace=False)
+
+
+def main():
+    from courses.models import Course, language_key
+
+    catalogue = Course.objects.filter(is_active=True).order_by('-created_at', '-id')
+
+    def python_side(language):
+        key = language_key(language)
+        matches = [
+            pk for pk, names in catalogue.values_list('pk', 'languages')
+            if any(language_key(name) == key for name in names)
+        ]
+        return list(Course.objects.filter(pk__in=matches[:PAGE]).order_by('-created_at', '-id'))
+
+    def in_database(language):
+        return list(catalogue.taught_in(language)[:PAGE])
+
+    admin = create_admin()
+    rows = []
+    seeded = 0
+    for size in SIZES:
+        seed(admin, seeded, size - seeded)
+        seeded = size
+        for language, _ in LANGUAGES:
+            assert python_side(language) == in_database(language)
+            python_ms = measure(lambda: python_side(language), repeat=5, warmup=1)
+            database_ms = measure(lambda: in_database(language))
+            rows.append((
+                size, language, f'{python_ms:.2f}', f'{database_ms:.2f}', f'{python_ms / database_ms:.0f}x'
+            ))
+
+    print_table(['courses', 'language', 'python ms', 'database ms', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    with benchmark_database():
+        main()
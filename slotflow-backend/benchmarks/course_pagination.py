@@ -0,0 +1,51 @@
+"""
+Per-page latency of the course list as the catalogue grows.
+
+Compares keyset pages (first page and one deep in the catalogue) with the
+old behaviour of returning every course in one response.
+
+    python -m benchmarks.course_pagination
+"""
+from benchmarks.utils import benchmark_database, create_admin, measure, print_table, seed_courses
+
+SIZES = [1000, 10000, 50000]
+UNPAGINATED_LIMIT = 10000
+
+
+def main():
+    from rest_framework.test import APIClient
+    from courses.models import Course
+    from courses.pagination import CourseKeysetPagination
+    from courses.serializers import CourseSerializer
+
+    client = APIClient()
+    admin = create_admin()
+    rows = []
+    seeded = 0
+    for size in SIZES:
+        seed_courses(admin, size - seeded)
+        seeded = size
+
+        # Cursor pointing halfway through the catalogue
+        middle = Course.objects.order_by('-created_at', '-id')[size // 2]
+        cursor = CourseKeysetPagination().encode_cursor((middle.created_at, middle.pk))
+
+        first_page = measure(lambda: client.get('/api/courses/'))
+        deep_page = measure(lambda: client.get('/api/courses/', {'cursor': cursor}))
+        if size <= UNPAGINATED_LIMIT:
+            everything = measure(
+                lambda: CourseSerializer(Course.objects.filter(is_active=True), many=True).data,
+                repeat=3, warmup=0
+            )
+            everything = f'{everything:.1f}'
+        else:
+            everything = 'skipped'
+
+        rows.append((size, f'{first_page:.2f}', f'{deep_page:.2f}', everything))
+
+    print_table(['courses', 'first page ms', 'deep page ms', 'full list ms'], rows)
+
+
+if __name__ == '__main__':
+    with benchmark_database():
+        main()
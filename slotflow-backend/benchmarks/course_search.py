@@ -0,0 +1,92 @@
+"""
+Keyword search over a 100,000-course catalogue.
+
+Compares the indexed search (``Course.objects.search()`` and the
+``/api/courses/search/`` endpoint, cold cache) with what searching cost
+before: loading every course's title and description and matching words in
+Python, which is the least the old download-and-filter approach had to do.
+
+    python -m benchmarks.course_search
+"""
+import random
+
+from benchmarks.utils import benchmark_database, create_admin, measure, print_table
+
+COURSES = 100000
+SEED = 7
+TRADES = [
+    'Carpentry', 'Plumbing', 'Welding', 'Bricklaying', 'Roofing', 'Plastering', 'Tiling',
+    'Glazing', 'Joinery', 'Electrical', 'Painting', 'Landscaping', 'Masonry', 'Thatching',
+]
+LEVELS = ['Introduction to', 'Advanced', 'Practical', 'Certified', 'Weekend', 'Evening']
+WORDS = (
+    'safety tools site hands practice theory assessment workshop materials measuring '
+    'cutting fixing finishing regulations inspection repair installation maintenance '
+    'domestic commercial apprentice qualified instructor portfolio drawings estimates'
+).split()
+# (label, search text)
+QUERIES = [
+    ('one trade', 'welding'),
+    ('trade + level', 'advanced plumbing'),
+    ('prefix', 'carp'),
+    ('common word', 'safety'),
+    ('no match', 'aerospace'),
+]
+
+
+def seed(instructor):
+    from datetime import timedelta
+    from django.utils import timezone
+    from courses.models import Course
+
+    rng = random.Random(SEED)
+    today = timezone.now().date()
+    for offset in range(0, COURSES, 5000):
+        Course.objects.bulk_create([
+            Course(
+                title=f'{rng.choice(LEVELS)} {rng.choice(TRADES)} {offset + i}',
+                description=' '.join(rng.choices(WORDS, k=30)),
+                instructor=instructor,
+                start_date=today + timedelta(days=7),
+                end_date=today + timedelta(days=14),
+                duration_hours=10,
+                slots_total=20,
+            )
+            for i in range(5000)
+        ])
+
+
+def main():
+    from django.core.cache import cache
+    from rest_framework.test import APIClient
+    from courses.models import Course
+    from courses.search import search_terms
+
+    def python_side(text):
+        terms = search_terms(text)
+        return [
+            pk for pk, title, description in
+            Course.objects.filter(is_active=True).values_list('pk', 'title', 'description')
+            if all(term in f'{title} {description}'.casefold() for term in terms)
+        ][:20]
+
+    def endpoint(text):
+        cache.clear()
+        return client.get('/api/courses/search/', {'q': text})
+
+    seed(create_admin())
+    client = APIClient()
+    rows = []
+    for label, text in QUERIES:
+        python_ms = measure(lambda: python_side(text), repeat=3, warmup=1)
+        search_ms = measure(lambda: Course.objects.search(text))
+        endpoint_ms = measure(lambda: endpoint(text))
+        rows.append((label, repr(text), f'{python_ms:.1f}', f'{search_ms:.2f}', f'{endpoint_ms:.2f}'))
+
+    print(f'{COURSES} courses, top 20 results')
+    print_table(['query', 'text', 'python scan ms', 'search ms', 'endpoint ms'], rows)
+
+
+if __name__ == '__main__':
+    with benchmark_database():
+        main()
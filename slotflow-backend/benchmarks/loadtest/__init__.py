@@ -0,0 +1,13 @@
+"""
+Load tests for the HTTP API.
+
+Seeds a scratch database, starts a local server on it and drives scripted
+scenarios with concurrent clients, then reports latency percentiles,
+requests per second and error rates as JSON:
+
+    python -m benchmarks.loadtest --clients 50 --output run.json
+    python -m benchmarks.loadtest --output new.json --baseline run.json
+
+See ``python -m benchmarks.loadtest --help`` for the dataset and scenario
+options. ``db.sqlite3`` is never touched.
+"""
@@ -0,0 +1,192 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+
+from benchmarks.utils import BASE_DIR, print_table
+
+from . import dataset as datasets
+from .report import compare, summarise
+from .scenarios import SCENARIOS, Client
+
+HOST = '127.0.0.1'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.loadtest',
+        description='Seed a scratch database, start a local server and load test it.'
+    )
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated, in order (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument('--clients', type=int, default=20, help='Concurrent clients per scenario')
+    parser.add_argument('--iterations', type=int, default=25, help='Scenario runs per client')
+    parser.add_argument('--users', type=int, default=1000, help='Learners to seed')
+    parser.add_argument('--courses', type=int, default=500, help='Courses to seed')
+    parser.add_argument('--bookings', type=int, default=2000, help='Existing bookings to seed')
+    parser.add_argument('--flash-slots', type=int, default=20, help='Seats in the flash-sale course')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for the dataset and the clients')
+    parser.add_argument('--server', choices=['asgi', 'wsgi'],
+                        default='asgi' if find_spec('uvicorn') else 'wsgi',
+                        help='uvicorn (asgi) or the threaded development server (wsgi)')
+    parser.add_argument('--port', type=int, default=0, help='Server port (default: any free port)')
+    parser.add_argument('--slow-hasher', action='store_true',
+                        help='Keep PBKDF2 password hashing, which dominates the login storm')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='JSON report of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed latency/throughput regression against the baseline (default: 0.2)')
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, port, log):
+    if kind == 'asgi':
+        command = [
+            sys.executable, '-m', 'uvicorn', 'core.asgi:application',
+            '--host', HOST, '--port', str(port), '--log-level', 'warning', '--no-access-log',
+        ]
+    else:
+        command = [sys.executable, 'manage.py', 'runserver', f'{HOST}:{port}', '--noreload']
+    server = subprocess.Popen(command, cwd=BASE_DIR, env=os.environ.copy(), stdout=log, stderr=log)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            break
+        try:
+            connection = http.client.HTTPConnection(HOST, port, timeout=2)
+            connection.request('GET', '/api/courses/?page_size=1')
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+        finally:
+            connection.close()
+    stop_server(server)
+    log.seek(0)
+    raise SystemExit(f'The {kind} server did not start:\n{log.read().decode(errors="replace")}')
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def run_scenario(name, dataset, port, args):
+    script = SCENARIOS[name]
+    clients = [Client(HOST, port) for _ in range(args.clients)]
+
+    def drive(index):
+        rng = random.Random(f'{args.seed}:{name}:{index}')
+        for i in range(args.iterations):
+            # Each run of the script plays a different learner
+            learner = dataset.learners[(index * args.iterations + i) % len(dataset.learners)]
+            script(clients[index], rng, dataset, learner)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as pool:
+        list(pool.map(drive, range(args.clients)))
+    elapsed = time.perf_counter() - started
+    return summarise([sample for client in clients for sample in client.samples], elapsed)
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='slotflow-loadtest-')
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.loadtest.settings'
+    os.environ['SLOTFLOW_LOADTEST_DB'] = os.path.join(workdir, 'loadtest.sqlite3')
+    os.environ['SLOTFLOW_LOADTEST_FAST_HASHER'] = '0' if args.slow_hasher else '1'
+
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connections
+
+    try:
+        print('Seeding...', file=sys.stderr)
+        call_command('migrate', verbosity=0)
+        dataset = datasets.seed(args.users, args.courses, args.bookings, args.flash_slots, args.seed)
+        connections.close_all()
+
+        port = args.port or free_port()
+        with open(os.path.join(workdir, 'server.log'), 'w+b') as log:
+            server = start_server(args.server, port, log)
+            try:
+                scenarios = {}
+                for name in args.scenarios:
+                    print(f'Running {name}...', file=sys.stderr)
+                    scenarios[name] = run_scenario(name, dataset, port, args)
+            finally:
+                stop_server(server)
+
+        report = {
+            'config': {
+                key: getattr(args, key)
+                for key in ('clients', 'iterations', 'users', 'courses', 'bookings',
+                            'flash_slots', 'seed', 'server', 'slow_hasher')
+            },
+            'scenarios': scenarios,
+            'checks': datasets.check(dataset),
+        }
+    finally:
+        connections.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(
+        ['scenario', 'requests', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'],
+        [
+            (name, s['requests'], s['rps'], s['latency_ms']['p50'], s['latency_ms']['p95'],
+             s['latency_ms']['p99'], f"{s['error_rate']:.2%}")
+            for name, s in scenarios.items()
+        ],
+        file=sys.stderr
+    )
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    failures = []
+    if report['checks']['oversold_courses'] or (
+        report['checks']['flash_sale_booked'] > report['checks']['flash_sale_slots']
+    ):
+        failures.append(f"overbooking detected: {report['checks']}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures += compare(report, json.load(f), args.tolerance)
+    for failure in failures:
+        print(f'REGRESSION {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
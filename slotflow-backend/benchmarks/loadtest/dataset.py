@@ -0,0 +1,76 @@
+"""
+The seeded dataset: learners with a known password and a pre-issued access
+token, a catalogue of courses with some bookings already made, and one small
+course for the flash sale.
+"""
+import random
+from dataclasses import dataclass
+
+PASSWORD = 'Learner@1234'
+
+
+@dataclass
+class Dataset:
+    learners: list  # (username, access token) per learner
+    course_ids: list
+    flash_course_id: int
+    flash_slots: int
+
+
+def seed(users, courses, bookings, flash_slots, seed):
+    from accounts.models import User
+    from accounts.serializers import CustomTokenObtainPairSerializer
+    from benchmarks.utils import create_admin, seed_courses
+    from bookings.models import Booking
+    from courses.models import Course
+
+    rng = random.Random(seed)
+    admin = create_admin()
+    seed_courses(admin, courses)
+    course_ids = list(Course.objects.values_list('id', flat=True))
+    flash_course = Course.objects.create(
+        title='Flash sale', description='Few seats, many learners', instructor=admin,
+        start_date=Course.objects.values_list('start_date', flat=True).first(),
+        end_date=Course.objects.values_list('end_date', flat=True).first(),
+        duration_hours=8, slots_total=flash_slots
+    )
+
+    template = User()
+    template.set_password(PASSWORD)
+    learners = User.objects.bulk_create([
+        User(username=f'learner{i}', email=f'learner{i}@slotflow.com', password=template.password)
+        for i in range(users)
+    ])
+
+    # Spread the existing bookings over random courses, a batch per course
+    by_course = {}
+    for learner in rng.sample(learners * (bookings // users + 1), bookings):
+        by_course.setdefault(rng.choice(course_ids), set()).add(learner.pk)
+    for course in Course.objects.filter(pk__in=by_course):
+        Booking.objects.reserve_many(course, sorted(by_course[course.pk]), partial=True)
+
+    return Dataset(
+        learners=[
+            (learner.username, str(CustomTokenObtainPairSerializer.get_token(learner).access_token))
+            for learner in learners
+        ],
+        course_ids=course_ids,
+        flash_course_id=flash_course.pk,
+        flash_slots=flash_slots,
+    )
+
+
+def check(dataset):
+    """Invariants that must hold after the run, whatever the load."""
+    from django.db.models import F
+    from bookings.models import Booking
+    from courses.models import Course
+
+    flash = Course.objects.get(pk=dataset.flash_course_id)
+    booked = Booking.objects.filter(course=flash, is_cancelled=False).count()
+    oversold = Course.objects.filter(slots_total__lt=F('slots_booked') + F('slots_held')).count()
+    return {
+        'flash_sale_booked': booked,
+        'flash_sale_slots': dataset.flash_slots,
+        'oversold_courses': oversold,
+    }
@@ -0,0 +1,74 @@
+"""
+Summaries of the recorded samples, and comparison against a baseline run.
+"""
+import math
+from collections import Counter, defaultdict
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def latency_summary(latencies):
+    latencies = sorted(latencies)
+    summary = {f'p{p}': round(percentile(latencies, p), 2) for p in PERCENTILES}
+    summary['max'] = round(latencies[-1], 2) if latencies else 0.0
+    return summary
+
+
+def summarise(samples, elapsed):
+    errors = sum(1 for sample in samples if not sample.ok)
+    by_endpoint = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample.endpoint].append(sample)
+
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'duration_s': round(elapsed, 3),
+        'rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': latency_summary([sample.latency_ms for sample in samples]),
+        'status_codes': {
+            str(status): count
+            for status, count in sorted(Counter(sample.status for sample in samples).items())
+        },
+        'endpoints': {
+            endpoint: {
+                'requests': len(group),
+                'errors': sum(1 for sample in group if not sample.ok),
+                'latency_ms': latency_summary([sample.latency_ms for sample in group]),
+            }
+            for endpoint, group in sorted(by_endpoint.items())
+        },
+    }
+
+
+def compare(report, baseline, tolerance):
+    """
+    Regressions of ``report`` against ``baseline``, as readable strings: p95
+    or p99 latency up, or throughput down, by more than ``tolerance``
+    (a fraction), or any rise in the error rate.
+    """
+    regressions = []
+    for name, current in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        for p in ('p95', 'p99'):
+            before, after = previous['latency_ms'][p], current['latency_ms'][p]
+            if before and after > before * (1 + tolerance):
+                regressions.append(f'{name}: {p} latency {before:.1f} -> {after:.1f} ms')
+        before, after = previous['rps'], current['rps']
+        if after < before * (1 - tolerance):
+            regressions.append(f'{name}: throughput {before:.1f} -> {after:.1f} req/s')
+        before, after = previous['error_rate'], current['error_rate']
+        if after > before:
+            regressions.append(f'{name}: error rate {before:.2%} -> {after:.2%}')
+    return regressions
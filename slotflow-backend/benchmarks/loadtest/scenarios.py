@@ -0,0 +1,125 @@
+"""
+Scripted scenarios. Each one is a function run ``iterations`` times by every
+client, with its own seeded ``random.Random`` so a run is repeatable.
+Requests name the endpoint they hit and the statuses that count as success;
+anything else, including connection failures, counts as an error.
+"""
+import http.client
+import json
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from .dataset import PASSWORD
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    status: int  # 0 when no response came back
+    latency_ms: float
+    ok: bool
+
+
+class Client:
+    """One simulated user: a plain HTTP/1.1 client recording every request."""
+
+    def __init__(self, host, port, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.samples = []
+
+    def request(self, method, path, endpoint, expect, body=None, token=None):
+        headers = {'Accept': 'application/json'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+
+        # A fresh connection per request, as from many separate browsers
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            status, payload = 0, b''
+        finally:
+            connection.close()
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        self.samples.append(Sample(endpoint, status, latency_ms, status in expect))
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+
+def relative(url):
+    """Path and query of an absolute ``next`` link."""
+    parts = urlsplit(url)
+    return f'{parts.path}?{parts.query}' if parts.query else parts.path
+
+
+def catalogue(client, rng, dataset, learner):
+    """An anonymous visitor pages through the catalogue and opens a course."""
+    status, body = client.request('GET', '/api/courses/', 'course list', (200,))
+    for _ in range(rng.randint(0, 3)):
+        if status != 200 or not body.get('next'):
+            break
+        status, body = client.request('GET', relative(body['next']), 'course list', (200,))
+    course_id = rng.choice(dataset.course_ids)
+    client.request('GET', f'/api/courses/{course_id}/', 'course detail', (200,))
+
+
+def login(client, rng, dataset, learner):
+    """Everyone signs in at once, by username or email."""
+    username, _ = learner
+    identifier = username if rng.random() < 0.5 else f'{username}@slotflow.com'
+    client.request(
+        'POST', '/api/auth/token/', 'login', (200,),
+        body={'username': identifier, 'password': PASSWORD}
+    )
+
+
+def flash_sale(client, rng, dataset, learner):
+    """Many learners try to book the same few seats; the rest are waitlisted."""
+    _, token = learner
+    client.request(
+        'POST', '/api/bookings/', 'book', (201, 202),
+        body={'course': dataset.flash_course_id}, token=token
+    )
+
+
+def cancellation_churn(client, rng, dataset, learner):
+    """Learners book a course, check their bookings and change their mind."""
+    _, token = learner
+    course_id = rng.choice(dataset.course_ids)
+    # 400 when the learner already holds a seat on that course
+    status, body = client.request(
+        'POST', '/api/bookings/', 'book', (201, 202, 400),
+        body={'course': course_id}, token=token
+    )
+    client.request('GET', '/api/bookings/', 'booking list', (200,), token=token)
+    if status == 201:
+        client.request(
+            'PATCH', f"/api/bookings/{body['id']}/cancel/", 'cancel', (200,),
+            body={'confirm': True}, token=token
+        )
+    elif status == 202:
+        client.request(
+            'DELETE', f"/api/bookings/waitlist/{body['waitlist']['id']}/", 'leave waitlist', (204,),
+            token=token
+        )
+
+
+SCENARIOS = {
+    'catalogue': catalogue,
+    'login': login,
+    'flash_sale': flash_sale,
+    'cancellation_churn': cancellation_churn,
+}
@@ -0,0 +1,24 @@
+"""
+Settings for the server under load: the project's settings with production
+style flags, pointed at the load-test database.
+"""
+import os
+import tempfile
+
+from core.settings import *  # noqa: F401,F403
+from core.settings import DATABASES
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+
+DATABASES['default']['NAME'] = os.environ['SLOTFLOW_LOADTEST_DB']
+
+MEDIA_ROOT = os.path.join(tempfile.gettempdir(), 'slotflow-loadtest-media')
+
+# Emails only go to the outbox table; nothing drains it during a run
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+if os.environ.get('SLOTFLOW_LOADTEST_FAST_HASHER') == '1':
+    # Seeded passwords use this too, so the login storm measures the
+    # database work rather than PBKDF2
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
@@ -0,0 +1,92 @@
+"""
+Logins per second through the token endpoint's serializer, comparing the
+original two-lookup + ModelBackend flow with EmailOrUsernameBackend and
+coalesced last_login writes.
+
+A fast password hasher is used so the numbers reflect the database work
+rather than PBKDF2; with the default hasher both paths are dominated by
+hashing.
+
+    python -m benchmarks.login
+"""
+import time
+
+from benchmarks.utils import benchmark_database, print_table
+
+USERS = 500
+LOGINS = 5000  # each user logs in several times, as in a morning peak
+
+
+def main():
+    from django.contrib.auth.models import update_last_login
+    from django.db import connection
+    from django.test import override_settings
+    from rest_framework import serializers
+    from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+    from accounts.models import User
+    from accounts.serializers import CustomTokenObtainPairSerializer
+
+    class LegacyTokenObtainPairSerializer(CustomTokenObtainPairSerializer):
+        """The login flow before EmailOrUsernameBackend."""
+
+        def validate(self, attrs):
+            user_obj = (
+                User.objects.filter(email=attrs.get('username')).first() or
+                User.objects.filter(username=attrs.get('username')).first()
+            )
+            if not user_obj:
+                raise serializers.ValidationError({'detail': 'No active account'})
+            data = TokenObtainPairSerializer.validate(
+                self, {'username': user_obj.username, 'password': attrs.get('password')}
+            )
+            update_last_login(None, self.user)
+            return data
+
+    hashers = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    with override_settings(PASSWORD_HASHERS=hashers):
+        template = User()
+        template.set_password('Learner@1234')
+        User.objects.bulk_create([
+            User(username=f'learner{i}', email=f'learner{i}@slotflow.com', password=template.password)
+            for i in range(USERS)
+        ])
+
+        variants = [
+            ('before', LegacyTokenObtainPairSerializer,
+             ['django.contrib.auth.backends.ModelBackend']),
+            ('after', CustomTokenObtainPairSerializer,
+             ['accounts.backends.EmailOrUsernameBackend']),
+        ]
+        rows = []
+        for name, serializer_class, backends in variants:
+            User.objects.update(last_login=None)
+            executed = []
+
+            def count_queries(execute, sql, params, many, context):
+                executed.append(sql)
+                return execute(sql, params, many, context)
+
+            with override_settings(AUTHENTICATION_BACKENDS=backends):
+                # Log in by username, which the legacy flow only finds on its second lookup
+                credentials = [
+                    {'username': f'learner{i % USERS}', 'password': 'Learner@1234'}
+                    for i in range(LOGINS)
+                ]
+                with connection.execute_wrapper(count_queries):
+                    started = time.perf_counter()
+                    for attrs in credentials:
+                        serializer = serializer_class(data=attrs)
+                        serializer.is_valid(raise_exception=True)
+                    elapsed = time.perf_counter() - started
+            rows.append((
+                name,
+                f'{LOGINS / elapsed:.0f}',
+                f'{len(executed) / LOGINS:.2f}',
+            ))
+
+    print_table(['flow', 'logins/s', 'queries/login'], rows)
+
+
+if __name__ == '__main__':
+    with benchmark_database():
+        main()
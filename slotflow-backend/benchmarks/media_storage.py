@@ -0,0 +1,78 @@
+"""
+Disk usage and upload latency when admins upload the same course picture
+for every cohort, with plain file storage versus content-addressed storage.
+
+Each upload is normalised and has its variants built synchronously, so the
+time shown is the full cost of the upload.
+
+    python -m benchmarks.media_storage
+"""
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks.catalogue_images import camera_photo
+from benchmarks.utils import benchmark_database, create_admin, print_table, seed_courses
+
+COHORTS = 10
+
+STORAGE_BACKENDS = [
+    ('file system', 'django.core.files.storage.FileSystemStorage'),
+    ('content-addressed', 'uploads.storage.ContentAddressedStorage'),
+]
+
+
+def disk_usage(root):
+    return sum(
+        os.path.getsize(os.path.join(dirpath, filename))
+        for dirpath, _, filenames in os.walk(root)
+        for filename in filenames
+    )
+
+
+def upload_cohorts(photo):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from courses.models import Course
+    from uploads.images import build_variants, replace_picture
+
+    timings = []
+    for course in Course.objects.order_by('id')[:COHORTS]:
+        started = time.perf_counter()
+        replace_picture(course, 'course_picture', SimpleUploadedFile('cohort.jpg', photo))
+        if not course.course_picture_variants:
+            build_variants(Course, course.pk, 'course_picture')
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    from django.test import override_settings
+
+    seed_courses(create_admin(), COHORTS)
+    photo = camera_photo(0)
+
+    rows = []
+    for label, backend in STORAGE_BACKENDS:
+        media_root = tempfile.mkdtemp()
+        storages = {'default': {'BACKEND': backend}}
+        try:
+            with override_settings(MEDIA_ROOT=media_root, STORAGES=storages, IMAGE_PROCESSING_ASYNC=False):
+                timings = upload_cohorts(photo)
+            rows.append((
+                label,
+                f'{timings[0]:.0f}',
+                f'{statistics.median(timings[1:]):.1f}',
+                f'{disk_usage(media_root) / 1024:.0f}',
+            ))
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    print(f'Same {len(photo) // 1024} KiB photo uploaded for {COHORTS} cohorts')
+    print_table(['storage', 'first upload ms', 're-upload ms (median)', 'disk KiB'], rows)
+
+
+if __name__ == '__main__':
+    with benchmark_database():
+        main()
@@ -0,0 +1,97 @@
+"""
+Shared helpers for the scripts in ``benchmarks/``.
+
+Each benchmark runs against a throwaway test database (the same one
+``manage.py test`` uses), so it never touches ``db.sqlite3``:
+
+    python -m benchmarks.course_pagination
+"""
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """Create a migrated scratch database for the duration of the block."""
+    setup_django()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(fn, repeat=20, warmup=2):
+    """Return the median wall time of ``fn()`` in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def print_table(headers, rows, file=None):
+    widths = [
+        max(len(str(value)) for value in column)
+        for column in zip(headers, *rows)
+    ]
+    line = '  '.join(f'{{:>{w}}}' for w in widths)
+    print(line.format(*headers), file=file)
+    for row in rows:
+        print(line.format(*row), file=file)
+
+
+def create_admin(username='bench-admin'):
+    from accounts.models import User
+    return User.objects.create(
+        username=username,
+        email=f'{username}@slotflow.com',
+        is_admin=True,
+        is_learner=False
+    )
+
+
+def seed_courses(instructor, count, batch_size=5000, **overrides):
+    """Bulk-insert ``count`` active courses owned by ``instructor``."""
+    from datetime import timedelta
+    from django.utils import timezone
+    from courses.models import Course, CourseLanguage
+
+    today = timezone.now().date()
+    for offset in range(0, count, batch_size):
+        courses = Course.objects.bulk_create([
+            Course(
+                title=f'Course {offset + i}',
+                description='Hands-on vocational training',
+                instructor=instructor,
+                start_date=today + timedelta(days=7 + (offset + i) % 60),
+                end_date=today + timedelta(days=14 + (offset + i) % 60),
+                duration_hours=10 + (offset + i) % 50,
+                languages=['English'],
+                slots_total=20,
+                **overrides
+            )
+            for i in range(min(batch_size, count - offset))
+        ])
+        CourseLanguage.objects.index(courses, replace=False)
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from bookings.models import SeatHold
+
+class Command(BaseCommand):
+    help = "Release seat holds that expired without being confirmed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.SEAT_HOLD_SWEEP_BATCH_SIZE,
+            help="Holds released per transaction"
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help="Keep running instead of exiting after one pass"
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=15.0,
+            help="Seconds to sleep between passes when --loop is set"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            released = SeatHold.objects.release_expired(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Released {released} expired hold(s) in {time.perf_counter() - started:.2f}s"
+            ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-17 20:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+        ('courses', '0002_course_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['learner', '-booked_at'], name='booking_learner_history_idx'),
+        ),
+    ]
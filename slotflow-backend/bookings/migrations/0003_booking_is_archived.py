@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-17 20:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_booking_learner_history_idx'),
+        ('courses', '0004_course_rollover'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='booking',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='is_archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_archived', False)), fields=('course', 'learner'), name='booking_unique_current_learner'),
+        ),
+    ]
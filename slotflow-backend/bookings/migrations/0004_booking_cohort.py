@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-17 20:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+
+def attach_bookings_to_cohorts(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    Course = apps.get_model('courses', 'Course')
+    Cohort = apps.get_model('courses', 'Cohort')
+
+    # Current bookings belong to the running cohort
+    Booking.objects.filter(is_archived=False).update(cohort=Subquery(
+        Course.objects.filter(pk=OuterRef('course_id')).values('current_cohort')[:1]
+    ))
+
+    # Archived bookings were never tagged with their cohort, so they all go
+    # to the one before the running cohort
+    archived = Course.objects.filter(bookings__is_archived=True).distinct()
+    for course in archived.iterator():
+        bookings = Booking.objects.filter(course_id=course.pk, is_archived=True)
+        cohort, _ = Cohort.objects.get_or_create(
+            course_id=course.pk,
+            number=course.cohort_number - 1,
+            defaults={
+                'slots_total': course.slots_total,
+                'slots_booked': bookings.filter(is_cancelled=False).count(),
+                'closed_at': timezone.now(),
+            }
+        )
+        bookings.update(cohort=cohort)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_booking_is_archived'),
+        ('courses', '0005_cohort'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='cohort',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='courses.cohort'),
+        ),
+        migrations.RunPython(attach_bookings_to_cohorts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Every booking has a cohort once 0004 has backfilled them."""
+
+    dependencies = [
+        ('bookings', '0004_booking_cohort'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='cohort',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='courses.cohort'),
+        ),
+    ]
@@ -1,55 +1,534 @@
-from django.db import models
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction, IntegrityError
 from django.core.exceptions import ValidationError
 from accounts.models import User
-from courses.models import Course
+from courses.models import Cohort, Course
+from courses.cache import invalidate_course
 from django.utils import timezone
 
+
+class CourseFull(ValidationError):
+    """Raised when a booking finds no free slot; the learner can join the waitlist."""
+
+    def __init__(self, message="Course is full", *args, **kwargs):
+        super().__init__(message, *args, **kwargs)
+
+
+def claim_current_cohort(course, claim, count=1):
+    """
+    Run the conditional UPDATE ``claim`` (a ``CourseQuerySet`` method name)
+    for ``count`` seats on ``course``'s running cohort and return the cohort
+    id.
+
+    A course that rolled over since it was read is re-read and the claim
+    retried on its new cohort. Raises ``ValidationError`` for inactive
+    courses and ``CourseFull`` when no seat is free. Call inside a
+    transaction.
+    """
+    while True:
+        if course.current_cohort_id is None:
+            course.ensure_current_cohort()
+        claimed = getattr(
+            Course.objects.filter(pk=course.pk, current_cohort_id=course.current_cohort_id), claim
+        )(count)
+        if claimed:
+            return course.current_cohort_id
+        cohort_id = course.current_cohort_id
+        course.refresh_from_db(fields=['is_active', 'cohort_number', 'current_cohort'])
+        if not course.is_active:
+            raise ValidationError("Cannot book an inactive course")
+        if course.current_cohort_id == cohort_id:
+            raise CourseFull()
+        # Rolled over since the course was read: claim on the new cohort
+
+
+class BookingManager(models.Manager):
+    def reserve(self, course, learner):
+        """
+        Claim a slot on ``course`` and create the booking in one transaction.
+
+        Raises ``ValidationError`` when the course is full or inactive, or
+        when the learner already holds a booking for it. In every failure case
+        the slot claim is rolled back together with the booking insert.
+        """
+        try:
+            with transaction.atomic():
+                # learner may be a claims-only user, so only its id is used
+                booking = self.create(course=course, learner_id=learner.pk)
+        except IntegrityError:
+            raise ValidationError("You already have an active booking for this course")
+
+        course.slots_booked += 1
+        return booking
+
+    def reserve_many(self, course, learner_ids, partial=False):
+        """
+        Book every learner in ``learner_ids`` onto ``course`` with one slot
+        claim and one INSERT, and return ``(learner_id, outcome, booking)``
+        for each distinct id, in request order.
+
+        Outcomes are ``booked``, ``already_booked``, ``unknown_learner`` and
+        ``no_slot``. By default it is all or nothing: if any learner cannot
+        be booked, nobody is, and the others are reported as ``skipped``.
+        With ``partial`` the learners are booked in order while slots last.
+
+        Raises ``ValidationError`` for inactive courses. Call inside a
+        transaction together with queuing the emails.
+        """
+        learner_ids = list(dict.fromkeys(learner_ids))
+        known = set(User.objects.filter(pk__in=learner_ids).values_list('pk', flat=True))
+        # Cancelled bookings count too: the learner can't book this cohort again
+        booked = set(
+            self.filter(course_id=course.pk, learner_id__in=learner_ids, is_archived=False)
+            .values_list('learner_id', flat=True)
+        )
+        outcomes = {}
+        for learner_id in learner_ids:
+            if learner_id not in known:
+                outcomes[learner_id] = 'unknown_learner'
+            elif learner_id in booked:
+                outcomes[learner_id] = 'already_booked'
+        to_book = [learner_id for learner_id in learner_ids if learner_id not in outcomes]
+
+        if outcomes and not partial:
+            created, skipped = [], to_book
+        else:
+            claimed = self._claim_many(course, to_book, partial)
+            created, skipped = self._insert_many(course, claimed, partial, outcomes)
+        outcomes.update((learner_id, 'skipped') for learner_id in skipped)
+
+        bookings = {booking.learner_id: booking for booking in created}
+        if bookings:
+            invalidate_course(course.pk)
+
+        return [
+            (learner_id, 'booked', bookings[learner_id]) if learner_id in bookings
+            else (learner_id, outcomes.get(learner_id, 'no_slot'), None)
+            for learner_id in learner_ids
+        ]
+
+    def _claim_many(self, course, learner_ids, partial):
+        # Returns the learners that got a slot, claimed in one UPDATE
+        if not learner_ids:
+            return []
+        try:
+            claim_current_cohort(course, 'claim_slots', len(learner_ids))
+            return learner_ids
+        except CourseFull:
+            if not partial:
+                return []
+        while True:
+            # Fit in as many as there is room for right now
+            course.refresh_from_db(fields=['slots_total', 'slots_booked', 'slots_held'])
+            room = course.slots_total - course.slots_booked - course.slots_held
+            if room <= 0:
+                return []
+            try:
+                claim_current_cohort(course, 'claim_slots', min(room, len(learner_ids)))
+                return learner_ids[:room]
+            except CourseFull:
+                continue
+
+    def _insert_many(self, course, learner_ids, partial, outcomes):
+        # Returns (bookings, skipped learner ids). Learners booked by another
+        # request since they were checked are reported as already_booked and
+        # their claimed slots handed back
+        while learner_ids:
+            try:
+                with transaction.atomic():
+                    return self.bulk_create([
+                        self.model(course=course, learner_id=learner_id, cohort_id=course.current_cohort_id)
+                        for learner_id in learner_ids
+                    ]), []
+            except IntegrityError:
+                raced = set(
+                    self.filter(course_id=course.pk, learner_id__in=learner_ids, is_archived=False)
+                    .values_list('learner_id', flat=True)
+                )
+                if not raced:
+                    raise
+            outcomes.update((learner_id, 'already_booked') for learner_id in raced)
+            remaining = [learner_id for learner_id in learner_ids if learner_id not in raced]
+            if not partial:
+                Course.objects.filter(pk=course.pk).release_slots(len(learner_ids))
+                return [], remaining
+            Course.objects.filter(pk=course.pk).release_slots(len(raced))
+            learner_ids = remaining
+        return [], []
+
+    def cancel_many(self, course, learner_ids):
+        """
+        Cancel the running-cohort bookings of ``learner_ids`` on ``course``
+        with one UPDATE, hand the slots to the waitlist (or back to the
+        course) and return ``(learner_id, outcome, booking_id)`` for each
+        distinct id, in request order. Outcomes are ``cancelled`` and
+        ``not_booked``.
+
+        Call inside a transaction together with queuing the emails.
+        """
+        learner_ids = list(dict.fromkeys(learner_ids))
+        active = dict(
+            self.select_for_update()
+            .filter(
+                course_id=course.pk, learner_id__in=learner_ids,
+                is_cancelled=False, is_archived=False
+            )
+            .values_list('learner_id', 'id')
+        )
+        if active:
+            cancelled = self.filter(
+                pk__in=active.values(), is_cancelled=False, is_archived=False
+            ).update(is_cancelled=True, cancelled_at=timezone.now())
+            Course.objects.filter(pk=course.pk).release_slots(cancelled)
+            for _ in range(cancelled):
+                if not WaitlistEntry.objects.promote_next(course.pk):
+                    break
+            invalidate_course(course.pk)
+
+        return [
+            (learner_id, 'cancelled', active[learner_id]) if learner_id in active
+            else (learner_id, 'not_booked', None)
+            for learner_id in learner_ids
+        ]
+
 class Booking(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='bookings')
     learner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
+    cohort = models.ForeignKey(Cohort, on_delete=models.CASCADE, related_name='bookings')
     booked_at = models.DateTimeField(auto_now_add=True)
     is_cancelled = models.BooleanField(default=False)
     cancelled_at = models.DateTimeField(null=True, blank=True)
+    # Set when the course rolls over to its next cohort
+    is_archived = models.BooleanField(default=False)
+
+    objects = BookingManager()
 
     class Meta:
-        unique_together = ['course', 'learner']
+        constraints = [
+            # One booking per learner per cohort; archived bookings don't count
+            models.UniqueConstraint(
+                fields=['course', 'learner'],
+                condition=models.Q(is_archived=False),
+                name='booking_unique_current_learner',
+            ),
+        ]
         ordering = ['-booked_at']
+        indexes = [
+            # A learner's booking history, newest first
+            models.Index(fields=['learner', '-booked_at'], name='booking_learner_history_idx'),
+        ]
 
     def __str__(self):
         return f"{self.learner.username} -> {self.course.title}"
 
     def clean(self):
+        # Only new bookings are subject to availability checks
+        if self.pk:
+            return
+
         # Prevent booking inactive courses
         if not self.course.is_active:
             raise ValidationError("Cannot book an inactive course")
-        
+
         # Prevent booking full courses
         if self.course.is_full():
             raise ValidationError("Course is full")
-        
+
         # Prevent duplicate active bookings
-        if not self.pk and Booking.objects.filter(
+        if Booking.objects.filter(
             course=self.course,
             learner=self.learner,
-            is_cancelled=False
+            is_cancelled=False,
+            is_archived=False
         ).exists():
             raise ValidationError("You already have an active booking for this course")
 
     def save(self, *args, **kwargs):
-        self.full_clean()
-        
-        # Update slots booked count
-        if not self.pk:  # New booking
-            self.course.slots_booked += 1
-            self.course.save()
-        elif self.is_cancelled and not self.cancelled_at:  # First cancellation
-            self.course.slots_booked -= 1
-            self.course.save()
-            self.cancelled_at = timezone.now()
-            
-        super().save(*args, **kwargs)
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        # New booking: the slot claim and the insert commit or roll back together.
+        # The conditional UPDATE is the capacity check, so no read is needed first.
+        with transaction.atomic():
+            self.cohort_id = claim_current_cohort(self.course, 'claim_slots')
+            super().save(*args, **kwargs)
+            invalidate_course(self.course_id)
 
     def cancel(self):
-        if not self.is_cancelled:
-            self.is_cancelled = True
-            self.save()
+        """
+        Cancel the booking and hand its slot to the head of the course's
+        waitlist, or back to the course if nobody is waiting.
+
+        Returns ``False`` if the booking was already cancelled, including by a
+        concurrent request that got there first, or belongs to a past cohort.
+        """
+        if self.is_cancelled or self.is_archived:
+            return False
+
+        now = timezone.now()
+        with transaction.atomic():
+            cancelled = Booking.objects.filter(
+                pk=self.pk,
+                is_cancelled=False,
+                is_archived=False
+            ).update(is_cancelled=True, cancelled_at=now)
+            if cancelled:
+                Course.objects.filter(pk=self.course_id).release_slots(1)
+                # Still inside the transaction, so nobody else can take the slot first
+                WaitlistEntry.objects.promote_next(self.course_id)
+                invalidate_course(self.course_id)
+
+        self.is_cancelled = True
+        if cancelled:
+            self.cancelled_at = now
+        return bool(cancelled)
+
+
+class WaitlistQuerySet(models.QuerySet):
+    def waiting(self):
+        return self.filter(promoted_at__isnull=True)
+
+    def with_position(self):
+        """Annotate each waiting entry with its 1-based place in the queue."""
+        ahead = (
+            WaitlistEntry.objects.waiting()
+            .filter(course_id=models.OuterRef('course_id'), id__lte=models.OuterRef('id'))
+            .order_by()
+            .values('course_id')
+            .annotate(count=models.Count('id'))
+            .values('count')
+        )
+        return self.annotate(position=models.Subquery(ahead))
+
+
+class WaitlistManager(models.Manager.from_queryset(WaitlistQuerySet)):
+    def join(self, course, learner):
+        """
+        Queue ``learner`` for ``course``, or return their existing place.
+
+        Raises ``ValidationError`` if they already hold a booking for the
+        running cohort, since promoting them would fail anyway.
+        """
+        if Booking.objects.filter(
+            course_id=course.pk, learner_id=learner.pk, is_archived=False
+        ).exists():
+            raise ValidationError("You already have a booking for this course")
+        try:
+            with transaction.atomic():
+                return self.create(course_id=course.pk, learner_id=learner.pk)
+        except IntegrityError:
+            return self.waiting().get(course_id=course.pk, learner_id=learner.pk)
+
+    def promote_next(self, course_id):
+        """
+        Book the longest-waiting learner on ``course_id`` and queue their
+        emails. Returns the new booking, or ``None`` if nobody could be
+        promoted.
+
+        Call this inside the transaction that freed the slot. Each entry is
+        claimed with a conditional UPDATE, so concurrent cancellations never
+        promote the same learner twice.
+        """
+        from notifications.models import OutboxMessage
+
+        course = Course.objects.get(pk=course_id)
+        while True:
+            entry = self.waiting().filter(course_id=course_id).order_by('id').first()
+            if entry is None:
+                return None
+            try:
+                with transaction.atomic():
+                    if not self.waiting().filter(pk=entry.pk).update(promoted_at=timezone.now()):
+                        continue
+                    booking = Booking.objects.create(course=course, learner_id=entry.learner_id)
+                    self.filter(pk=entry.pk).update(booking=booking)
+                    OutboxMessage.objects.enqueue(booking, 'promotion')
+                hold = SeatHold.objects.filter(course_id=course_id, learner_id=entry.learner_id).first()
+                if hold:
+                    # They no longer need it: its seat goes to the next in line
+                    hold.release()
+                return booking
+            except IntegrityError:
+                # Booked this cohort some other way since joining; drop them
+                self.filter(pk=entry.pk).delete()
+            except ValidationError:
+                # Inactive, or the slot went elsewhere; leave the queue as it is
+                return None
+
+
+class WaitlistEntry(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='waitlist')
+    learner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+    promoted_at = models.DateTimeField(null=True, blank=True)
+    booking = models.OneToOneField(
+        Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='waitlist_entry'
+    )
+
+    objects = WaitlistManager()
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            # A learner waits at most once per course
+            models.UniqueConstraint(
+                fields=['course', 'learner'],
+                condition=models.Q(promoted_at__isnull=True),
+                name='waitlist_unique_waiting_learner',
+            ),
+        ]
+        indexes = [
+            # Head of each course's queue
+            models.Index(
+                fields=['course', 'id'],
+                condition=models.Q(promoted_at__isnull=True),
+                name='waitlist_queue_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.learner_id} waiting for {self.course_id}"
+
+
+class SeatHoldManager(models.Manager):
+    def place(self, course, learner):
+        """
+        Put a seat on ``course`` on hold for ``learner`` for
+        ``SEAT_HOLD_SECONDS``, or return the hold they already have.
+
+        Raises ``ValidationError`` like a booking would, and if the learner
+        already holds a booking for the running cohort or is on its waitlist.
+        """
+        # Both checks in one query
+        booked, waiting = Course.objects.filter(pk=course.pk).values_list(
+            models.Exists(Booking.objects.filter(course_id=course.pk, learner_id=learner.pk, is_archived=False)),
+            models.Exists(WaitlistEntry.objects.waiting().filter(course_id=course.pk, learner_id=learner.pk)),
+        ).get()
+        if booked:
+            raise ValidationError("You already have a booking for this course")
+        if waiting:
+            raise ValidationError("You are already on the waitlist for this course")
+
+        existing = self.filter(course_id=course.pk, learner_id=learner.pk).first()
+        if existing:
+            if not existing.is_expired():
+                return existing
+            existing.release()
+
+        expires_at = timezone.now() + timedelta(seconds=settings.SEAT_HOLD_SECONDS)
+        try:
+            with transaction.atomic():
+                claim_current_cohort(course, 'hold_slots')
+                hold = self.create(course=course, learner_id=learner.pk, expires_at=expires_at)
+                invalidate_course(course.pk)
+        except IntegrityError:
+            # A concurrent request from the same learner got there first
+            return self.get(course_id=course.pk, learner_id=learner.pk)
+        return hold
+
+    def release_expired(self, now=None, batch_size=None):
+        """
+        Sweep holds that expired by ``now`` and give their seats back, one
+        DELETE and one UPDATE per batch. Freed seats go to the waitlist
+        first. Returns the number of holds released.
+        """
+        now = now or timezone.now()
+        batch_size = batch_size or settings.SEAT_HOLD_SWEEP_BATCH_SIZE
+
+        released = 0
+        while True:
+            with transaction.atomic():
+                expired = list(
+                    self.select_for_update()
+                    .filter(expires_at__lte=now)
+                    .order_by('expires_at')
+                    .values_list('id', 'course_id')[:batch_size]
+                )
+                if not expired:
+                    break
+                self.filter(pk__in=[pk for pk, _ in expired]).delete()
+
+                freed = Counter(course_id for _, course_id in expired)
+                Course.objects.filter(pk__in=freed).update(
+                    slots_held=models.F('slots_held') - models.Case(
+                        *[models.When(pk=pk, then=models.Value(n)) for pk, n in freed.items()],
+                        default=models.Value(0)
+                    ),
+                    updated_at=now
+                )
+                queued = (
+                    WaitlistEntry.objects.waiting()
+                    .filter(course_id__in=freed)
+                    .values_list('course_id', flat=True)
+                    .distinct()
+                )
+                for course_id in set(queued):
+                    for _ in range(freed[course_id]):
+                        if not WaitlistEntry.objects.promote_next(course_id):
+                            break
+                for course_id in freed:
+                    invalidate_course(course_id)
+            released += len(expired)
+
+        return released
+
+
+class SeatHold(models.Model):
+    """
+    A seat set aside for a learner while they check out. It counts towards
+    ``Course.slots_held`` until it is confirmed into a booking, released, or
+    swept after ``expires_at`` by ``manage.py release_seat_holds``.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='seat_holds')
+    learner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='seat_holds')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    objects = SeatHoldManager()
+
+    class Meta:
+        ordering = ['expires_at']
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'learner'], name='seat_hold_unique_learner'),
+        ]
+        indexes = [
+            # The sweeper's scan for expired holds
+            models.Index(fields=['expires_at'], name='seat_hold_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.learner_id} holding a seat on {self.course_id} until {self.expires_at}"
+
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    def confirm(self):
+        """
+        Turn the hold into a booking and return it.
+
+        Raises ``ValidationError`` if the hold has expired (swept or not) or
+        was released, or if the course can no longer be booked.
+        """
+        with transaction.atomic():
+            if not SeatHold.objects.filter(pk=self.pk, expires_at__gt=timezone.now()).delete()[0]:
+                raise ValidationError("Your hold has expired")
+            # The seat moves from held to booked within this transaction
+            Course.objects.filter(pk=self.course_id).release_held_slots(1)
+            # The learner is only needed for its id
+            return Booking.objects.reserve(Course.objects.get(pk=self.course_id), User(pk=self.learner_id))
+
+    def release(self):
+        """
+        Give the seat back before the hold expires, to the waitlist first.
+        Returns ``False`` if it was already confirmed, released or swept.
+        """
+        with transaction.atomic():
+            if not SeatHold.objects.filter(pk=self.pk).delete()[0]:
+                return False
+            Course.objects.filter(pk=self.course_id).release_held_slots(1)
+            WaitlistEntry.objects.promote_next(self.course_id)
+            invalidate_course(self.course_id)
+        return True
@@ -1,30 +1,37 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Booking
+from .models import Booking, CourseFull, SeatHold, WaitlistEntry
 from courses.models import Course
+from courses.serializers import CourseSummarySerializer
 from accounts.models import User
 from django.utils import timezone
+from django.core.exceptions import ValidationError as DjangoValidationError
 
 class BookingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = [
-            'id', 'course', 'learner', 'booked_at',
-            'is_cancelled', 'cancelled_at'
+            'id', 'course', 'cohort', 'learner', 'booked_at',
+            'is_cancelled', 'cancelled_at', 'is_archived'
         ]
         read_only_fields = [
-            'id', 'learner', 'booked_at',
-            'is_cancelled', 'cancelled_at'
+            'id', 'cohort', 'learner', 'booked_at',
+            'is_cancelled', 'cancelled_at', 'is_archived'
         ]
 
+    def to_representation(self, instance):
+        rep = super().to_representation(instance)
+        # ?expand=course embeds a summary instead of the bare course id
+        if self.context.get('expand_course'):
+            rep['course'] = CourseSummarySerializer(instance.course).data
+        return rep
+
     def validate_course(self, value):
         # Check course is active
         if not value.is_active:
             raise serializers.ValidationError("Course is not active")
-        
-        # Check course has available slots
-        if value.is_full():
-            raise serializers.ValidationError("Course is full")
-        
+
+        # A full course is not an error: the view puts the learner on the waitlist
         return value
 
     def validate(self, data):
@@ -33,8 +40,9 @@ class BookingSerializer(serializers.ModelSerializer):
             # Check for existing active booking
             existing_booking = Booking.objects.filter(
                 course=data['course'],
-                learner=request.user,
-                is_cancelled=False
+                learner_id=request.user.pk,
+                is_cancelled=False,
+                is_archived=False
             ).exists()
             
             if existing_booking:
@@ -48,8 +56,60 @@ class BookingSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
             validated_data['learner'] = request.user
-        
-        return super().create(validated_data)
+
+        try:
+            return Booking.objects.reserve(
+                validated_data['course'],
+                validated_data['learner']
+            )
+        except CourseFull:
+            raise
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    position = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'course', 'position', 'created_at']
+        read_only_fields = fields
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SeatHold
+        fields = ['id', 'course', 'created_at', 'expires_at']
+        read_only_fields = ['id', 'created_at', 'expires_at']
+
+    def validate_course(self, value):
+        if not value.is_active:
+            raise serializers.ValidationError("Course is not active")
+        return value
+
+    def create(self, validated_data):
+        try:
+            return SeatHold.objects.place(validated_data['course'], self.context['request'].user)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+
+class BulkCancelSerializer(serializers.Serializer):
+    course = serializers.PrimaryKeyRelatedField(queryset=Course.objects.all())
+    learners = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_BOOKING_MAX_LEARNERS
+    )
+
+
+class BulkBookingSerializer(BulkCancelSerializer):
+    # Book whoever fits instead of all or nobody
+    partial = serializers.BooleanField(default=False)
+
+    def validate_course(self, value):
+        if not value.is_active:
+            raise serializers.ValidationError("Course is not active")
+        return value
 
 class CancelBookingSerializer(serializers.Serializer):
     confirm = serializers.BooleanField(required=True)
@@ -1,3 +1,776 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from core.testing import bearer, make_admin, make_course, make_learner, make_learners
+from courses.models import Course
+from notifications.models import OutboxMessage
+from .models import Booking, BookingManager, SeatHold, WaitlistEntry
+from .views import BookingListView
+
+
+class ReservationTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.course = make_course(self.admin, slots_total=2)
+        self.learners = make_learners(3)
+
+    def test_reserve_claims_slot(self):
+        booking = Booking.objects.reserve(self.course, self.learners[0])
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 1)
+        self.assertEqual(booking.learner, self.learners[0])
+
+    def test_reserve_rejects_full_course(self):
+        Booking.objects.reserve(self.course, self.learners[0])
+        Booking.objects.reserve(self.course, self.learners[1])
+
+        with self.assertRaisesMessage(ValidationError, "Course is full"):
+            Booking.objects.reserve(self.course, self.learners[2])
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 2)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_reserve_rejects_inactive_course(self):
+        self.course.is_active = False
+        self.course.save()
+
+        with self.assertRaisesMessage(ValidationError, "Cannot book an inactive course"):
+            Booking.objects.reserve(self.course, self.learners[0])
+
+    def test_duplicate_booking_releases_claimed_slot(self):
+        Booking.objects.reserve(self.course, self.learners[0])
+
+        with self.assertRaises(ValidationError):
+            Booking.objects.reserve(self.course, self.learners[0])
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 1)
+
+    def test_cancel_releases_slot_once(self):
+        booking = Booking.objects.reserve(self.course, self.learners[0])
+        stale = Booking.objects.get(pk=booking.pk)
+
+        self.assertTrue(booking.cancel())
+        self.assertFalse(stale.cancel())
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 0)
+
+    def test_cancel_allowed_on_full_course(self):
+        booking = Booking.objects.reserve(self.course, self.learners[0])
+        Booking.objects.reserve(self.course, self.learners[1])
+
+        self.assertTrue(booking.cancel())
+
+
+class BookingListConditionalGetTests(TestCase):
+    def setUp(self):
+        admin = make_admin()
+        self.learner, self.other = make_learners(2)
+        self.course = make_course(admin)
+        self.booking = Booking.objects.reserve(self.course, self.learner)
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def test_unchanged_bookings_answer_304_with_one_query(self):
+        etag = self.client.get('/api/bookings/')['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/bookings/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_cancellation_changes_etag(self):
+        etag = self.client.get('/api/bookings/')['ETag']
+
+        self.booking.cancel()
+
+        response = self.client.get('/api/bookings/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data[0]['is_cancelled'])
+
+    def test_etag_is_per_learner(self):
+        Booking.objects.reserve(self.course, self.other)
+        etag = self.client.get('/api/bookings/')['ETag']
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(
+            self.client.get('/api/bookings/', HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+
+
+@override_settings(ASYNC_VIEWS=True)
+class AsyncBookingListTests(TestCase):
+    """Listing and booking through the ASGI handler, with a claims token."""
+
+    def setUp(self):
+        admin = make_admin()
+        self.learner, = make_learners(1)
+        self.course = make_course(admin)
+        self.other = make_course(admin, title='Masonry')
+        self.booking = Booking.objects.reserve(self.course, self.learner)
+        self.headers = {'Authorization': bearer(self.learner)}
+
+    async def test_list(self):
+        response = await self.async_client.get('/api/bookings/?expand=course', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        [booking] = response.json()
+        self.assertEqual(booking['course']['title'], 'Carpentry')
+
+        response = await self.async_client.get(
+            '/api/bookings/?expand=course', headers={**self.headers, 'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_list_requires_authentication(self):
+        response = await self.async_client.get('/api/bookings/')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_book(self):
+        response = await self.async_client.post(
+            '/api/bookings/', {'course': self.other.pk}, content_type='application/json', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 201)
+        booking = await Booking.objects.select_related('course').aget(pk=response.json()['id'])
+        self.assertEqual(booking.course.slots_booked, 1)
+        self.assertTrue(await OutboxMessage.objects.filter(booking=booking).aexists())
+
+        response = await self.async_client.post(
+            '/api/bookings/', {'course': self.other.pk}, content_type='application/json', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class BookingHistoryTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.learner = make_learner()
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def book_courses(self, count):
+        for i in range(count):
+            Booking.objects.reserve(make_course(self.admin, title=f'Course {i}'), self.learner)
+
+    def test_expand_embeds_course_summary(self):
+        self.book_courses(1)
+
+        response = self.client.get('/api/bookings/', {'expand': 'course'})
+
+        self.assertEqual(
+            set(response.data[0]['course']),
+            {'id', 'title', 'start_date', 'end_date', 'cohort_number', 'is_full'}
+        )
+        self.assertEqual(response.data[0]['course']['title'], 'Course 0')
+
+    def test_plain_list_keeps_course_id(self):
+        self.book_courses(1)
+
+        response = self.client.get('/api/bookings/')
+
+        self.assertIsInstance(response.data[0]['course'], int)
+
+    def test_query_count_does_not_grow_with_bookings(self):
+        # One validator aggregate for conditional GET plus one joined list query
+        self.book_courses(1)
+        with self.assertNumQueries(2):
+            self.client.get('/api/bookings/', {'expand': 'course'})
+
+        self.book_courses(20)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/bookings/', {'expand': 'course'})
+        self.assertEqual(len(response.data), 21)
+
+    def test_course_change_invalidates_expanded_etag(self):
+        self.book_courses(1)
+        etag = self.client.get('/api/bookings/', {'expand': 'course'})['ETag']
+
+        course = Course.objects.get()
+        course.title = 'Renamed'
+        course.save()
+
+        response = self.client.get('/api/bookings/', {'expand': 'course'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['course']['title'], 'Renamed')
+
+
+class WaitlistTests(TestCase):
+    def setUp(self):
+        admin = make_admin()
+        self.course = make_course(admin, slots_total=1)
+        self.learners = make_learners(4)
+        self.booking = Booking.objects.reserve(self.course, self.learners[0])
+        self.client = APIClient()
+
+    def post_booking(self, learner):
+        self.client.force_authenticate(learner)
+        return self.client.post('/api/bookings/', {'course': self.course.pk})
+
+    def test_full_course_queues_learner(self):
+        first = self.post_booking(self.learners[1])
+        second = self.post_booking(self.learners[2])
+        again = self.post_booking(self.learners[1])
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.data['waitlist']['position'], 1)
+        self.assertEqual(second.data['waitlist']['position'], 2)
+        # Asking again keeps the original place
+        self.assertEqual(again.data['waitlist']['id'], first.data['waitlist']['id'])
+        self.assertEqual(WaitlistEntry.objects.count(), 2)
+
+        response = self.client.get('/api/bookings/waitlist/')
+        self.assertEqual([e['position'] for e in response.data], [1])
+
+    def test_booked_learner_cannot_queue(self):
+        response = self.post_booking(self.learners[0])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_cancel_promotes_head_of_queue(self):
+        self.post_booking(self.learners[1])
+        self.post_booking(self.learners[2])
+
+        self.assertTrue(self.booking.cancel())
+
+        promoted = Booking.objects.get(learner=self.learners[1])
+        self.assertFalse(promoted.is_cancelled)
+        self.assertEqual(promoted.waitlist_entry.learner, self.learners[1])
+        self.assertEqual(
+            sorted(promoted.notifications.values_list('template', flat=True)),
+            ['admin_booking_notification', 'waitlist_promotion']
+        )
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 1)
+        self.assertEqual(list(WaitlistEntry.objects.waiting().with_position().values_list(
+            'learner', 'position'
+        )), [(self.learners[2].pk, 1)])
+
+    def test_cancel_skips_learners_who_booked_meanwhile(self):
+        WaitlistEntry.objects.join(self.course, self.learners[1])
+        WaitlistEntry.objects.join(self.course, self.learners[2])
+        # An extra slot lets the head of the queue book directly
+        self.course.slots_total = 2
+        self.course.save()
+        Booking.objects.reserve(self.course, self.learners[1])
+
+        self.assertTrue(self.booking.cancel())
+
+        self.assertTrue(Booking.objects.filter(learner=self.learners[2], is_cancelled=False).exists())
+        self.assertFalse(WaitlistEntry.objects.waiting().exists())
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 2)
+
+    def test_leaving_the_waitlist(self):
+        entry = WaitlistEntry.objects.join(self.course, self.learners[1])
+        self.client.force_authenticate(self.learners[2])
+        self.assertEqual(self.client.delete(f'/api/bookings/waitlist/{entry.pk}/').status_code, 404)
+
+        self.client.force_authenticate(self.learners[1])
+        self.assertEqual(self.client.delete(f'/api/bookings/waitlist/{entry.pk}/').status_code, 204)
+
+        self.assertTrue(self.booking.cancel())
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 0)
+
+
+class SeatHoldTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.course = make_course(self.admin, slots_total=2)
+        self.learners = make_learners(3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.learners[0])
+
+    def expire(self, *holds):
+        SeatHold.objects.filter(pk__in=[h.pk for h in holds]).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_holds_count_towards_availability(self):
+        response = self.client.post('/api/bookings/holds/', {'course': self.course.pk})
+        self.assertEqual(response.status_code, 201)
+        SeatHold.objects.place(self.course, self.learners[1])
+
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.slots_booked, self.course.slots_held), (0, 2))
+        self.assertTrue(self.course.is_full())
+        self.assertEqual(self.client.get(f'/api/courses/{self.course.pk}/').data['slots_held'], 2)
+        with self.assertRaisesMessage(ValidationError, "Course is full"):
+            Booking.objects.reserve(self.course, self.learners[2])
+
+    def test_placing_again_keeps_the_hold(self):
+        first = self.client.post('/api/bookings/holds/', {'course': self.course.pk})
+        again = self.client.post('/api/bookings/holds/', {'course': self.course.pk})
+
+        self.assertEqual(again.data['id'], first.data['id'])
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_held, 1)
+
+    def test_confirm_turns_hold_into_booking(self):
+        hold = SeatHold.objects.place(self.course, self.learners[0])
+
+        response = self.client.post(f'/api/bookings/holds/{hold.pk}/confirm/')
+
+        self.assertEqual(response.status_code, 201)
+        booking = Booking.objects.get(pk=response.data['id'])
+        self.assertEqual(booking.notifications.count(), 2)
+        self.assertFalse(SeatHold.objects.exists())
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.slots_booked, self.course.slots_held), (1, 0))
+        self.assertEqual(self.client.post('/api/bookings/holds/', {'course': self.course.pk}).status_code, 400)
+
+    def test_confirm_does_not_load_the_learner(self):
+        hold = SeatHold.objects.place(self.course, self.learners[0])
+        hold = SeatHold.objects.get(pk=hold.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            booking = hold.confirm()
+
+        self.assertEqual(booking.learner_id, self.learners[0].pk)
+        self.assertFalse([q for q in queries if 'accounts_user' in q['sql']])
+
+    def test_promotion_releases_the_learners_hold(self):
+        SeatHold.objects.place(self.course, self.learners[0])
+        booking = Booking.objects.reserve(self.course, self.learners[1])
+        WaitlistEntry.objects.join(self.course, self.learners[0])
+        WaitlistEntry.objects.join(self.course, self.learners[2])
+
+        booking.cancel()
+
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertEqual(
+            set(Booking.objects.filter(is_cancelled=False).values_list('learner_id', flat=True)),
+            {self.learners[0].pk, self.learners[2].pk}
+        )
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.slots_booked, self.course.slots_held), (2, 0))
+
+    def test_cannot_hold_while_on_the_waitlist(self):
+        WaitlistEntry.objects.join(self.course, self.learners[0])
+
+        response = self.client.post('/api/bookings/holds/', {'course': self.course.pk})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("waitlist", str(response.data))
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_cannot_hold_a_booked_course(self):
+        Booking.objects.reserve(self.course, self.learners[0])
+
+        with self.assertRaisesMessage(ValidationError, "already have a booking"):
+            SeatHold.objects.place(self.course, self.learners[0])
+
+    def test_expired_hold_cannot_be_confirmed(self):
+        hold = SeatHold.objects.place(self.course, self.learners[0])
+        self.expire(hold)
+
+        response = self.client.post(f'/api/bookings/holds/{hold.pk}/confirm/')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], "Your hold has expired")
+        self.assertFalse(Booking.objects.exists())
+
+    def test_release_gives_seat_to_waitlist(self):
+        hold = SeatHold.objects.place(self.course, self.learners[0])
+        Booking.objects.reserve(self.course, self.learners[1])
+        WaitlistEntry.objects.join(self.course, self.learners[2])
+
+        self.assertEqual(self.client.delete(f'/api/bookings/holds/{hold.pk}/').status_code, 204)
+
+        self.assertTrue(Booking.objects.filter(learner=self.learners[2]).exists())
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.slots_booked, self.course.slots_held), (2, 0))
+
+    def test_sweeper_releases_expired_holds_in_bulk(self):
+        courses = [make_course(self.admin, title=f'Course {i}') for i in range(3)]
+        learners = make_learners(6, prefix='sweep')
+
+        def sweep_queries(learners):
+            holds = [SeatHold.objects.place(c, l) for c in courses for l in learners]
+            self.expire(*holds)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(SeatHold.objects.release_expired(), len(holds))
+            return len(queries)
+
+        # One course's worth of queries however many holds expired
+        self.assertEqual(sweep_queries(learners[:1]), sweep_queries(learners[1:]))
+        self.assertEqual(
+            list(Course.objects.filter(pk__in=[c.pk for c in courses]).values_list('slots_held', flat=True)),
+            [0] * len(courses)
+        )
+
+    def test_sweeper_spares_live_holds(self):
+        live = SeatHold.objects.place(self.course, self.learners[0])
+        stale = SeatHold.objects.place(self.course, self.learners[1])
+        self.expire(stale)
+
+        out = StringIO()
+        call_command('release_seat_holds', stdout=out)
+
+        self.assertIn('Released 1 expired hold(s)', out.getvalue())
+        self.assertEqual(list(SeatHold.objects.all()), [live])
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_held, 1)
+
+    def test_placing_after_expiry_starts_a_new_hold(self):
+        hold = SeatHold.objects.place(self.course, self.learners[0])
+        self.expire(hold)
+
+        renewed = SeatHold.objects.place(self.course, self.learners[0])
+
+        self.assertNotEqual(renewed.pk, hold.pk)
+        self.assertFalse(renewed.is_expired())
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_held, 1)
+
+
+class BulkBookingTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.course = make_course(self.admin, slots_total=60)
+        self.learners = make_learners(60)
+        self.ids = [u.pk for u in self.learners]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def enrol(self, learners, **extra):
+        return self.client.post(
+            '/api/bookings/bulk/', {'course': self.course.pk, 'learners': learners, **extra},
+            format='json'
+        )
+
+    def test_bulk_booking_books_everyone(self):
+        response = self.enrol(self.ids[:5])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['booked'], 5)
+        self.assertEqual({r['status'] for r in response.data['results']}, {'booked'})
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 5)
+        self.assertEqual(
+            set(Booking.objects.values_list('cohort', flat=True)), {self.course.current_cohort_id}
+        )
+        self.assertEqual(OutboxMessage.objects.count(), 10)
+
+    def test_query_count_does_not_grow_with_learners(self):
+        with CaptureQueriesContext(connection) as few:
+            self.enrol(self.ids[:5])
+        with CaptureQueriesContext(connection) as many:
+            self.enrol(self.ids[5:55])
+
+        self.assertEqual(len(few), len(many))
+
+    def test_all_or_nothing_books_nobody_on_any_failure(self):
+        Booking.objects.reserve(self.course, self.learners[0])
+
+        response = self.enrol([self.ids[0], self.ids[1], 999999])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']],
+            ['already_booked', 'skipped', 'unknown_learner']
+        )
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_all_or_nothing_needs_room_for_everyone(self):
+        self.course.slots_total = 3
+        self.course.save()
+
+        response = self.enrol(self.ids[:4])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual({r['status'] for r in response.data['results']}, {'no_slot'})
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 0)
+
+    def test_partial_books_in_order_while_slots_last(self):
+        self.course.slots_total = 3
+        self.course.save()
+        Booking.objects.reserve(self.course, self.learners[0])
+
+        response = self.enrol(self.ids[:4] + [self.ids[1]], partial=True)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [(r['learner'], r['status']) for r in response.data['results']],
+            [(self.ids[0], 'already_booked'), (self.ids[1], 'booked'),
+             (self.ids[2], 'booked'), (self.ids[3], 'no_slot')]
+        )
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 3)
+
+    def test_bulk_cancel_frees_slots_for_the_waitlist(self):
+        self.course.slots_total = 3
+        self.course.save()
+        self.enrol(self.ids[:3])
+        WaitlistEntry.objects.join(self.course, self.learners[10])
+
+        response = self.client.post(
+            '/api/bookings/bulk/cancel/',
+            {'course': self.course.pk, 'learners': [self.ids[0], self.ids[1], self.ids[5]]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']], ['cancelled', 'cancelled', 'not_booked']
+        )
+        self.assertTrue(Booking.objects.filter(learner=self.learners[10], is_cancelled=False).exists())
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 2)
+        self.assertEqual(OutboxMessage.objects.filter(template='cancellation_confirmation').count(), 2)
+
+    def book_first_learner_during_claim(self):
+        # Another request books a learner after the duplicate check has run
+        claim_many = BookingManager._claim_many
+
+        def claim_then_race(manager, course, learner_ids, partial):
+            Booking.objects.reserve(Course.objects.get(pk=course.pk), self.learners[0])
+            return claim_many(manager, course, learner_ids, partial)
+
+        return mock.patch.object(BookingManager, '_claim_many', claim_then_race)
+
+    def test_concurrent_booking_is_reported_not_an_error(self):
+        with self.book_first_learner_during_claim():
+            response = self.enrol(self.ids[:3], partial=True)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']], ['already_booked', 'booked', 'booked']
+        )
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 3)
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def test_concurrent_booking_fails_all_or_nothing(self):
+        with self.book_first_learner_during_claim():
+            response = self.enrol(self.ids[:3])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']], ['already_booked', 'skipped', 'skipped']
+        )
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.slots_booked, 1)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_learners_cannot_use_bulk_endpoints(self):
+        self.client.force_authenticate(self.learners[0])
+
+        self.assertEqual(self.enrol(self.ids[:2]).status_code, 403)
+
+    def test_inactive_course_is_rejected(self):
+        self.course.is_active = False
+        self.course.save()
+
+        self.assertEqual(self.enrol(self.ids[:2]).status_code, 400)
+        self.assertFalse(Booking.objects.exists())
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        admin = make_admin()
+        self.course = make_course(admin)
+        self.other_course = make_course(admin, title='Other')
+        self.learner, self.other = make_learners(2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def book(self, key, course=None):
+        return self.client.post(
+            '/api/bookings/', {'course': (course or self.course).pk}, HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retried_booking_replays_first_response(self):
+        first = self.book('k1')
+
+        with self.assertNumQueries(0):
+            retry = self.book('k1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+    def test_retried_cancellation_replays_success(self):
+        booking = Booking.objects.reserve(self.course, self.learner)
+        url = f'/api/bookings/{booking.pk}/cancel/'
+
+        responses = [
+            self.client.patch(url, {'confirm': True}, HTTP_IDEMPOTENCY_KEY='c1') for _ in range(2)
+        ]
+
+        self.assertEqual([r.status_code for r in responses], [200, 200])
+        self.assertEqual(OutboxMessage.objects.filter(template='cancellation_confirmation').count(), 1)
+        # Without the key the duplicate is still refused
+        self.assertEqual(self.client.patch(url, {'confirm': True}).status_code, 400)
+
+    def test_key_reused_for_another_request_is_rejected(self):
+        self.book('k1')
+
+        self.assertEqual(self.book('k1', course=self.other_course).status_code, 422)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_keys_are_per_user(self):
+        self.book('k1')
+        self.client.force_authenticate(self.other)
+
+        response = self.book('k1')
+
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_retry_while_first_request_runs_conflicts(self):
+        retries = []
+        original = BookingListView.perform_create
+
+        def perform_create(view, serializer):
+            retries.append(self.book('k1'))
+            return original(view, serializer)
+
+        with mock.patch.object(BookingListView, 'perform_create', perform_create):
+            first = self.book('k1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retries[0].status_code, 409)
+
+    def test_server_errors_are_not_replayed(self):
+        with mock.patch.object(BookingListView, 'perform_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.book('k1')
+
+        self.assertEqual(self.book('k1').status_code, 201)
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class ReservationConcurrencyTests(TransactionTestCase):
+    """Flash-sale stress test: many learners racing for a handful of slots."""
+
+    learners_count = 300
+    slots_total = 50
+    workers = 16
+
+    def test_parallel_reservations_never_oversell(self):
+        admin = make_admin()
+        course = make_course(admin, slots_total=self.slots_total)
+        learner_ids = [u.pk for u in make_learners(self.learners_count)]
+
+        booked, rejected, errors = [], [], []
+        lock = threading.Lock()
+        start = threading.Barrier(self.workers)
+
+        def worker(ids):
+            start.wait()
+            try:
+                for learner_id in ids:
+                    course_copy = Course.objects.get(pk=course.pk)
+                    learner = User(pk=learner_id)
+                    try:
+                        Booking.objects.reserve(course_copy, learner)
+                        outcome = booked
+                    except ValidationError:
+                        outcome = rejected
+                    except Exception as e:
+                        outcome = errors
+                        learner_id = e
+                    with lock:
+                        outcome.append(learner_id)
+            finally:
+                connection.close()
+
+        chunks = [learner_ids[i::self.workers] for i in range(self.workers)]
+        threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        course.refresh_from_db()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(booked), self.slots_total)
+        self.assertEqual(len(rejected), self.learners_count - self.slots_total)
+        self.assertEqual(course.slots_booked, self.slots_total)
+        self.assertEqual(Booking.objects.filter(course=course).count(), self.slots_total)
+
+
+class WaitlistConcurrencyTests(TransactionTestCase):
+    """Cancellations racing each other must hand each freed slot to exactly one learner."""
+
+    slots_total = 20
+    waiting_count = 30
+    workers = 10
+
+    def test_parallel_cancellations_never_double_promote(self):
+        admin = make_admin()
+        course = make_course(admin, slots_total=self.slots_total)
+        bookings = [
+            Booking.objects.reserve(Course.objects.get(pk=course.pk), learner)
+            for learner in make_learners(self.slots_total, prefix='booked')
+        ]
+        waiting = make_learners(self.waiting_count, prefix='waiting')
+        for learner in waiting:
+            WaitlistEntry.objects.join(course, learner)
+
+        results, errors = [], []
+        lock = threading.Lock()
+        start = threading.Barrier(self.workers)
+
+        def worker(booking_ids):
+            start.wait()
+            try:
+                for booking_id in booking_ids:
+                    # Every booking is cancelled twice, from different threads
+                    try:
+                        cancelled = Booking.objects.get(pk=booking_id).cancel()
+                    except Exception as e:
+                        with lock:
+                            errors.append(e)
+                        continue
+                    with lock:
+                        results.append(cancelled)
+            finally:
+                connection.close()
+
+        ids = [b.pk for b in bookings]
+        chunks = [(ids + ids[::-1])[i::self.workers] for i in range(self.workers)]
+        threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results.count(True), self.slots_total)
+
+        # The first slots_total learners in the queue were promoted, once each
+        promoted = WaitlistEntry.objects.filter(promoted_at__isnull=False)
+        self.assertEqual(
+            sorted(promoted.values_list('learner_id', flat=True)),
+            sorted(u.pk for u in waiting[:self.slots_total])
+        )
+        self.assertEqual(promoted.filter(booking__isnull=False).count(), self.slots_total)
+        live = Booking.objects.filter(course=course, is_cancelled=False)
+        self.assertEqual(live.count(), self.slots_total)
+        self.assertEqual(live.values('learner').distinct().count(), self.slots_total)
+        self.assertEqual(
+            OutboxMessage.objects.filter(template='waitlist_promotion').count(), self.slots_total
+        )
+        course.refresh_from_db()
+        self.assertEqual(course.slots_booked, self.slots_total)
+        self.assertEqual(WaitlistEntry.objects.waiting().count(), self.waiting_count - self.slots_total)
@@ -1,7 +1,17 @@
 from django.urls import path
-from .views import BookingListView, CancelBookingView
+from .views import (
+    BookingListView, BulkBookingView, BulkCancelView, CancelBookingView, ConfirmSeatHoldView, SeatHoldDetailView,
+    SeatHoldListView, WaitlistEntryView, WaitlistListView,
+)
 
 urlpatterns = [
     path('', BookingListView.as_view(), name='booking-list'),
     path('<int:pk>/cancel/', CancelBookingView.as_view(), name='cancel-booking'),
+    path('bulk/', BulkBookingView.as_view(), name='bulk-booking'),
+    path('bulk/cancel/', BulkCancelView.as_view(), name='bulk-cancel'),
+    path('holds/', SeatHoldListView.as_view(), name='seat-holds'),
+    path('holds/<int:pk>/', SeatHoldDetailView.as_view(), name='seat-hold'),
+    path('holds/<int:pk>/confirm/', ConfirmSeatHoldView.as_view(), name='confirm-seat-hold'),
+    path('waitlist/', WaitlistListView.as_view(), name='waitlist'),
+    path('waitlist/<int:pk>/', WaitlistEntryView.as_view(), name='waitlist-entry'),
 ]
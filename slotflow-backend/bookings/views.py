@@ -1,66 +1,256 @@
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import Booking
-from .serializers import BookingSerializer, CancelBookingSerializer
+from .models import Booking, CourseFull, SeatHold, WaitlistEntry
+from .serializers import (
+    BookingSerializer, BulkBookingSerializer, BulkCancelSerializer, CancelBookingSerializer,
+    SeatHoldSerializer, WaitlistEntrySerializer
+)
 from courses.models import Course
-from django.core.mail import send_mail
-from django.conf import settings
-from django.template.loader import render_to_string
+from notifications.models import OutboxMessage
+from core.async_views import AsyncDispatchMixin, AsyncListMixin
+from core.conditional import AsyncConditionalGetMixin
+from core.idempotency import IdempotentMixin
+from accounts.authentication import ClaimsJWTAuthentication
+from accounts.permissions import IsCourseAdmin
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Count, Max, Q
 
-class BookingListView(generics.ListCreateAPIView):
+class BookingListView(AsyncDispatchMixin, IdempotentMixin, AsyncConditionalGetMixin, AsyncListMixin,
+                      generics.ListCreateAPIView):
+    """
+    Learners poll their bookings, so listing runs on the event loop under
+    ASGI (ASYNC_VIEWS). Booking runs in a worker thread: the slot claim, the booking and
+    its outbox email commit in one transaction, which the async ORM can't
+    open, and the email itself is sent later by the outbox worker.
+    """
     serializer_class = BookingSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Booking.objects.filter(learner=self.request.user)
+        queryset = Booking.objects.filter(learner_id=self.request.user.pk)
+        if self.expand_course():
+            queryset = queryset.select_related('course')
+        return queryset
 
-    def perform_create(self, serializer):
-        booking = serializer.save()
-        self.send_booking_email(booking)
+    def expand_course(self):
+        return 'course' in self.request.query_params.get('expand', '').split(',')
 
-    def send_booking_email(self, booking):
-        subject = f"Booking Confirmation: {booking.course.title}"
-        recipient = booking.learner.email
-        
-        # Send to admin
-        admin_subject = f"New Booking: {booking.learner.username} for {booking.course.title}"
-        admin_recipient = booking.course.instructor.email
-        
-        context = {
-            'course': booking.course,
-            'user': booking.learner,
-            'booking_date': booking.booked_at
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand_course'] = self.expand_course()
+        return context
+
+    def validator_aggregates(self):
+        # Bookings only change by being created, cancelled or archived
+        aggregates = {
+            'last_booked': Max('booked_at'),
+            'last_cancelled': Max('cancelled_at'),
+            'count': Count('id'),
+            'archived': Count('id', filter=Q(is_archived=True)),
         }
-        
-        # Learner email
-        send_mail(
-            subject,
-            render_to_string('emails/booking_confirmation.txt', context),
-            settings.DEFAULT_FROM_EMAIL,
-            [recipient],
-            html_message=render_to_string('emails/booking_confirmation.html', context)
+        if self.expand_course():
+            # Embedded summaries also change with the courses themselves
+            aggregates['last_course_update'] = Max('course__updated_at')
+        return aggregates
+
+    def get_validators(self):
+        return self.validators(self.get_queryset().aggregate(**self.validator_aggregates()))
+
+    async def aget_validators(self):
+        return self.validators(await self.get_queryset().aaggregate(**self.validator_aggregates()))
+
+    def validators(self, stats):
+        last_modified = max(
+            filter(None, [
+                stats['last_booked'],
+                stats['last_cancelled'],
+                stats.get('last_course_update'),
+            ]),
+            default=None
         )
-        
-        # Admin email
-        send_mail(
-            admin_subject,
-            render_to_string('emails/admin_booking_notification.txt', context),
-            settings.DEFAULT_FROM_EMAIL,
-            [admin_recipient],
-            html_message=render_to_string('emails/admin_booking_notification.html', context)
+        return last_modified, [self.request.user.pk, stats['count'], stats['archived']]
+
+    async def aget_response(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            self.perform_create(serializer)
+        except CourseFull:
+            # Queue the learner instead of making them retry until a slot frees up
+            return self.join_waitlist(serializer.validated_data['course'])
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def join_waitlist(self, course):
+        try:
+            entry = WaitlistEntry.objects.join(course, self.request.user)
+        except DjangoValidationError as e:
+            raise ValidationError(e.messages)
+        entry = WaitlistEntry.objects.with_position().get(pk=entry.pk)
+        return Response(
+            {
+                "detail": "Course is full, you are on the waitlist",
+                "waitlist": WaitlistEntrySerializer(entry).data,
+            },
+            status=status.HTTP_202_ACCEPTED
         )
 
-class CancelBookingView(generics.GenericAPIView):
+    def perform_create(self, serializer):
+        # Emails are queued with the booking and sent by the outbox worker
+        with transaction.atomic():
+            booking = serializer.save()
+            OutboxMessage.objects.enqueue(booking, 'booking')
+
+
+class BulkBookingView(IdempotentMixin, generics.GenericAPIView):
+    """
+    Enrol a list of learners on a course in one request, for coordinators.
+    Answers with one result per learner.
+    """
+    serializer_class = BulkBookingSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsCourseAdmin]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            with transaction.atomic():
+                results = Booking.objects.reserve_many(
+                    data['course'], data['learners'], partial=data['partial']
+                )
+                booked = [booking.pk for _, outcome, booking in results if booking]
+                OutboxMessage.objects.enqueue_many(booked, 'booking')
+        except DjangoValidationError as e:
+            return Response({"detail": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+        if booked:
+            response_status = status.HTTP_201_CREATED
+        elif data['partial']:
+            response_status = status.HTTP_200_OK
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {
+                "booked": len(booked),
+                "results": [
+                    {"learner": learner_id, "status": outcome, "booking": booking and booking.pk}
+                    for learner_id, outcome, booking in results
+                ],
+            },
+            status=response_status
+        )
+
+
+class BulkCancelView(IdempotentMixin, generics.GenericAPIView):
+    """Cancel a list of learners' bookings on a course in one request."""
+    serializer_class = BulkCancelSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsCourseAdmin]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        with transaction.atomic():
+            results = Booking.objects.cancel_many(data['course'], data['learners'])
+            cancelled = [booking_id for _, outcome, booking_id in results if booking_id]
+            OutboxMessage.objects.enqueue_many(cancelled, 'cancellation')
+
+        return Response(
+            {
+                "cancelled": len(cancelled),
+                "results": [
+                    {"learner": learner_id, "status": outcome, "booking": booking_id}
+                    for learner_id, outcome, booking_id in results
+                ],
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class WaitlistListView(generics.ListAPIView):
+    serializer_class = WaitlistEntrySerializer
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return WaitlistEntry.objects.waiting().filter(learner_id=self.request.user.pk).with_position()
+
+
+class WaitlistEntryView(generics.DestroyAPIView):
+    """Leave a waitlist."""
+    serializer_class = WaitlistEntrySerializer
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return WaitlistEntry.objects.waiting().filter(learner_id=self.request.user.pk)
+
+class SeatHoldListView(IdempotentMixin, generics.ListCreateAPIView):
+    """A learner's seat holds; POST puts a seat on hold while they check out."""
+    serializer_class = SeatHoldSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SeatHold.objects.filter(learner_id=self.request.user.pk)
+
+
+class SeatHoldDetailView(generics.DestroyAPIView):
+    """Release a hold early."""
+    serializer_class = SeatHoldSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SeatHold.objects.filter(learner_id=self.request.user.pk)
+
+    def perform_destroy(self, instance):
+        instance.release()
+
+
+class ConfirmSeatHoldView(IdempotentMixin, generics.GenericAPIView):
+    """Turn a hold into a booking."""
+    serializer_class = BookingSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SeatHold.objects.filter(learner_id=self.request.user.pk)
+
+    def post(self, request, *args, **kwargs):
+        hold = self.get_object()
+        try:
+            with transaction.atomic():
+                booking = hold.confirm()
+                OutboxMessage.objects.enqueue(booking, 'booking')
+        except DjangoValidationError as e:
+            return Response({"detail": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(booking).data, status=status.HTTP_201_CREATED)
+
+
+class CancelBookingView(IdempotentMixin, generics.GenericAPIView):
     queryset = Booking.objects.all()
     serializer_class = CancelBookingSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def patch(self, request, *args, **kwargs):
         booking = self.get_object()
         
         # Verify ownership
-        if booking.learner != request.user:
+        if booking.learner_id != request.user.pk:
             return Response(
                 {"detail": "Not your booking to cancel"},
                 status=status.HTTP_403_FORBIDDEN
@@ -72,46 +262,28 @@ class CancelBookingView(generics.GenericAPIView):
                 {"detail": "Booking already cancelled"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+        if booking.is_archived:
+            return Response(
+                {"detail": "Booking belongs to a past cohort"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        booking.cancel()
-        self.send_cancellation_email(booking)
+        with transaction.atomic():
+            cancelled = booking.cancel()
+            if cancelled:
+                OutboxMessage.objects.enqueue(booking, 'cancellation')
+
+        if not cancelled:
+            return Response(
+                {"detail": "Booking already cancelled"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         return Response(
             {"detail": "Booking cancelled successfully"},
             status=status.HTTP_200_OK
         )
-
-    def send_cancellation_email(self, booking):
-        subject = f"Booking Cancelled: {booking.course.title}"
-        recipient = booking.learner.email
-        
-        # Send to admin
-        admin_subject = f"Booking Cancelled: {booking.learner.username} for {booking.course.title}"
-        admin_recipient = booking.course.instructor.email
-        
-        context = {
-            'course': booking.course,
-            'user': booking.learner,
-            'cancellation_date': booking.cancelled_at
-        }
-        
-        # Learner email
-        send_mail(
-            subject,
-            render_to_string('emails/cancellation_confirmation.txt', context),
-            settings.DEFAULT_FROM_EMAIL,
-            [recipient],
-            html_message=render_to_string('emails/cancellation_confirmation.html', context)
-        )
-        
-        # Admin email
-        send_mail(
-            admin_subject,
-            render_to_string('emails/admin_cancellation_notification.txt', context),
-            settings.DEFAULT_FROM_EMAIL,
-            [admin_recipient],
-            html_message=render_to_string('emails/admin_cancellation_notification.html', context)
-        )
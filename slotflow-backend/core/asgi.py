@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Serve the async-capable views on the event loop (see core.async_views)
+os.environ.setdefault('SLOTFLOW_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
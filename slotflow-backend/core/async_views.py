@@ -0,0 +1,131 @@
+"""
+Async request handling for DRF views.
+
+DRF's ``APIView.dispatch`` is synchronous, so under ASGI every request to a
+DRF view is handed to a worker thread. ``AsyncDispatchMixin`` replaces it with
+a coroutine that awaits a view's ``a<method>`` handlers (``aget()``...)
+directly on the event loop and runs the remaining (sync) handlers in a
+thread, so a view can serve its hot reads asynchronously while its writes
+stay ordinary sync code inside ``transaction.atomic``, which Django only
+offers to sync code.
+
+That only pays off under ASGI. Under WSGI, Django would run every async view
+through ``async_to_sync``, which costs about 15% of its throughput, so the
+views are async only when ``ASYNC_VIEWS`` is on, as ``core/asgi.py`` sets
+it. Otherwise they are plain sync DRF views and the ``a<method>`` handlers
+are never called. Views using the mixin must therefore implement both.
+
+``initial()`` (authentication, permissions, throttling) runs on the event
+loop, so async views must use authentication and permission classes that
+don't query the database, such as ``ClaimsJWTAuthentication``.
+
+``AsyncListMixin`` and ``AsyncRetrieveMixin`` are the async counterparts of
+DRF's ``list()`` and ``retrieve()`` built on the async ORM. Serializers run
+on the loop too, so they must only read fields that are already loaded.
+"""
+from asyncio import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import Http404
+from django.urls import URLResolver, get_resolver
+from django.utils.functional import classproperty
+from rest_framework.response import Response
+
+
+class AsyncDispatchMixin:
+    """
+    Put first in the bases of an ``APIView`` to make it an async view when
+    ``ASYNC_VIEWS`` is on.
+    """
+
+    @classproperty
+    def view_is_async(cls):
+        return settings.ASYNC_VIEWS
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.adispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.initial(request, *args, **kwargs)
+
+            method = request.method.lower()
+            if method in self.http_method_names:
+                handler = getattr(self, f'a{method}', None) or getattr(self, method, self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncListMixin:
+    """``alist()``: DRF's ``list()`` on the async ORM."""
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer([obj async for obj in queryset], many=True)
+        return Response(serializer.data)
+
+
+class AsyncRetrieveMixin:
+    """``aretrieve()``: DRF's ``retrieve()`` on the async ORM."""
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+
+def rebuild_async_views(resolver=None):
+    """
+    Re-create the URLconf's ``AsyncDispatchMixin`` views, whose sync or async
+    kind is fixed when ``as_view()`` runs, after ``ASYNC_VIEWS`` changes.
+    """
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLResolver):
+            rebuild_async_views(pattern)
+        elif issubclass(getattr(pattern.callback, 'view_class', object), AsyncDispatchMixin):
+            view = pattern.callback
+            pattern.callback = view.view_class.as_view(**view.view_initkwargs)
+
+
+@receiver(setting_changed)
+def _async_views_changed(setting, **kwargs):
+    # override_settings(ASYNC_VIEWS=...) in tests and benchmarks
+    if setting == 'ASYNC_VIEWS':
+        rebuild_async_views()
@@ -0,0 +1,112 @@
+"""
+``Idempotency-Key`` support for DRF views.
+
+A client that retries a POST or PATCH with the same ``Idempotency-Key``
+header gets the first response replayed from the cache (status and body,
+plus ``Idempotent-Replayed: true``) without the view running again, so a
+retried booking neither books twice nor fails with "already booked".
+
+Keys are scoped to the user, method and path, and kept for
+``IDEMPOTENCY_KEY_TTL`` seconds. The first request reserves its key with an
+atomic ``cache.add``. A retry that arrives while the first request is still
+running gets ``409``, and reusing a key for a different body gets ``422``.
+Server errors are not stored, so the client can try again with the same
+key. As with the response cache, use a shared cache backend when running
+more than one worker process.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+PENDING = 'pending'
+
+
+class _Replay(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed"
+    default_code = 'idempotency_conflict'
+
+
+class IdempotencyMismatch(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for a different request"
+    default_code = 'idempotency_mismatch'
+
+
+class IdempotentMixin:
+    """Replays the stored response for retried unsafe requests carrying a key."""
+
+    idempotent_methods = ('POST', 'PATCH')
+
+    _idempotency_cache_key = None
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication and permissions first: keys are per user
+        super().initial(request, *args, **kwargs)
+
+        key = request.headers.get(HEADER)
+        if not key or request.method not in self.idempotent_methods:
+            return
+        if len(key) > 255:
+            raise ParseError("Idempotency-Key must be at most 255 characters")
+
+        scope = f'{request.user.pk}:{request.method}:{request.path}:{key}'
+        cache_key = 'idempotency:' + hashlib.sha256(scope.encode()).hexdigest()
+        fingerprint = hashlib.sha256(request._request.body).hexdigest()
+
+        if cache.add(cache_key, (PENDING, fingerprint), settings.IDEMPOTENCY_LOCK_SECONDS):
+            self._idempotency_cache_key = cache_key
+            self._idempotency_fingerprint = fingerprint
+            return
+
+        stored = cache.get(cache_key)
+        if stored is None:
+            # Expired in between; treat it as a conflict rather than run twice
+            raise IdempotencyConflict()
+        if stored[1] != fingerprint:
+            raise IdempotencyMismatch()
+        if stored[0] == PENDING:
+            raise IdempotencyConflict()
+        _, _, status_code, data = stored
+        response = Response(data, status=status_code)
+        response['Idempotent-Replayed'] = 'true'
+        raise _Replay(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _Replay):
+            return exc.response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            self._release_idempotency_key()
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        cache_key = self._idempotency_cache_key
+        if cache_key is not None:
+            self._idempotency_cache_key = None
+            if response.status_code >= 500 or response.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+                cache.delete(cache_key)
+            else:
+                cache.set(
+                    cache_key,
+                    ('done', self._idempotency_fingerprint, response.status_code, response.data),
+                    settings.IDEMPOTENCY_KEY_TTL
+                )
+        return response
+
+    def _release_idempotency_key(self):
+        if self._idempotency_cache_key is not None:
+            cache.delete(self._idempotency_cache_key)
+            self._idempotency_cache_key = None
@@ -1,5 +1,8 @@
 from pathlib import Path
 import os
+from datetime import timedelta
+
+from corsheaders.defaults import default_headers
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -32,6 +35,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so it times everything below; inert unless REQUEST_PROFILING
+    'profiling.middleware.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -69,6 +74,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when the transaction starts so concurrent
+            # bookings queue on the busy timeout instead of failing mid-way
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'TEST': {
+            # File-backed so threaded tests exercise real locking; the
+            # in-memory shared cache fails fast with "table is locked"
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -122,20 +138,106 @@ INSTALLED_APPS += [
     'accounts',
     'courses',
     'bookings',
+    'notifications',
+    'uploads',
+    'profiling',
 ]
 
 AUTH_USER_MODEL = 'accounts.User'
 
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.EmailOrUsernameBackend',
+]
+
+# last_login is written at most this often per user (see User.record_login)
+LAST_LOGIN_UPDATE_INTERVAL = timedelta(minutes=15)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     )
 }
 
+# Course catalogue pagination (?page_size= may ask for up to the max)
+COURSE_PAGE_SIZE = 20
+COURSE_MAX_PAGE_SIZE = 100
+
+# Course search (see courses.search): results per ?q= and the most ?limit= gets
+COURSE_SEARCH_RESULTS = 20
+COURSE_SEARCH_MAX_RESULTS = 100
+
+# Course response cache (see courses.cache). Use a shared backend such as
+# Redis or Memcached when running more than one worker process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+COURSE_CACHE_TIMEOUT = 300
+
+# Serve the hot read views on the event loop (see core.async_views). Only
+# worth it under ASGI, so core/asgi.py turns it on; under WSGI the views stay
+# sync.
+ASYNC_VIEWS = os.getenv('SLOTFLOW_ASYNC_VIEWS') == '1'
+
+# Live slot availability stream (see courses.events). The stream needs an
+# ASGI server (uvicorn core.asgi:application); the in-process broker only
+# reaches streams served by the process that made the change.
+SLOT_EVENTS_BROKER = 'courses.events.InProcessBroker'
+SLOT_EVENTS_MAX_COURSES = 200
+SLOT_EVENTS_HEARTBEAT_SECONDS = 15
+
+# Courses rolled over to their next cohort per transaction (see courses.rollover)
+ROLLOVER_BATCH_SIZE = 5000
+
+# Seat holds (see bookings.SeatHold): how long a learner has to confirm, and
+# how many expired holds the sweeper releases per transaction
+SEAT_HOLD_SECONDS = 300
+SEAT_HOLD_SWEEP_BATCH_SIZE = 1000
+
+# Idempotency-Key replay (see core.idempotency): how long responses are kept
+# for retries, and how long a request in progress holds its key
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_LOCK_SECONDS = 60
+
+# Most learners accepted by one bulk booking or cancellation request
+BULK_BOOKING_MAX_LEARNERS = 1000
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploaded files are stored once per distinct content and reference counted
+# (see uploads.storage); `manage.py collect_blobs` deletes unreferenced ones
+# after the grace period.
+STORAGES = {
+    'default': {
+        'BACKEND': 'uploads.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+BLOB_GC_GRACE_SECONDS = 60 * 60
+
+# Uploads larger than this are streamed to a temporary file instead of memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+
+# Uploaded pictures (see uploads.images). Originals are re-encoded without
+# metadata and capped in size; the variants below are generated in the
+# background, each as JPEG and WebP.
+IMAGE_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+IMAGE_MAX_DIMENSION = 2400
+IMAGE_VARIANTS = {
+    'thumbnail': {'size': (160, 160), 'crop': True},
+    'card': {'size': (640, 360), 'crop': True},
+    'full': {'size': (1600, 1600)},
+}
+IMAGE_JPEG_QUALITY = 82
+IMAGE_WEBP_QUALITY = 80
+IMAGE_PROCESSING_ASYNC = True
+IMAGE_WORKERS = 2
+
 # Email settings (development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
@@ -157,7 +259,7 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    'UPDATE_LAST_LOGIN': False,  # coalesced by User.record_login instead
     
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -176,6 +278,13 @@ SIMPLE_JWT = {
     'TOKEN_BLACKLIST_SERIALIZER': 'rest_framework_simplejwt.serializers.TokenBlacklistSerializer',
 }
 
+# Revoked refresh tokens remembered in-process (see accounts.tokens)
+REVOKED_TOKEN_CACHE_SIZE = 10000
+REVOKED_TOKEN_CACHE_TTL = timedelta(minutes=30)
+
+# Expired tokens deleted per transaction by `python manage.py prune_tokens`
+TOKEN_PRUNE_BATCH_SIZE = 1000
+
 """
 # Email settings for production (uncomment and configure when deploying)
 
@@ -193,7 +302,23 @@ DEFAULT_FROM_EMAIL = 'noreply@slotflow.com'
 DEFAULT_FROM_EMAIL = 'no-reply@slotflow.com'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For testing
 
+# Notification outbox (drained by `python manage.py send_outbox`)
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BACKOFF_SECONDS = 30  # doubled after each failed attempt
+OUTBOX_LEASE_SECONDS = 300
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
 ]
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'Server-Timing']
+
+# Per-request profiling (see profiling/): Server-Timing headers and per-route
+# histograms, shown by `python manage.py profiling_stats` and /api/profiling/.
+# When off, the middleware drops out at startup and nothing is instrumented
+REQUEST_PROFILING = False
+# Each process writes its aggregates here, so every worker is counted
+REQUEST_PROFILING_DIR = BASE_DIR / 'profiling-stats'
+REQUEST_PROFILING_FLUSH_SECONDS = 10
@@ -0,0 +1,52 @@
+"""
+Fixtures shared by the apps' tests.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from accounts.models import User
+from accounts.serializers import CustomTokenObtainPairSerializer
+from courses.models import Course
+
+
+def make_admin(username='admin', **kwargs):
+    return User.objects.create(
+        username=username, email=f'{username}@slotflow.com', is_admin=True, is_learner=False, **kwargs
+    )
+
+
+def make_learner(username='learner', **kwargs):
+    return User.objects.create(username=username, email=f'{username}@slotflow.com', **kwargs)
+
+
+def make_learners(count, prefix='learner'):
+    return User.objects.bulk_create([
+        User(username=f'{prefix}{i}', email=f'{prefix}{i}@slotflow.com')
+        for i in range(count)
+    ])
+
+
+def make_course(instructor, **kwargs):
+    """An active course starting next week, with ``kwargs`` overriding the defaults."""
+    today = timezone.now().date()
+    defaults = {
+        'title': 'Carpentry',
+        'description': 'Wood joinery',
+        'instructor': instructor,
+        'start_date': today + timedelta(days=7),
+        'end_date': today + timedelta(days=14),
+        'duration_hours': 30,
+        'slots_total': 10,
+    }
+    defaults.update(kwargs)
+    return Course.objects.create(**defaults)
+
+
+def bearer(user):
+    """``Authorization`` header value with an access token carrying ``user``'s claims."""
+    return f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'
+
+
+def authenticate(client, user):
+    client.credentials(HTTP_AUTHORIZATION=bearer(user))
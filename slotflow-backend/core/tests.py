@@ -0,0 +1,225 @@
+"""
+Query and payload budgets for the API endpoints.
+
+Each endpoint is called against a realistically sized dataset and must stay
+within a fixed number of queries and response bytes. A change that adds a
+query per row (an N+1 in a serializer, say) or bloats a payload fails here,
+listing the queries it ran. When an increase is intended, raise the budget
+in the same change so the cost is visible in review.
+
+Responses are measured cold (empty cache) so cached endpoints are held to
+their miss path. The savepoints TestCase turns transactions into are not
+counted, as they don't exist outside tests.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from bookings.models import Booking, WaitlistEntry
+from core.testing import authenticate, make_admin
+from courses.models import Course, CourseLanguage
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+PASSWORD = 'Learner@1234'
+
+COURSES = 300
+LEARNERS = 200
+BOOKINGS_PER_LEARNER = 25
+
+# endpoint: (max queries, max response bytes). Byte budgets leave ~10% for
+# ids and timestamps growing; query budgets are exact
+BUDGETS = {
+    'course list': (2, 9100),
+    'course list (page_size=100)': (2, 45100),
+    'active course list': (2, 9100),
+    'active course list (filters, facets)': (7, 9600),
+    'inactive course list': (2, 600),
+    'course detail': (2, 450),
+    'course search': (2, 9000),
+    'course create': (6, 400),
+    'course update': (5, 450),
+    'booking list': (2, 4150),
+    'booking list (expand=course)': (2, 7150),
+    'booking create': (8, 200),
+    'booking create (waitlisted)': (10, 200),
+    'booking cancel': (6, 50),
+    'waitlist list': (1, 100),
+    'seat hold': (8, 150),
+    'seat hold confirm': (8, 200),
+    'bulk booking (50 learners)': (9, 2700),
+    'bulk cancel (50 learners)': (7, 2850),
+    'login': (3, 850),
+    'token refresh': (8, 850),
+    'me': (1, 200),
+    'register': (6, 150),
+}
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class EndpointBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.now().date()
+        cls.admin = make_admin(is_staff=True)
+        template = User()
+        template.set_password(PASSWORD)
+        cls.learners = User.objects.bulk_create([
+            User(username=f'learner{i}', email=f'learner{i}@slotflow.com', password=template.password)
+            for i in range(LEARNERS)
+        ])
+        CourseLanguage.objects.index(Course.objects.bulk_create([
+            Course(
+                title=f'Course {i}',
+                description='Hands-on vocational training with a qualified instructor',
+                instructor=cls.admin,
+                start_date=today + timedelta(days=7 + i % 60),
+                end_date=today + timedelta(days=14 + i % 60),
+                duration_hours=10 + i % 50,
+                languages=['English'],
+                slots_total=LEARNERS,
+                is_active=i % 10 != 0,
+            )
+            for i in range(COURSES)
+        ]), replace=False)
+        cls.courses = list(Course.objects.filter(is_active=True).order_by('id'))
+        for course in cls.courses[:BOOKINGS_PER_LEARNER]:
+            Booking.objects.reserve_many(course, [learner.pk for learner in cls.learners])
+        cls.learner = cls.learners[0]
+        cls.full_course = Course.objects.create(
+            title='Full', description='No seats left', instructor=cls.admin,
+            start_date=today + timedelta(days=7), end_date=today + timedelta(days=14),
+            duration_hours=8, slots_total=1
+        )
+        Booking.objects.reserve(cls.full_course, cls.learners[1])
+        WaitlistEntry.objects.join(cls.full_course, cls.learners[2])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def assertWithinBudget(self, endpoint, request, status_code=200):
+        max_queries, max_bytes = BUDGETS[endpoint]
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        self.assertEqual(response.status_code, status_code, f'{endpoint}: {response.content[:500]}')
+
+        executed = [
+            query['sql'] for query in queries.captured_queries
+            if not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        ]
+        self.assertLessEqual(
+            len(executed), max_queries,
+            f'{endpoint} ran {len(executed)} queries, budget is {max_queries}:\n' + '\n'.join(
+                f'{i}. {sql}' for i, sql in enumerate(executed, start=1)
+            )
+        )
+        size = len(response.content)
+        self.assertLessEqual(size, max_bytes, f'{endpoint} returned {size} bytes, budget is {max_bytes}')
+        return response
+
+    def test_course_lists(self):
+        response = self.assertWithinBudget('course list', lambda: self.client.get('/api/courses/'))
+        self.assertEqual(len(response.data['results']), 20)
+        response = self.assertWithinBudget(
+            'course list (page_size=100)', lambda: self.client.get('/api/courses/?page_size=100')
+        )
+        self.assertEqual(len(response.data['results']), 100)
+        self.assertWithinBudget('active course list', lambda: self.client.get('/api/courses/active/'))
+        response = self.assertWithinBudget('active course list (filters, facets)', lambda: self.client.get(
+            '/api/courses/active/?has_free_slots=true&max_hours=40&facets=true'
+        ))
+        self.assertIn('facets', response.data)
+
+        authenticate(self.client, self.admin)
+        self.assertWithinBudget('inactive course list', lambda: self.client.get('/api/courses/inactive/?page_size=1'))
+
+    def test_course_search(self):
+        response = self.assertWithinBudget('course search', lambda: self.client.get('/api/courses/search/?q=course'))
+        self.assertEqual(len(response.data), 20)
+
+    def test_course_detail(self):
+        self.assertWithinBudget('course detail', lambda: self.client.get(f'/api/courses/{self.courses[0].pk}/'))
+
+    def test_course_writes(self):
+        authenticate(self.client, self.admin)
+        today = timezone.now().date()
+        response = self.assertWithinBudget('course create', lambda: self.client.post('/api/courses/', {
+            'title': 'Bricklaying', 'description': 'Walls', 'duration_hours': 12, 'slots_total': 8,
+            'languages': ['English', 'Welsh'],
+            'start_date': today + timedelta(days=10), 'end_date': today + timedelta(days=20),
+        }), status_code=201)
+        self.assertWithinBudget('course update', lambda: self.client.patch(
+            f"/api/courses/{response.data['id']}/", {'title': 'Bricklaying II'}
+        ))
+
+    def test_booking_lists(self):
+        authenticate(self.client, self.learner)
+        response = self.assertWithinBudget('booking list', lambda: self.client.get('/api/bookings/'))
+        self.assertEqual(len(response.data), BOOKINGS_PER_LEARNER)
+        self.assertWithinBudget(
+            'booking list (expand=course)', lambda: self.client.get('/api/bookings/?expand=course')
+        )
+        authenticate(self.client, self.learners[2])
+        self.assertWithinBudget('waitlist list', lambda: self.client.get('/api/bookings/waitlist/'))
+
+    def test_booking_create_and_cancel(self):
+        authenticate(self.client, self.learner)
+        course = self.courses[-1]
+        response = self.assertWithinBudget(
+            'booking create', lambda: self.client.post('/api/bookings/', {'course': course.pk}), status_code=201
+        )
+        self.assertWithinBudget('booking cancel', lambda: self.client.patch(
+            f"/api/bookings/{response.data['id']}/cancel/", {'confirm': True}
+        ))
+        self.assertWithinBudget(
+            'booking create (waitlisted)',
+            lambda: self.client.post('/api/bookings/', {'course': self.full_course.pk}),
+            status_code=202
+        )
+
+    def test_seat_hold_and_confirm(self):
+        authenticate(self.client, self.learner)
+        response = self.assertWithinBudget(
+            'seat hold', lambda: self.client.post('/api/bookings/holds/', {'course': self.courses[-1].pk}),
+            status_code=201
+        )
+        self.assertWithinBudget(
+            'seat hold confirm',
+            lambda: self.client.post(f"/api/bookings/holds/{response.data['id']}/confirm/"),
+            status_code=201
+        )
+
+    def test_bulk_booking(self):
+        authenticate(self.client, self.admin)
+        payload = {'course': self.courses[-1].pk, 'learners': [learner.pk for learner in self.learners[:50]]}
+        self.assertWithinBudget(
+            'bulk booking (50 learners)',
+            lambda: self.client.post('/api/bookings/bulk/', payload, format='json'),
+            status_code=201
+        )
+        self.assertWithinBudget(
+            'bulk cancel (50 learners)',
+            lambda: self.client.post('/api/bookings/bulk/cancel/', payload, format='json')
+        )
+
+    def test_auth(self):
+        response = self.assertWithinBudget('login', lambda: self.client.post(
+            '/api/auth/token/', {'username': self.learner.email, 'password': PASSWORD}
+        ))
+        self.assertWithinBudget('token refresh', lambda: self.client.post(
+            '/api/auth/token/refresh/', {'refresh': response.data['refresh']}
+        ))
+        authenticate(self.client, self.learner)
+        self.assertWithinBudget('me', lambda: self.client.get('/api/auth/me/'))
+
+        self.client.credentials()
+        self.assertWithinBudget('register', lambda: self.client.post('/api/auth/register/', {
+            'username': 'newcomer', 'email': 'newcomer@slotflow.com',
+            'password': PASSWORD, 'password2': PASSWORD, 'role': 'learner',
+        }), status_code=201)
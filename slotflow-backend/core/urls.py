@@ -8,4 +8,5 @@ urlpatterns = [
     path('api/auth/', include('accounts.urls')),
     path('api/courses/', include('courses.urls')),
     path('api/bookings/', include('bookings.urls')),
+    path('api/profiling/', include('profiling.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
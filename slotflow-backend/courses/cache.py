@@ -0,0 +1,205 @@
+"""
+Versioned response cache for the public course endpoints.
+
+Cached bodies are never invalidated directly. Instead every key embeds a
+version counter, and writers bump the counter so the next read misses:
+
+* the catalogue version covers every course list,
+* each course has its own version for its detail response,
+* the generation covers everything and is bumped by bulk updates that touch
+  many courses at once.
+
+Counters are bumped once immediately and again when the surrounding
+transaction commits, so a reader that raced the write and cached the old row
+under the new version is discarded as well.
+
+Version counters live in the configured cache, so multi-process deployments
+need a shared backend (Redis, Memcached, database) for invalidations to reach
+every worker; the default locmem cache is only coherent within one process.
+"""
+import hashlib
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.response import Response
+
+GENERATION_KEY = 'courses:generation'
+CATALOGUE_VERSION_KEY = 'courses:catalogue:version'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def course_version_key(pk):
+    return f'courses:course:{pk}:version'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Missing or evicted counter: start a fresh one
+        cache.add(key, 1, timeout=None)
+
+
+def _bump_now_and_on_commit(*keys):
+    def bump_all():
+        for key in keys:
+            bump(key)
+
+    bump_all()
+    transaction.on_commit(bump_all)
+
+
+def invalidate_course(pk):
+    """Call whenever a course row (including its slot counters) changes."""
+    from .events import slots_changed
+
+    _bump_now_and_on_commit(course_version_key(pk), CATALOGUE_VERSION_KEY)
+    # Open availability streams watching this course get its new counts
+    slots_changed(pk)
+
+
+@receiver(post_delete, sender='courses.Course')
+def _course_deleted(sender, instance, **kwargs):
+    # Queryset deletes and cascades (from an instructor...) skip Course.delete()
+    invalidate_course(instance.pk)
+
+
+def invalidate_all():
+    """Call after bulk updates that may touch any number of courses."""
+    _bump_now_and_on_commit(GENERATION_KEY, CATALOGUE_VERSION_KEY)
+
+
+def record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def cache_stats():
+    with _stats_lock:
+        return {'hits': _stats['hit'], 'misses': _stats['miss']}
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _response_key(request, versions):
+    # The absolute URL is part of the key because bodies contain absolute
+    # media and pagination links
+    url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return 'courses:response:{}:{}'.format(
+        ':'.join(str(v) for v in versions),
+        url_hash
+    )
+
+
+def _hit(data):
+    record('hit')
+    response = Response(data)
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+def _store(key, response):
+    if response.status_code == 200:
+        cache.set(key, response.data, settings.COURSE_CACHE_TIMEOUT)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def cached_response(request, versions, build):
+    """Serve ``build()``'s response data from the cache under ``versions``."""
+    key = _response_key(request, versions)
+    data = cache.get(key)
+    if data is not None:
+        return _hit(data)
+
+    record('miss')
+    return _store(key, build())
+
+
+async def acached_response(request, versions, build):
+    """
+    ``cached_response`` for async views, where ``build`` is a coroutine
+    function. Cache calls stay synchronous: Django's built-in backends only
+    implement the async cache API by running the sync call in a thread, which
+    costs more than the in-memory lookup itself.
+    """
+    key = _response_key(request, versions)
+    data = cache.get(key)
+    if data is not None:
+        return _hit(data)
+
+    record('miss')
+    return _store(key, await build())
+
+def _list_versions():
+    return (
+        get_version(GENERATION_KEY),
+        get_version(CATALOGUE_VERSION_KEY),
+        # Facet date windows count from today, so lists expire at midnight
+        timezone.now().date().isoformat(),
+    )
+
+class CachedListMixin:
+    """Cache list responses until any course changes."""
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, ('list',) + _list_versions(),
+            lambda: super(CachedListMixin, self).list(request, *args, **kwargs)
+        )
+
+class AsyncCachedListMixin(CachedListMixin):
+    """``CachedListMixin`` for async-capable views; also caches ``alist()``."""
+
+    async def aget_response(self, request, *args, **kwargs):
+        return await acached_response(
+            request, ('list',) + _list_versions(),
+            lambda: self.alist(request, *args, **kwargs)
+        )
+
+class CachedRetrieveMixin:
+    """Cache detail responses until that course changes."""
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        versions = (
+            get_version(GENERATION_KEY),
+            get_version(course_version_key(pk)),
+        )
+        return cached_response(
+            request, ('detail', pk) + versions,
+            lambda: super(CachedRetrieveMixin, self).retrieve(request, *args, **kwargs)
+        )
+
+class AsyncCachedRetrieveMixin(CachedRetrieveMixin):
+    """``CachedRetrieveMixin`` for async-capable views; also caches ``aretrieve()``."""
+
+    async def aget_response(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        versions = (
+            get_version(GENERATION_KEY),
+            get_version(course_version_key(pk)),
+        )
+        return await acached_response(
+            request, ('detail', pk) + versions,
+            lambda: self.aretrieve(request, *args, **kwargs)
+        )
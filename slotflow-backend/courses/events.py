@@ -0,0 +1,103 @@
+"""
+Live slot availability for the course stream (see courses.views.course_events).
+
+Whenever a course's slot counters change, its id is handed to
+``slots_changed`` (``invalidate_course`` does this for every write). Once the
+transaction commits, the current counts of the courses somebody is watching
+are read in one query and published to the broker, which fans them out to
+the open event streams. Courses nobody watches cost nothing.
+
+The broker is pluggable through ``SLOT_EVENTS_BROKER``. The default
+``InProcessBroker`` only reaches streams served by the same process as the
+write, which fits a single ASGI server. Several processes need a broker
+backed by a shared channel, such as Redis pub/sub, that implements the same
+three methods.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+SLOT_FIELDS = ('id', 'slots_total', 'slots_booked', 'slots_held')
+
+
+class InProcessBroker:
+    """
+    Fans events out to asyncio subscribers in this process. ``publish`` may
+    be called from any thread, typically a sync request or worker thread.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        # course id -> {queue: event loop that owns it}
+        self._subscribers = defaultdict(dict)
+
+    def subscribe(self, course_ids):
+        """Return a queue receiving the events of ``course_ids``; call from the loop."""
+        queue = asyncio.Queue(self.queue_size)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for course_id in course_ids:
+                self._subscribers[course_id][queue] = loop
+        return queue
+
+    def unsubscribe(self, queue, course_ids):
+        with self._lock:
+            for course_id in course_ids:
+                subscribers = self._subscribers.get(course_id)
+                if subscribers is not None:
+                    subscribers.pop(queue, None)
+                    if not subscribers:
+                        del self._subscribers[course_id]
+
+    def watched(self, course_ids):
+        """The subset of ``course_ids`` with at least one subscriber."""
+        with self._lock:
+            return [course_id for course_id in course_ids if course_id in self._subscribers]
+
+    def publish(self, event):
+        with self._lock:
+            targets = list(self._subscribers.get(event['id'], {}).items())
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                pass  # The stream's loop has closed; it unsubscribes on its way out
+
+
+def _offer(queue, event):
+    # A stream that can't keep up skips events; the next one carries the
+    # current counts anyway
+    if not queue.full():
+        queue.put_nowait(event)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.SLOT_EVENTS_BROKER)()
+
+
+def slot_event(row):
+    return {**row, 'is_full': row['slots_booked'] + row['slots_held'] >= row['slots_total']}
+
+
+def publish_slots(course_ids):
+    """Publish the current counts of the watched courses among ``course_ids``."""
+    from .models import Course
+
+    broker = get_broker()
+    watched = broker.watched(course_ids)
+    if not watched:
+        return
+    for row in Course.objects.filter(pk__in=watched).values(*SLOT_FIELDS):
+        broker.publish(slot_event(row))
+
+
+def slots_changed(*course_ids):
+    """Call whenever slot counters change; publishes once the transaction commits."""
+    transaction.on_commit(lambda: publish_slots(course_ids))
@@ -0,0 +1,170 @@
+"""
+Query parameters accepted by the course lists, and their facet counts.
+
+    /api/courses/active/?start_from=2026-11-01&start_to=2026-11-30&max_hours=40&has_free_slots=true
+
+Every filter runs in the database. ``?facets=true`` adds counts for the
+filtered courses to the response, so a filter sidebar can show how many
+results each choice leaves without fetching them:
+
+    "facets": {
+        "has_free_slots": 212,
+        "start_date": {"next_7_days": 40, "next_30_days": 180, "next_90_days": 301},
+        "duration_hours": {"under_10": 12, "10_to_19": 95, "20_to_39": 150, "40_plus": 44},
+        "instructor": [{"instructor": 3, "username": "dana", "count": 120}, ...],
+        "cohort": [{"cohort_number": 1, "count": 280}, ...],
+        "language": [{"language": "english", "count": 290}, ...]
+    }
+
+Counts describe the courses matching the current filters, across all pages.
+The scalar counts come from a single aggregate query, each list from one
+GROUP BY and the instructor names from one more lookup, so facets cost five
+queries whatever the catalogue size. Their time grows with the number of
+matching courses, though, so an unfiltered catalogue is the slowest case.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from accounts.models import User
+from .models import CourseLanguage
+
+# Seats on hold count as taken, as in Course.is_full()
+FREE_SLOTS = Q(slots_booked__lt=F('slots_total') - F('slots_held'))
+
+START_WINDOWS = {'next_7_days': 7, 'next_30_days': 30, 'next_90_days': 90}
+DURATION_BUCKETS = {
+    'under_10': (None, 10),
+    '10_to_19': (10, 20),
+    '20_to_39': (20, 40),
+    '40_plus': (40, None),
+}
+# Longest facet lists returned, most common values first
+FACET_VALUES = 20
+
+
+class CourseFilterSerializer(serializers.Serializer):
+    """Validates the filter query parameters of the course lists."""
+    language = serializers.CharField(required=False, allow_blank=True)
+    start_from = serializers.DateField(required=False)
+    start_to = serializers.DateField(required=False)
+    end_from = serializers.DateField(required=False)
+    end_to = serializers.DateField(required=False)
+    min_hours = serializers.IntegerField(required=False, min_value=0)
+    max_hours = serializers.IntegerField(required=False, min_value=0)
+    instructor = serializers.IntegerField(required=False)
+    cohort = serializers.IntegerField(required=False, min_value=1)
+    has_free_slots = serializers.BooleanField(required=False, allow_null=True)
+    facets = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        errors = {}
+        for low, high in (('start_from', 'start_to'), ('end_from', 'end_to'), ('min_hours', 'max_hours')):
+            if data.get(low) is not None and data.get(high) is not None and data[low] > data[high]:
+                errors[high] = [f"Must not be before {low}"]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
+
+
+def filter_courses(queryset, filters):
+    """Apply validated ``CourseFilterSerializer`` data to ``queryset``."""
+    language = filters.get('language', '').strip()
+    if language:
+        queryset = queryset.taught_in(language)
+
+    lookups = {
+        'start_date__gte': filters.get('start_from'),
+        'start_date__lte': filters.get('start_to'),
+        'end_date__gte': filters.get('end_from'),
+        'end_date__lte': filters.get('end_to'),
+        'duration_hours__gte': filters.get('min_hours'),
+        'duration_hours__lte': filters.get('max_hours'),
+        'instructor_id': filters.get('instructor'),
+        'cohort_number': filters.get('cohort'),
+    }
+    queryset = queryset.filter(**{lookup: value for lookup, value in lookups.items() if value is not None})
+
+    if filters.get('has_free_slots') is True:
+        queryset = queryset.filter(FREE_SLOTS)
+    elif filters.get('has_free_slots') is False:
+        queryset = queryset.exclude(FREE_SLOTS)
+    return queryset
+
+
+def _range(field, low, high):
+    q = Q()
+    if low is not None:
+        q &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        q &= Q(**{f'{field}__lt': high})
+    return q
+
+
+def _facet_queries(queryset):
+    """The aggregate and GROUP BY querysets behind ``facet_counts``."""
+    queryset = queryset.order_by()
+    today = timezone.now().date()
+    aggregates = {'has_free_slots': Count('pk', filter=FREE_SLOTS)}
+    for name, days in START_WINDOWS.items():
+        aggregates[f'start_date:{name}'] = Count(
+            'pk', filter=Q(start_date__gte=today, start_date__lte=today + timedelta(days=days))
+        )
+    for name, (low, high) in DURATION_BUCKETS.items():
+        aggregates[f'duration_hours:{name}'] = Count('pk', filter=_range('duration_hours', low, high))
+
+    groups = {
+        # Usernames are added afterwards: joining users here makes SQLite
+        # probe the courses of every user instead of grouping one scan
+        'instructor': (
+            queryset.values('instructor')
+            .annotate(count=Count('pk')).order_by('-count', 'instructor')[:FACET_VALUES]
+        ),
+        'cohort': (
+            queryset.values('cohort_number')
+            .annotate(count=Count('pk')).order_by('-count', 'cohort_number')[:FACET_VALUES]
+        ),
+        'language': (
+            CourseLanguage.objects.filter(course__in=queryset.values('pk')).values('language')
+            .annotate(count=Count('pk')).order_by('-count', 'language')[:FACET_VALUES]
+        ),
+    }
+    return queryset, aggregates, groups
+
+
+def _usernames(rows):
+    return User.objects.filter(pk__in=[row['instructor'] for row in rows]).values_list('pk', 'username')
+
+
+def _facets(counts, groups, usernames):
+    usernames = dict(usernames)
+    for row in groups['instructor']:
+        row['username'] = usernames.get(row['instructor'])
+    facets = {}
+    for key, count in counts.items():
+        if ':' in key:
+            facet, value = key.split(':')
+            facets.setdefault(facet, {})[value] = count
+        else:
+            facets[key] = count
+    facets.update(groups)
+    return facets
+
+
+def facet_counts(queryset):
+    """Facet counts for the courses in ``queryset`` (see the module docstring)."""
+    queryset, aggregates, groups = _facet_queries(queryset)
+    groups = {facet: list(rows) for facet, rows in groups.items()}
+    return _facets(queryset.aggregate(**aggregates), groups, _usernames(groups['instructor']))
+
+
+async def afacet_counts(queryset):
+    """``facet_counts`` on the async ORM."""
+    queryset, aggregates, groups = _facet_queries(queryset)
+    groups = {facet: [row async for row in rows] for facet, rows in groups.items()}
+    return _facets(
+        await queryset.aaggregate(**aggregates), groups,
+        [row async for row in _usernames(groups['instructor'])]
+    )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from courses.search import rebuild_index
+
+class Command(BaseCommand):
+    help = "Recreate the course full-text search index from the course table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default='default',
+            help="Database to rebuild the index in"
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        with transaction.atomic(using=options['database']):
+            rebuild_index(connection)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the course search index ({connection.vendor})"))
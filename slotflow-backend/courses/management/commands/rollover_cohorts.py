@@ -0,0 +1,45 @@
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from courses.rollover import rollover_expired_courses
+
+class Command(BaseCommand):
+    help = "Roll courses whose end date has passed over to their next cohort"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ROLLOVER_BATCH_SIZE,
+            help="Courses rolled over per transaction"
+        )
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            default=None,
+            help="Treat this day (YYYY-MM-DD) as today"
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help="Keep running instead of exiting after one pass"
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=3600.0,
+            help="Seconds to sleep between passes when --loop is set"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            rolled = rollover_expired_courses(options['date'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Rolled over {rolled} course(s) in {time.perf_counter() - started:.2f}s"
+            ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
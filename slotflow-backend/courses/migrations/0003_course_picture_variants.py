@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_course_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='course_picture_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
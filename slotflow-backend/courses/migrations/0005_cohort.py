@@ -0,0 +1,68 @@
+# Generated by Django 5.2.3 on 2026-10-17 20:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def create_current_cohorts(apps, schema_editor):
+    """Record every course's running cohort and point the course at it."""
+    Course = apps.get_model('courses', 'Course')
+    Cohort = apps.get_model('courses', 'Cohort')
+
+    courses = Course.objects.values_list(
+        'id', 'cohort_number', 'start_date', 'end_date', 'slots_total'
+    )
+    batch = []
+    for course_id, number, start_date, end_date, slots_total in courses.iterator(chunk_size=5000):
+        batch.append(Cohort(
+            course_id=course_id, number=number,
+            start_date=start_date, end_date=end_date, slots_total=slots_total
+        ))
+        if len(batch) == 5000:
+            Cohort.objects.bulk_create(batch)
+            batch = []
+    Cohort.objects.bulk_create(batch)
+
+    Course.objects.update(current_cohort=Subquery(
+        Cohort.objects.filter(
+            course=OuterRef('pk'), number=OuterRef('cohort_number')
+        ).values('pk')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_course_rollover'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cohort',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.IntegerField()),
+                ('start_date', models.DateField(blank=True, null=True)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('slots_total', models.IntegerField()),
+                ('slots_booked', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cohorts', to='courses.course')),
+            ],
+            options={
+                'ordering': ['course', 'number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='current_cohort',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.cohort'),
+        ),
+        migrations.AddConstraint(
+            model_name='cohort',
+            constraint=models.UniqueConstraint(fields=('course', 'number'), name='cohort_unique_number'),
+        ),
+        migrations.RunPython(create_current_cohorts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_cohort'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='slots_held',
+            field=models.IntegerField(default=0),
+        ),
+    ]
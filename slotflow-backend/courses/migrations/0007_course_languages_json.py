@@ -0,0 +1,91 @@
+# Generated by Django 5.2.3 on 2026-10-17 21:53
+
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def parse_languages(text):
+    """The list a stored JSON string held; malformed values become lists too."""
+    try:
+        value = json.loads(text or '[]')
+    except ValueError:
+        # Typed in by hand, e.g. 'English, Welsh'
+        value = text.split(',')
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [str(name).strip() for name in value if str(name).strip()]
+
+
+def copy_languages(apps, schema_editor):
+    """Decode every course's languages and build the language index."""
+    Course = apps.get_model('courses', 'Course')
+    CourseLanguage = apps.get_model('courses', 'CourseLanguage')
+
+    courses, index = [], []
+    for course_id, text in Course.objects.values_list('id', 'languages').iterator(chunk_size=BATCH_SIZE):
+        names = parse_languages(text)
+        courses.append(Course(id=course_id, languages_list=names))
+        index.extend(
+            CourseLanguage(course_id=course_id, language=language)
+            for language in sorted({name.casefold()[:50] for name in names})
+        )
+        if len(courses) == BATCH_SIZE:
+            Course.objects.bulk_update(courses, ['languages_list'])
+            CourseLanguage.objects.bulk_create(index)
+            courses, index = [], []
+    Course.objects.bulk_update(courses, ['languages_list'])
+    CourseLanguage.objects.bulk_create(index)
+
+
+def restore_languages(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+
+    courses = []
+    for course_id, names in Course.objects.values_list('id', 'languages_list').iterator(chunk_size=BATCH_SIZE):
+        courses.append(Course(id=course_id, languages=json.dumps(names)))
+        if len(courses) == BATCH_SIZE:
+            Course.objects.bulk_update(courses, ['languages'])
+            courses = []
+    Course.objects.bulk_update(courses, ['languages'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_course_slots_held'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='languages_list',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='CourseLanguage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=50)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='language_index', to='courses.course')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('language', 'course'), name='course_language_unique')],
+            },
+        ),
+        migrations.RunPython(copy_languages, restore_languages),
+        migrations.RemoveField(
+            model_name='course',
+            name='languages',
+        ),
+        migrations.RenameField(
+            model_name='course',
+            old_name='languages_list',
+            new_name='languages',
+        ),
+    ]
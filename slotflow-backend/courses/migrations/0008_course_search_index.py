@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-17 22:20
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from courses.search import create_index
+    create_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from courses.search import drop_index
+    drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_course_languages_json'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
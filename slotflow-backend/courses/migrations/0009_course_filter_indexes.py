@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-17 22:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_course_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='courselanguage',
+            name='course',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='language_index', to='courses.course'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['start_date', 'is_active', 'duration_hours', 'created_at'], name='course_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['instructor', '-created_at', '-id', 'is_active'], name='course_instructor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='courselanguage',
+            index=models.Index(fields=['course', 'language'], name='course_language_course_idx'),
+        ),
+    ]
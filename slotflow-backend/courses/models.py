@@ -1,45 +1,271 @@
-from django.db import models
-from django.contrib.postgres.fields import ArrayField
+from django.db import models, transaction
+from django.db.models import F
 from accounts.models import User
 from django.utils import timezone
-import json
+from uploads.images import register_picture
+from .cache import invalidate_course
+
+
+# Only ever written by conditional UPDATEs (bookings, holds and the cohort
+# rollover), so saving a course read before one of them must leave them be
+COUNTER_FIELDS = frozenset({'slots_booked', 'slots_held', 'current_cohort', 'cohort_number'})
+
+
+def language_key(name):
+    """How a language is matched: ``' english'`` finds courses in ``'English'``."""
+    return name.strip().casefold()[:50]
+
+
+class CourseQuerySet(models.QuerySet):
+    def _with_free_slots(self, count):
+        # Seats on hold count as taken until they are confirmed or released
+        return self.filter(
+            is_active=True,
+            slots_booked__lte=F('slots_total') - F('slots_held') - count
+        )
+
+    def claim_slots(self, count=1):
+        """
+        Atomically take ``count`` slots on the matching active courses.
+
+        The capacity check and the increment happen in one conditional UPDATE,
+        so concurrent callers can never push ``slots_booked`` (plus the seats
+        on hold) past ``slots_total``. Returns the number of courses that were
+        updated.
+        """
+        return self._with_free_slots(count).update(
+            slots_booked=F('slots_booked') + count,
+            updated_at=timezone.now()
+        )
+
+    def release_slots(self, count=1):
+        """Atomically hand ``count`` slots back on the matching courses."""
+        return self.filter(
+            slots_booked__gte=count
+        ).update(
+            slots_booked=F('slots_booked') - count,
+            updated_at=timezone.now()
+        )
+
+    def hold_slots(self, count=1):
+        """Like ``claim_slots``, but puts the seats on hold (see bookings.SeatHold)."""
+        return self._with_free_slots(count).update(
+            slots_held=F('slots_held') + count,
+            updated_at=timezone.now()
+        )
+
+    def release_held_slots(self, count=1):
+        """Atomically give up ``count`` held seats on the matching courses."""
+        return self.filter(
+            slots_held__gte=count
+        ).update(
+            slots_held=F('slots_held') - count,
+            updated_at=timezone.now()
+        )
+
+    def taught_in(self, language):
+        """Courses with ``language`` among their languages, matched in the database."""
+        return self.filter(language_index__language=language_key(language))
+
+    def search(self, text, limit=20):
+        """
+        The ``limit`` active courses best matching ``text``, best first, using
+        the database's full-text index (see courses.search).
+        """
+        from .search import ranked_ids
+
+        ids = ranked_ids(self, text, limit)
+        courses = self.in_bulk(ids) if ids else {}
+        return [courses[pk] for pk in ids if pk in courses]
 
 class Course(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     instructor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='courses')
-    start_date = models.DateField()
-    end_date = models.DateField()
+    # Both cleared when the cohort rolls over (see courses.rollover) until
+    # the next cohort is scheduled
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
     duration_hours = models.IntegerField()
-    #languages = ArrayField(models.CharField(max_length=50), blank=True, default=list)
-    languages = models.TextField(blank=True, default='[]')  # Store JSON string
+    # Names as entered, in order; CourseLanguage indexes them for filtering
+    languages = models.JSONField(blank=True, default=list)
     cohort_number = models.IntegerField(default=1)
+    # The running cohort; its bookings are the ones slots_booked counts
+    current_cohort = models.ForeignKey(
+        'Cohort', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+', editable=False
+    )
     course_picture = models.ImageField(upload_to='course_pics/', null=True, blank=True)
+    # Resized copies of course_picture, filled in by uploads.images
+    course_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     slots_total = models.IntegerField()
     slots_booked = models.IntegerField(default=0)
+    # Seats on unexpired or not yet swept holds (see bookings.SeatHold)
+    slots_held = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CourseQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.title} (Cohort {self.cohort_number})"
 
-    def get_languages(self):
-        return json.loads(self.languages)
-
-    def set_languages(self, lang_list):
-        self.languages = json.dumps(lang_list)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets save() skip the language index when the list hasn't changed
+        # (a copy, so changes made in place are noticed too)
+        if 'languages' in instance.__dict__:
+            instance._saved_languages = list(instance.languages)
+        return instance
 
     def is_full(self):
-        return self.slots_booked >= self.slots_total
+        return self.slots_booked + self.slots_held >= self.slots_total
 
     def save(self, *args, **kwargs):
-        # Auto-increment cohort ONLY if end date has passed AND we're updating an existing course
-        if self.pk and self.end_date < timezone.now().date():
-            self.cohort_number += 1
-            self.start_date = None
-            self.end_date = None
-        super().save(*args, **kwargs)
+        # Cohort rollover happens in bulk (courses.rollover), never per save
+        update_fields = kwargs.get('update_fields')
+        adding = self._state.adding
+        if not adding and update_fields is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        reindex = (
+            'languages' not in self.get_deferred_fields()
+            and (update_fields is None or 'languages' in update_fields)
+            and (adding or self.languages != getattr(self, '_saved_languages', None))
+        )
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if reindex:
+                CourseLanguage.objects.index([self], replace=not adding)
+                self._saved_languages = list(self.languages)
+            if self.current_cohort_id is None:
+                self.ensure_current_cohort()
+            else:
+                # Schedule changes apply to the running cohort, read from
+                # the row in case it rolled over since this instance was
+                Cohort.objects.filter(
+                    pk__in=Course.objects.filter(pk=self.pk).values('current_cohort')
+                ).update(
+                    start_date=self.start_date,
+                    end_date=self.end_date,
+                    slots_total=self.slots_total
+                )
+        invalidate_course(self.pk)
+
+    def ensure_current_cohort(self):
+        """
+        Give the course a row for its running cohort if it has none yet, as
+        for new courses or ones inserted with ``bulk_create``.
+        """
+        cohort, _ = Cohort.objects.get_or_create(
+            course_id=self.pk,
+            number=self.cohort_number,
+            defaults={
+                'start_date': self.start_date,
+                'end_date': self.end_date,
+                'slots_total': self.slots_total,
+            }
+        )
+        Course.objects.filter(pk=self.pk, current_cohort__isnull=True).update(current_cohort=cohort)
+        self.current_cohort = cohort
+        return cohort
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Keyset pagination of the catalogue (see courses.pagination)
+            models.Index(fields=['-created_at', '-id'], name='course_created_idx'),
+            models.Index(fields=['is_active', '-created_at', '-id'], name='course_active_created_idx'),
+            # Finding expired cohorts to roll over
+            models.Index(fields=['end_date'], name='course_end_date_idx'),
+            # Date-window filters (see courses.filters), carrying the columns
+            # that rarely change so hours and page order are checked in the
+            # index. Seat counters stay out: every booking would rewrite it
+            models.Index(
+                fields=['start_date', 'is_active', 'duration_hours', 'created_at'],
+                name='course_start_date_idx'
+            ),
+            # An instructor's catalogue, newest first, without a sort. The
+            # trailing is_active makes it cover the instructor facet
+            models.Index(
+                fields=['instructor', '-created_at', '-id', 'is_active'], name='course_instructor_created_idx'
+            ),
+        ]
+
+class Cohort(models.Model):
+    """
+    One run of a course. Bookings belong to the cohort they were made for,
+    so past cohorts stay queryable without touching the live ones.
+
+    While a cohort is running its booked count lives on ``Course`` (the
+    counter every booking updates); it is copied here when the cohort closes.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='cohorts')
+    number = models.IntegerField()
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    slots_total = models.IntegerField()
+    slots_booked = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['course', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'number'], name='cohort_unique_number'),
+        ]
+
+    def __str__(self):
+        return f"{self.course.title} (Cohort {self.number})"
+
+
+class CourseLanguageQuerySet(models.QuerySet):
+    def index(self, courses, replace=True):
+        """
+        Write the index rows for ``courses``. ``Course.save`` keeps them in
+        step; call this after inserting courses with ``bulk_create``. Pass
+        ``replace=False`` when the courses have no rows yet.
+        """
+        courses = list(courses)
+        if replace:
+            self.filter(course__in=[course.pk for course in courses]).delete()
+        return self.bulk_create([
+            CourseLanguage(course_id=course.pk, language=language)
+            for course in courses
+            for language in sorted({language_key(name) for name in course.languages if name.strip()})
+        ], batch_size=1000)
+
+
+class CourseLanguage(models.Model):
+    """
+    One row per language a course is taught in, so ``?language=`` is an
+    index lookup rather than a scan of every course's JSON list (SQLite has
+    no index for JSON containment).
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='language_index', db_index=False)
+    # language_key() of the name in Course.languages
+    language = models.CharField(max_length=50)
+
+    objects = CourseLanguageQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Leads with language, so it also serves the filter
+            models.UniqueConstraint(fields=['language', 'course'], name='course_language_unique'),
+        ]
+        indexes = [
+            # Replaces the foreign key's index; also covers the language facet
+            models.Index(fields=['course', 'language'], name='course_language_course_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.course_id}: {self.language}"
+
+
+register_picture(Course, 'course_picture', on_change=invalidate_course)
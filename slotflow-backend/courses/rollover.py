@@ -0,0 +1,77 @@
+"""
+Cohort rollover.
+
+A course whose ``end_date`` has passed moves on to its next cohort: the
+finished ``Cohort`` is closed with its final booked count, the dates are
+cleared until an admin schedules the next run, the slots are freed, and the
+finished cohort's bookings are archived so they stay in the learners'
+history without blocking new ones. Learners still waiting for a place in
+the finished cohort are taken off its waitlist and their seat holds dropped. The next cohort's row is created when it
+is first needed (see ``Course.ensure_current_cohort``), so a rollover writes
+nothing per course beyond its UPDATEs.
+
+Expired courses are found through the ``end_date`` index and rolled over in
+batches of set-based UPDATEs, run by ``manage.py rollover_cohorts`` (from
+cron, or with ``--loop``) rather than on every save.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from bookings.models import Booking, SeatHold, WaitlistEntry
+from .cache import invalidate_all
+from .events import slots_changed
+from .models import Cohort, Course
+
+
+def rollover_expired_courses(today=None, batch_size=None):
+    """
+    Roll every course that ended before ``today`` over to its next cohort.
+
+    Each batch locks its courses first, so bookings racing the rollover
+    either land before it (and are archived with their cohort) or wait and
+    book the new cohort. Returns the number of courses rolled over.
+    """
+    today = today or timezone.localdate()
+    batch_size = batch_size or settings.ROLLOVER_BATCH_SIZE
+
+    rolled = 0
+    while True:
+        with transaction.atomic():
+            expired = list(
+                Course.objects.select_for_update()
+                .filter(end_date__lt=today)
+                .order_by('end_date', 'id')
+                .values_list('id', 'current_cohort_id')[:batch_size]
+            )
+            if not expired:
+                break
+            ids = [course_id for course_id, _ in expired]
+            now = timezone.now()
+
+            Cohort.objects.filter(
+                pk__in=[cohort_id for _, cohort_id in expired if cohort_id]
+            ).update(
+                slots_booked=Subquery(
+                    Course.objects.filter(pk=OuterRef('course_id')).values('slots_booked')[:1]
+                ),
+                closed_at=now
+            )
+            Booking.objects.filter(course_id__in=ids, is_archived=False).update(is_archived=True)
+            WaitlistEntry.objects.waiting().filter(course_id__in=ids).delete()
+            SeatHold.objects.filter(course_id__in=ids).delete()
+            Course.objects.filter(pk__in=ids).update(
+                current_cohort=None,
+                cohort_number=F('cohort_number') + 1,
+                start_date=None,
+                end_date=None,
+                slots_booked=0,
+                slots_held=0,
+                updated_at=now
+            )
+            invalidate_all()
+            slots_changed(*ids)
+        rolled += len(ids)
+
+    return rolled
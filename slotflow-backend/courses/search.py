@@ -0,0 +1,171 @@
+"""
+Ranked keyword search over the titles and descriptions of active courses.
+
+The search runs in the database, against an index that follows every write
+to the course table (migration 0008 creates it):
+
+* SQLite: an FTS5 table with Porter stemming, filled and emptied by
+  triggers as courses are inserted, edited, deactivated or deleted. Matches
+  are ranked by BM25 with title hits weighted above description hits.
+* PostgreSQL: a GIN index over a weighted ``tsvector`` of the same two
+  columns, ranked with ``ts_rank``. Postgres keeps expression indexes up to
+  date itself.
+
+Other databases fall back to unindexed ``icontains`` matching.
+
+On SQLite, a migration that rebuilds ``courses_course`` (most ``AlterField``
+operations do) drops the triggers with the old table. Finish such a
+migration with ``RunPython`` calling ``rebuild_index``, or run
+``manage.py rebuild_search_index`` afterwards; the tests fail until then.
+
+Search text is reduced to its words, so users can't write query syntax. All
+words must match, and the last one matches as a prefix ("carp" finds
+"Carpentry") so results can follow what is being typed.
+"""
+import re
+
+from django.db import connections
+
+FTS_TABLE = 'courses_course_search'
+# bm25() weights per FTS column: (title, description)
+FTS_WEIGHTS = (10.0, 1.0)
+
+# Must stay identical to the expression indexed by migration 0008, or
+# Postgres won't use the index
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+_FTS_INSERT = (
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description) "
+    "SELECT new.id, new.title, new.description WHERE new.is_active;"
+)
+_FTS_DELETE = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+    "SELECT 'delete', old.id, old.title, old.description WHERE old.is_active;"
+)
+
+INDEX_SQL = {
+    'sqlite': [
+        # External content: the text stays in courses_course and the FTS
+        # table only holds the index, for active courses only
+        f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+            title, description,
+            content='courses_course', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )""",
+        f"""INSERT INTO {FTS_TABLE}(rowid, title, description)
+            SELECT id, title, description FROM courses_course WHERE is_active""",
+        f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON courses_course
+            BEGIN {_FTS_INSERT} END""",
+        f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON courses_course
+            BEGIN {_FTS_DELETE} END""",
+        # The old entry must go before the new one is added, so both
+        # statements share one trigger
+        f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF title, description, is_active ON courses_course
+            WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+                OR old.is_active IS NOT new.is_active
+            BEGIN {_FTS_DELETE} {_FTS_INSERT} END""",
+    ],
+    'postgresql': [
+        f"CREATE INDEX course_search_idx ON courses_course USING gin (({POSTGRES_DOCUMENT}))",
+    ],
+}
+DROP_INDEX_SQL = {
+    'sqlite': [
+        f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+        f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+        f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+        f"DROP TABLE IF EXISTS {FTS_TABLE}",
+    ],
+    'postgresql': [
+        "DROP INDEX IF EXISTS course_search_idx",
+    ],
+}
+
+MAX_TERMS = 10
+_WORD = re.compile(r'\w+')
+
+
+def _execute(connection, statements):
+    with connection.cursor() as cursor:
+        for sql in statements.get(connection.vendor, []):
+            cursor.execute(sql)
+
+
+def create_index(connection):
+    """Create and fill the search index (migration 0008)."""
+    _execute(connection, INDEX_SQL)
+
+
+def drop_index(connection):
+    _execute(connection, DROP_INDEX_SQL)
+
+
+def rebuild_index(connection):
+    """Recreate the index from the course table, triggers included."""
+    drop_index(connection)
+    create_index(connection)
+
+
+def search_terms(text):
+    """The words of ``text`` that are searched for, at most ``MAX_TERMS``."""
+    return _WORD.findall(text.casefold())[:MAX_TERMS]
+
+
+def ranked_ids(queryset, text, limit):
+    """
+    Ids of the best ``limit`` active courses in ``queryset`` matching
+    ``text``, best match first.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return []
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        return _sqlite_ranked_ids(queryset, terms, limit)
+    queryset = queryset.filter(is_active=True)
+    if vendor == 'postgresql':
+        return _postgres_ranked_ids(queryset, terms, limit)
+    return _fallback_ranked_ids(queryset, terms, limit)
+
+
+def _sqlite_ranked_ids(queryset, terms, limit):
+    # Quoted, so words such as AND or NEAR are not operators
+    sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+    params = [' '.join(f'"{term}"' for term in terms) + '*']
+    # The index only holds active courses; other filters (such as
+    # ?language=) are applied to the matches
+    if queryset.query.where:
+        candidates, candidate_params = queryset.order_by().values('pk').query.sql_with_params()
+        sql += f" AND rowid IN ({candidates})"
+        params.extend(candidate_params)
+    sql += f" ORDER BY bm25({FTS_TABLE}, {', '.join(map(str, FTS_WEIGHTS))}), rowid DESC LIMIT %s"
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, [*params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _postgres_ranked_ids(queryset, terms, limit):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+    from django.db.models.expressions import RawSQL
+
+    query = SearchQuery(
+        ' & '.join(terms[:-1] + [f'{terms[-1]}:*']), config='english', search_type='raw'
+    )
+    return list(
+        queryset.annotate(document=RawSQL(POSTGRES_DOCUMENT, [], output_field=SearchVectorField()))
+        .filter(document=query)
+        .annotate(rank=SearchRank('document', query))
+        .order_by('-rank', '-pk')
+        .values_list('pk', flat=True)[:limit]
+    )
+
+
+def _fallback_ranked_ids(queryset, terms, limit):
+    from django.db.models import Q
+
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    return list(queryset.order_by('-created_at', '-pk').values_list('pk', flat=True)[:limit])
@@ -1,19 +1,20 @@
 from rest_framework import serializers
 from .models import Course
 from accounts.models import User
+from uploads.serializers import ImageVariantsField
 from django.utils import timezone
-import json
 
 class CourseSerializer(serializers.ModelSerializer):
-    # Handle languages as a list in the API, even though it's stored as a JSON string
+    # Also accepts a repeated form field (languages=English&languages=Welsh)
     languages = serializers.ListField(
-        child=serializers.CharField(),
+        child=serializers.CharField(max_length=50),
         allow_empty=True
     )
     instructor = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.filter(is_admin=True),
         default=serializers.CurrentUserDefault()
     )
+    course_picture_variants = ImageVariantsField()
     is_full = serializers.BooleanField(read_only=True)
     is_active = serializers.BooleanField(read_only=True)
 
@@ -22,22 +23,14 @@ class CourseSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'instructor', 'start_date', 'end_date',
             'duration_hours', 'languages', 'cohort_number', 'course_picture',
-            'slots_total', 'slots_booked', 'is_active', 'is_full', 'created_at'
+            'course_picture_variants', 'slots_total', 'slots_booked', 'slots_held', 'is_active', 'is_full', 'created_at'
         ]
-        read_only_fields = ['slots_booked', 'cohort_number', 'created_at', 'is_active']
-
-    def to_representation(self, instance):
-        rep = super().to_representation(instance)
-        try:
-            rep['languages'] = json.loads(instance.languages)
-        except (TypeError, json.JSONDecodeError):
-            rep['languages'] = []
-        return rep
-
-    def to_internal_value(self, data):
-        internal = super().to_internal_value(data)
-        internal['languages'] = json.dumps(internal['languages'])  # Convert list to JSON string
-        return internal
+        read_only_fields = ['slots_booked', 'slots_held', 'cohort_number', 'created_at', 'is_active']
+        # Dates are only empty between a rollover and the next schedule
+        extra_kwargs = {
+            'start_date': {'required': True, 'allow_null': False},
+            'end_date': {'required': True, 'allow_null': False},
+        }
 
     def validate(self, data):
         errors = {}
@@ -60,3 +53,14 @@ class CourseSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(errors)
 
         return data
+
+class CourseSummarySerializer(serializers.ModelSerializer):
+    """Compact, read-only course fields embedded in other resources."""
+    is_full = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Course
+        fields = [
+            'id', 'title', 'start_date', 'end_date', 'cohort_number', 'is_full'
+        ]
+        read_only_fields = fields
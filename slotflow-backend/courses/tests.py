@@ -1,3 +1,774 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from bookings.models import Booking, SeatHold
+from core.testing import authenticate, make_admin, make_course, make_learner
+from .cache import cache_stats, reset_cache_stats
+from .events import get_broker, publish_slots
+from .models import Cohort, Course
+from .rollover import rollover_expired_courses
+from .views import _slot_stream
+
+
+@override_settings(COURSE_PAGE_SIZE=4, COURSE_MAX_PAGE_SIZE=6)
+class CourseKeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.courses = [make_course(self.admin, title=f'Course {i}') for i in range(10)]
+        # Several courses sharing a timestamp must still page by id
+        Course.objects.filter(pk__in=[c.pk for c in self.courses[3:7]]).update(
+            created_at=self.courses[3].created_at
+        )
+        self.client = APIClient()
+
+    def walk(self, url, params=None):
+        seen = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(course['id'] for course in response.data['results'])
+            if not response.data['next']:
+                return seen
+            response = self.client.get(response.data['next'])
+
+    def test_pages_cover_catalogue_once_in_order(self):
+        expected = list(
+            Course.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.walk('/api/courses/'), expected)
+
+    def test_page_size_is_configurable_and_capped(self):
+        response = self.client.get('/api/courses/', {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+
+        response = self.client.get('/api/courses/', {'page_size': 50})
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_active_list_skips_inactive_courses(self):
+        Course.objects.filter(pk=self.courses[0].pk).update(is_active=False)
+
+        ids = self.walk('/api/courses/active/')
+
+        self.assertEqual(len(ids), 9)
+        self.assertNotIn(self.courses[0].pk, ids)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/courses/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class CourseResponseCacheTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.learner = make_learner()
+        self.course = make_course(self.admin, slots_total=3)
+        self.client = APIClient()
+        reset_cache_stats()
+
+    def test_repeated_reads_are_served_from_cache(self):
+        first = self.client.get(f'/api/courses/{self.course.pk}/')
+        # Only the conditional-GET validator query remains
+        with self.assertNumQueries(1):
+            second = self.client.get(f'/api/courses/{self.course.pk}/')
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_booking_and_cancellation_invalidate_slot_counts(self):
+        self.client.get('/api/courses/')
+        self.client.get(f'/api/courses/{self.course.pk}/')
+
+        booking = Booking.objects.reserve(self.course, self.learner)
+        listing = self.client.get('/api/courses/')
+        detail = self.client.get(f'/api/courses/{self.course.pk}/')
+        self.assertEqual(listing.data['results'][0]['slots_booked'], 1)
+        self.assertEqual(detail.data['slots_booked'], 1)
+
+        booking.cancel()
+        detail = self.client.get(f'/api/courses/{self.course.pk}/')
+        self.assertEqual(detail['X-Cache'], 'MISS')
+        self.assertEqual(detail.data['slots_booked'], 0)
+
+    def test_course_update_keeps_other_details_cached(self):
+        other = make_course(self.admin, title='Masonry')
+        self.client.get(f'/api/courses/{other.pk}/')
+
+        self.course.title = 'Advanced Carpentry'
+        self.course.save()
+
+        self.assertEqual(self.client.get(f'/api/courses/{other.pk}/')['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/api/courses/')['X-Cache'], 'MISS')
+
+
+    def test_deleted_courses_leave_the_cache(self):
+        other = make_course(self.admin, title='Masonry')
+        self.client.get('/api/courses/')
+        self.client.get(f'/api/courses/{self.course.pk}/')
+
+        Course.objects.filter(pk=other.pk).delete()
+        listing = self.client.get('/api/courses/')
+        self.assertEqual(listing['X-Cache'], 'MISS')
+        self.assertEqual([c['id'] for c in listing.data['results']], [self.course.pk])
+
+        # Deleting the instructor cascades to their courses
+        self.admin.delete()
+        self.assertEqual(self.client.get(f'/api/courses/{self.course.pk}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/courses/').data['results'], [])
+
+
+class CourseConditionalGetTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.learner = make_learner()
+        self.course = make_course(self.admin)
+        self.client = APIClient()
+
+    def test_unchanged_detail_answers_304_with_one_query(self):
+        response = self.client.get(f'/api/courses/{self.course.pk}/')
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                f'/api/courses/{self.course.pk}/', HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_list_etag_changes_when_slots_change(self):
+        etag = self.client.get('/api/courses/')['ETag']
+        self.assertEqual(
+            self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+        Booking.objects.reserve(self.course, self.learner)
+
+        response = self.client.get('/api/courses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_differs_per_page(self):
+        first = self.client.get('/api/courses/')['ETag']
+        other = self.client.get('/api/courses/', {'page_size': 1})['ETag']
+        self.assertNotEqual(first, other)
+
+    def test_if_modified_since(self):
+        response = self.client.get(f'/api/courses/{self.course.pk}/')
+        response = self.client.get(
+            f'/api/courses/{self.course.pk}/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_course_is_still_404(self):
+        self.assertEqual(self.client.get('/api/courses/999999/').status_code, 404)
+
+
+@override_settings(ASYNC_VIEWS=True)
+class AsyncCourseViewTests(TestCase):
+    """The catalogue reads run on the event loop when served over ASGI."""
+
+    def setUp(self):
+        self.admin = make_admin()
+        self.course = make_course(self.admin)
+        make_course(self.admin, title='Plumbing')
+
+    def test_read_views_are_async(self):
+        for path in ['/api/courses/', f'/api/courses/{self.course.pk}/', '/api/courses/active/']:
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(path).func), path)
+
+    def test_views_are_sync_by_default(self):
+        # Under WSGI an async view would pay for async_to_sync on every request
+        with self.settings(ASYNC_VIEWS=False):
+            for path in ['/api/courses/', f'/api/courses/{self.course.pk}/', '/api/courses/active/']:
+                self.assertFalse(asyncio.iscoroutinefunction(resolve(path).func), path)
+
+            response = self.client.get('/api/courses/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), 2)
+            response = self.client.get('/api/courses/', headers={'If-None-Match': response['ETag']})
+            self.assertEqual(response.status_code, 304)
+            response = self.client.get(f'/api/courses/{self.course.pk}/')
+            self.assertEqual(response.json()['title'], 'Carpentry')
+
+    async def test_list_is_cached_and_validated(self):
+        response = await self.async_client.get('/api/courses/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.json()['results']), 2)
+
+        response = await self.async_client.get('/api/courses/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        response = await self.async_client.get('/api/courses/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_list_paginates(self):
+        response = await self.async_client.get('/api/courses/active/?page_size=1')
+        body = response.json()
+        self.assertEqual([course['title'] for course in body['results']], ['Plumbing'])
+
+        response = await self.async_client.get(body['next'])
+        self.assertEqual([course['title'] for course in response.json()['results']], ['Carpentry'])
+
+    async def test_detail(self):
+        response = await self.async_client.get(f'/api/courses/{self.course.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Carpentry')
+        self.assertIn('ETag', response)
+
+        response = await self.async_client.get('/api/courses/999999/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_writes_still_require_authentication(self):
+        response = await self.async_client.delete(f'/api/courses/{self.course.pk}/')
+        self.assertEqual(response.status_code, 401)
+
+
+class CourseLanguageTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin(is_staff=True)
+        self.welsh = make_course(self.admin, title='Thatching', languages=['English', 'Welsh'])
+        self.english = make_course(self.admin, title='Plastering', languages=['English'])
+        make_course(self.admin, title='Tiling', languages=['welsh'], is_active=False)
+        self.client = APIClient()
+
+    def titles(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [course['title'] for course in response.data['results']]
+
+    def test_lists_filter_by_language_in_the_database(self):
+        self.assertEqual(self.titles('/api/courses/?language=welsh'), ['Thatching'])
+        self.assertEqual(self.titles('/api/courses/?language=%20ENGLISH'), ['Plastering', 'Thatching'])
+        self.assertEqual(self.titles('/api/courses/active/?language=Welsh'), ['Thatching'])
+        self.assertEqual(self.titles('/api/courses/?language=Gaelic'), [])
+        self.assertEqual(len(self.titles('/api/courses/?language=')), 2)
+
+        authenticate(self.client, self.admin)
+        self.assertEqual(self.titles('/api/courses/inactive/?language=Welsh'), ['Tiling'])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/courses/?language=welsh&page_size=1')
+        self.assertTrue(all('courses_courselanguage' in q['sql'] for q in queries.captured_queries))
+
+    def test_filtered_lists_have_their_own_validators(self):
+        etag = self.client.get('/api/courses/?language=welsh')['ETag']
+        self.assertNotEqual(etag, self.client.get('/api/courses/?language=english')['ETag'])
+
+        self.english.languages.append('Welsh')
+        self.english.save()
+        response = self.client.get('/api/courses/?language=welsh', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([course['title'] for course in response.data['results']], ['Plastering', 'Thatching'])
+
+    def test_api_reads_and_writes_lists(self):
+        authenticate(self.client, self.admin)
+        today = timezone.now().date()
+        response = self.client.post('/api/courses/', {
+            'title': 'Glazing', 'description': 'Windows', 'duration_hours': 12, 'slots_total': 8,
+            'languages': ['Polish', 'English'],
+            'start_date': today + timedelta(days=10), 'end_date': today + timedelta(days=20),
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['languages'], ['Polish', 'English'])
+        course = Course.objects.get(pk=response.data['id'])
+        self.assertEqual(course.languages, ['Polish', 'English'])
+        self.assertEqual(
+            sorted(course.language_index.values_list('language', flat=True)), ['english', 'polish']
+        )
+
+        # Leaving languages out of a partial update keeps them
+        response = self.client.patch(f'/api/courses/{course.pk}/', {'title': 'Glazing II'})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['languages'], ['Polish', 'English'])
+
+        response = self.client.patch(f'/api/courses/{course.pk}/', {'languages': ['Romanian']})
+        self.assertEqual(response.data['languages'], ['Romanian'])
+        self.assertEqual(list(course.language_index.values_list('language', flat=True)), ['romanian'])
+
+    def test_index_is_only_rewritten_when_languages_change(self):
+        course = Course.objects.get(pk=self.welsh.pk)
+        course.title = 'Thatching II'
+        with CaptureQueriesContext(connection) as queries:
+            course.save()
+        self.assertFalse(any('courses_courselanguage' in q['sql'] for q in queries.captured_queries))
+
+        course.languages.remove('Welsh')
+        course.save()
+        self.assertEqual(list(Course.objects.filter(is_active=True).taught_in('welsh')), [])
+        self.assertEqual(list(Course.objects.taught_in('english').order_by('pk')), [self.welsh, self.english])
+
+
+class CourseFilterTests(TestCase):
+    def setUp(self):
+        today = timezone.now().date()
+        self.admin = make_admin(is_staff=True)
+        self.other = make_admin('dana')
+        self.learner = make_learner()
+        self.soon = make_course(
+            self.admin, title='Soon', duration_hours=8, slots_total=1, languages=['Welsh'],
+            start_date=today + timedelta(days=5), end_date=today + timedelta(days=9)
+        )
+        self.month = make_course(
+            self.other, title='Month', duration_hours=30,
+            start_date=today + timedelta(days=20), end_date=today + timedelta(days=40)
+        )
+        self.later = make_course(
+            self.admin, title='Later', duration_hours=60,
+            start_date=today + timedelta(days=60), end_date=today + timedelta(days=90)
+        )
+        Booking.objects.reserve(self.soon, self.learner)
+        self.today = today
+        self.client = APIClient()
+
+    def titles(self, url='/api/courses/active/', **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(course['title'] for course in response.data['results'])
+
+    def test_filters(self):
+        in_30_days = (self.today + timedelta(days=30)).isoformat()
+        self.assertEqual(self.titles(start_from=self.today.isoformat(), start_to=in_30_days), ['Month', 'Soon'])
+        self.assertEqual(self.titles(end_from=in_30_days), ['Later', 'Month'])
+        self.assertEqual(self.titles(end_to=in_30_days), ['Soon'])
+        self.assertEqual(self.titles(min_hours=10, max_hours=40), ['Month'])
+        self.assertEqual(self.titles(instructor=self.other.pk), ['Month'])
+        self.assertEqual(self.titles(cohort=1), ['Later', 'Month', 'Soon'])
+        self.assertEqual(self.titles(cohort=2), [])
+        self.assertEqual(self.titles(has_free_slots='true'), ['Later', 'Month'])
+        self.assertEqual(self.titles(has_free_slots='false'), ['Soon'])
+        # "Starting in the next 30 days with free slots, under 40 hours"
+        self.assertEqual(self.titles(
+            '/api/courses/', start_from=self.today.isoformat(), start_to=in_30_days,
+            has_free_slots='true', max_hours=39
+        ), ['Month'])
+
+    def test_held_seats_are_not_free(self):
+        SeatHold.objects.place(self.month, self.learner)
+        self.month.refresh_from_db()
+        self.month.slots_total = 1
+        self.month.save()
+        self.assertEqual(self.titles(has_free_slots='true'), ['Later'])
+
+    def test_invalid_filters_are_rejected(self):
+        for params in ({'start_from': 'soon'}, {'min_hours': -1}, {'min_hours': 5, 'max_hours': 2}):
+            response = self.client.get('/api/courses/active/', params)
+            self.assertEqual(response.status_code, 400, params)
+        response = self.client.get('/api/courses/', {'start_from': '2026-02-01', 'start_to': '2026-01-01'})
+        self.assertIn('start_to', response.data)
+
+    def test_facets(self):
+        # The page and its validators, plus five for the facets
+        with self.assertNumQueries(7):
+            response = self.client.get('/api/courses/active/', {'facets': 'true'})
+        facets = response.data['facets']
+        self.assertEqual(facets['has_free_slots'], 2)
+        self.assertEqual(facets['start_date'], {'next_7_days': 1, 'next_30_days': 2, 'next_90_days': 3})
+        self.assertEqual(facets['duration_hours'], {'under_10': 1, '10_to_19': 0, '20_to_39': 1, '40_plus': 1})
+        self.assertEqual(facets['instructor'], [
+            {'instructor': self.admin.pk, 'username': 'admin', 'count': 2},
+            {'instructor': self.other.pk, 'username': 'dana', 'count': 1},
+        ])
+        self.assertEqual(facets['cohort'], [{'cohort_number': 1, 'count': 3}])
+        self.assertEqual(facets['language'], [{'language': 'welsh', 'count': 1}])
+
+        # Counts follow the filters, and facets are only computed on request
+        response = self.client.get('/api/courses/active/', {'facets': 'true', 'has_free_slots': 'true'})
+        self.assertEqual(response.data['facets']['instructor'][0]['count'], 1)
+        self.assertEqual(response.data['facets']['language'], [])
+        self.assertNotIn('facets', self.client.get('/api/courses/active/').data)
+
+    def test_facet_windows_move_on_at_midnight(self):
+        first = self.client.get('/api/courses/active/', {'facets': 'true'})
+        self.assertEqual(first.data['facets']['start_date']['next_7_days'], 1)
+
+        next_week = timezone.now() + timedelta(days=6)
+        with mock.patch('django.utils.timezone.now', return_value=next_week):
+            response = self.client.get(
+                '/api/courses/active/', {'facets': 'true'},
+                HTTP_IF_NONE_MATCH=first['ETag'], HTTP_IF_MODIFIED_SINCE=first['Last-Modified']
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['facets']['start_date'], {'next_7_days': 0, 'next_30_days': 1, 'next_90_days': 2})
+
+    def test_facets_on_sync_list(self):
+        authenticate(self.client, self.admin)
+        self.later.is_active = False
+        self.later.save()
+        response = self.client.get('/api/courses/inactive/', {'facets': 'true'})
+        self.assertEqual(response.data['facets']['duration_hours']['40_plus'], 1)
+        self.assertEqual(response.data['facets']['has_free_slots'], 1)
+
+
+@override_settings(COURSE_SEARCH_RESULTS=3, COURSE_SEARCH_MAX_RESULTS=4)
+class CourseSearchTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.carpentry = make_course(self.admin, title='Carpentry', description='Wood joinery and framing')
+        self.joinery = make_course(self.admin, title='Fine Joinery', description='Cabinets for carpenters')
+        self.plumbing = make_course(
+            self.admin, title='Plumbing', description='Pipes and boilers', languages=['Welsh']
+        )
+        self.client = APIClient()
+
+    def search(self, q, **params):
+        response = self.client.get('/api/courses/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [course['title'] for course in response.data]
+
+    def test_ranks_title_matches_first(self):
+        self.assertEqual(self.search('joinery'), ['Fine Joinery', 'Carpentry'])
+        # Stemmed, and the last word matches as a prefix
+        self.assertEqual(self.search('boiler'), ['Plumbing'])
+        self.assertEqual(self.search('wood carp'), ['Carpentry'])
+        self.assertEqual(self.search('masonry'), [])
+
+    def test_query_syntax_is_ignored(self):
+        self.assertEqual(self.search('pipes AND "(boilers'), ['Plumbing'])
+        response = self.client.get('/api/courses/search/', {'q': ' "*" '})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/courses/search/').status_code, 400)
+
+    def test_limit_and_language(self):
+        for i in range(5):
+            make_course(self.admin, title=f'Plumbing {i}')
+        self.assertEqual(len(self.search('plumbing')), 3)
+        self.assertEqual(len(self.search('plumbing', limit=1)), 1)
+        self.assertEqual(len(self.search('plumbing', limit=50)), 4)
+        self.assertEqual(self.search('plumbing', language='welsh'), ['Plumbing'])
+
+    def test_index_follows_writes(self):
+        self.carpentry.title = 'Woodwork'
+        self.carpentry.save()
+        self.assertEqual(self.search('carpentry'), [])
+        self.assertEqual(self.search('woodwork'), ['Woodwork'])
+
+        self.plumbing.is_active = False
+        self.plumbing.save()
+        self.assertEqual(self.search('plumbing'), [])
+
+        # Bulk updates and deletes reach the index too
+        Course.objects.filter(pk=self.plumbing.pk).update(is_active=True)
+        self.assertEqual(Course.objects.search('plumbing'), [self.plumbing])
+        Course.objects.filter(pk=self.plumbing.pk).delete()
+        self.assertEqual(Course.objects.search('plumbing'), [])
+
+    def test_search_costs_two_queries(self):
+        with self.assertNumQueries(2):
+            self.search('joinery')
+
+    def test_rebuild_command(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('joinery'), ['Fine Joinery', 'Carpentry'])
+        make_course(self.admin, title='Glazing')
+        self.assertEqual(self.search('glazing'), ['Glazing'])
+
+
+class SlotEventStreamTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.learner = make_learner()
+        self.course = make_course(self.admin, slots_total=1)
+        self.other = make_course(self.admin, title='Other')
+
+    # Writes run on the test's database thread, where on_commit hooks fire
+    def book(self, course):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Booking.objects.reserve(course, self.learner)
+
+    def cancel(self, booking):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.cancel()
+
+    async def next_event(self, stream):
+        chunk = await asyncio.wait_for(anext(stream), timeout=5)
+        event, data = chunk.decode().strip().split('\n')
+        self.assertEqual(event, 'event: slots')
+        return json.loads(data.removeprefix('data: '))
+
+    async def test_stream_sends_snapshot_then_changes(self):
+        response = await self.async_client.get(f'/api/courses/events/?courses={self.course.pk}')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+
+        snapshot = await self.next_event(stream)
+        self.assertEqual((snapshot['id'], snapshot['slots_booked'], snapshot['is_full']), (self.course.pk, 0, False))
+
+        # Changes to other courses are not sent
+        await sync_to_async(self.book)(self.other)
+        booking = await sync_to_async(self.book)(self.course)
+        change = await self.next_event(stream)
+        self.assertEqual((change['id'], change['slots_booked'], change['is_full']), (self.course.pk, 1, True))
+
+        await sync_to_async(self.cancel)(booking)
+        change = await self.next_event(stream)
+        self.assertEqual(change['slots_booked'], 0)
+
+        await response.streaming_content.aclose()
+
+    async def test_closed_stream_unsubscribes(self):
+        stream = _slot_stream([self.course.pk])
+        await anext(stream)
+        self.assertEqual(get_broker().watched([self.course.pk]), [self.course.pk])
+
+        await stream.aclose()
+
+        self.assertEqual(get_broker().watched([self.course.pk]), [])
+
+    def test_unwatched_courses_cost_no_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            publish_slots([self.course.pk, self.other.pk])
+
+        self.assertEqual(len(queries), 0)
+
+    async def test_rejects_bad_subscriptions(self):
+        for path in ['/api/courses/events/', '/api/courses/events/?courses=1,x']:
+            response = await self.async_client.get(path)
+            self.assertEqual(response.status_code, 400)
+
+    def test_wsgi_answers_503_without_subscribing(self):
+        # The default server (runserver / core.wsgi) can't stream
+        response = APIClient().get(f'/api/courses/events/?courses={self.course.pk}')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.streaming)
+        self.assertEqual(get_broker().watched([self.course.pk]), [])
+
+
+class CohortRolloverTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.learner = make_learner()
+        self.today = timezone.now().date()
+        self.expired = make_course(
+            self.admin, title='Expired',
+            start_date=self.today - timedelta(days=10), end_date=self.today - timedelta(days=1)
+        )
+        self.running = make_course(
+            self.admin, title='Running',
+            start_date=self.today - timedelta(days=3), end_date=self.today
+        )
+
+    def test_only_expired_courses_roll_over(self):
+        Booking.objects.reserve(self.expired, self.learner)
+        Booking.objects.reserve(self.running, self.learner)
+
+        self.assertEqual(rollover_expired_courses(), 1)
+
+        self.expired.refresh_from_db()
+        self.assertEqual(self.expired.cohort_number, 2)
+        self.assertIsNone(self.expired.start_date)
+        self.assertIsNone(self.expired.end_date)
+        self.assertEqual(self.expired.slots_booked, 0)
+
+        self.running.refresh_from_db()
+        self.assertEqual(self.running.cohort_number, 1)
+        self.assertEqual(self.running.slots_booked, 1)
+        self.assertEqual(rollover_expired_courses(), 0)
+
+    def test_previous_cohort_bookings_are_archived(self):
+        old = Booking.objects.reserve(self.expired, self.learner)
+
+        rollover_expired_courses()
+
+        old.refresh_from_db()
+        self.assertTrue(old.is_archived)
+        # The learner can book the next cohort, and the old booking no
+        # longer hands slots back to it
+        Booking.objects.reserve(self.expired, self.learner)
+        self.assertFalse(old.cancel())
+        self.expired.refresh_from_db()
+        self.assertEqual(self.expired.slots_booked, 1)
+
+    def test_save_no_longer_rolls_over(self):
+        self.expired.title = 'Renamed'
+        self.expired.save()
+
+        self.expired.refresh_from_db()
+        self.assertEqual(self.expired.cohort_number, 1)
+        self.assertIsNotNone(self.expired.end_date)
+
+    def test_rollover_invalidates_cached_responses(self):
+        client = APIClient()
+        client.get(f'/api/courses/{self.expired.pk}/')
+
+        rollover_expired_courses()
+
+        response = client.get(f'/api/courses/{self.expired.pk}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['cohort_number'], 2)
+
+    def test_command_accepts_date(self):
+        out = StringIO()
+        call_command('rollover_cohorts', date=str(self.today + timedelta(days=1)), stdout=out)
+
+        self.assertIn('Rolled over 2 course(s)', out.getvalue())
+
+
+class CohortTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.learner = make_learner()
+        self.today = timezone.now().date()
+        self.course = make_course(
+            self.admin, start_date=self.today - timedelta(days=10), end_date=self.today - timedelta(days=1)
+        )
+
+    def test_new_course_opens_first_cohort(self):
+        cohort = self.course.current_cohort
+        self.assertEqual(cohort.number, 1)
+        self.assertEqual(cohort.end_date, self.course.end_date)
+        self.assertEqual(cohort.slots_total, self.course.slots_total)
+
+    def test_schedule_changes_apply_to_current_cohort(self):
+        self.course.end_date = self.today + timedelta(days=5)
+        self.course.slots_total = 3
+        self.course.save()
+
+        cohort = Cohort.objects.get(course=self.course)
+        self.assertEqual(cohort.end_date, self.today + timedelta(days=5))
+        self.assertEqual(cohort.slots_total, 3)
+
+    def test_bookings_belong_to_the_running_cohort(self):
+        first = Booking.objects.reserve(self.course, self.learner)
+        rollover_expired_courses()
+
+        closed = Cohort.objects.get(course=self.course, number=1)
+        self.assertIsNotNone(closed.closed_at)
+        self.assertEqual(closed.slots_booked, 1)
+        self.assertEqual(first.cohort, closed)
+
+        # The next cohort opens on the next booking, from a stale course too
+        second = Booking.objects.reserve(self.course, self.learner)
+        self.assertEqual(second.cohort.number, 2)
+        self.assertIsNone(second.cohort.closed_at)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.current_cohort, second.cohort)
+        self.assertEqual(closed.bookings.count(), 1)
+
+    def test_scheduling_the_next_run_opens_the_next_cohort(self):
+        rollover_expired_courses()
+        self.course.refresh_from_db()
+        self.assertIsNone(self.course.current_cohort)
+
+        self.course.start_date = self.today + timedelta(days=7)
+        self.course.end_date = self.today + timedelta(days=14)
+        self.course.save()
+
+        cohort = self.course.current_cohort
+        self.assertEqual(cohort.number, 2)
+        self.assertEqual(cohort.start_date, self.today + timedelta(days=7))
+        self.assertEqual(self.course.cohorts.count(), 2)
+
+
+class StaleCourseSaveTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.learners = [
+            User.objects.create(username=f'learner{i}', email=f'learner{i}@slotflow.com') for i in range(2)
+        ]
+        self.course = make_course(self.admin, slots_total=1)
+
+    def test_stale_save_keeps_seats_claimed_since(self):
+        stale = Course.objects.get(pk=self.course.pk)
+        Booking.objects.reserve(self.course, self.learners[0])
+
+        stale.title = 'Advanced carpentry'
+        stale.save()
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.title, 'Advanced carpentry')
+        self.assertEqual(self.course.slots_booked, 1)
+        with self.assertRaisesMessage(ValidationError, "Course is full"):
+            Booking.objects.reserve(self.course, self.learners[1])
+
+    def test_stale_save_after_rollover_leaves_closed_cohort_alone(self):
+        stale = Course.objects.get(pk=self.course.pk)
+        Course.objects.filter(pk=self.course.pk).update(end_date=timezone.now().date() - timedelta(days=1))
+        rollover_expired_courses()
+
+        stale.slots_total = 5
+        stale.save()
+
+        self.assertEqual(Cohort.objects.get(course=self.course, number=1).slots_total, 1)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.cohort_number, 2)
+        self.assertIsNone(self.course.current_cohort)
+
+    def test_deactivating_writes_only_the_flag(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        Course.objects.filter(pk=self.course.pk).update(title='Renamed elsewhere')
+
+        response = client.delete(f'/api/courses/{self.course.pk}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.course.refresh_from_db()
+        self.assertFalse(self.course.is_active)
+        self.assertEqual(self.course.title, 'Renamed elsewhere')
+
+
+class CohortRolloverBatchTests(TestCase):
+    """The rollover costs a fixed number of queries per batch, not per course."""
+
+    courses_count = 300
+    batch_size = 100
+    # Lock and read the batch, close cohorts, archive bookings, drop waitlist
+    # entries and holds, reset the courses; each batch in its own savepoint
+    queries_per_batch = 8
+
+    def test_rollover_runs_in_batches(self):
+        admin = make_admin()
+        learner = make_learner()
+        today = timezone.now().date()
+        Course.objects.bulk_create([
+            Course(
+                title=f'Course {i}', description='Expired', instructor=admin,
+                start_date=today - timedelta(days=30), end_date=today - timedelta(days=1 + i % 20),
+                duration_hours=10, slots_total=20, slots_booked=1
+            )
+            for i in range(self.courses_count)
+        ])
+        cohorts = Cohort.objects.bulk_create([
+            Cohort(course_id=course_id, number=1, slots_total=20)
+            for course_id in Course.objects.values_list('id', flat=True)
+        ])
+        Course.objects.update(current_cohort=Subquery(
+            Cohort.objects.filter(course=OuterRef('pk')).values('pk')[:1]
+        ))
+        Booking.objects.bulk_create([
+            Booking(course_id=cohort.course_id, cohort=cohort, learner=learner)
+            for cohort in cohorts
+        ])
+
+        batches = self.courses_count // self.batch_size
+        # Plus the read that finds nothing left, in a savepoint of its own
+        with self.assertNumQueries(batches * self.queries_per_batch + 3):
+            rolled = rollover_expired_courses(batch_size=self.batch_size)
+
+        self.assertEqual(rolled, self.courses_count)
+        self.assertFalse(Course.objects.filter(end_date__isnull=False).exists())
+        self.assertFalse(Booking.objects.filter(is_archived=False).exists())
+        self.assertEqual(
+            set(Cohort.objects.values_list('slots_booked', flat=True)), {1}
+        )
+        self.assertFalse(Cohort.objects.filter(closed_at__isnull=True).exists())
@@ -1,5 +1,8 @@
 from django.urls import path
-from .views import CourseListView, CourseDetailView, CoursePictureView, ActiveCourseListView, InactiveCourseListView
+from .views import (
+    CourseListView, CourseDetailView, CoursePictureView, ActiveCourseListView, InactiveCourseListView,
+    CourseSearchView, course_events,
+)
 
 urlpatterns = [
     path('', CourseListView.as_view(), name='course-list'),
@@ -7,5 +10,7 @@ urlpatterns = [
     path('<int:pk>/course-picture/', CoursePictureView.as_view(), name='course-picture'),
     path('active/', ActiveCourseListView.as_view(), name='active-courses'),
     path('inactive/', InactiveCourseListView.as_view(), name='inactive-courses'),
+    path('search/', CourseSearchView.as_view(), name='course-search'),
+    path('events/', course_events, name='course-events'),
 
 ]
@@ -1,27 +1,119 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from .models import Course
 from .serializers import CourseSerializer
+from .pagination import CourseKeysetPagination
+from .cache import AsyncCachedListMixin, AsyncCachedRetrieveMixin, CachedListMixin
+from .events import SLOT_FIELDS, get_broker, slot_event
+from .filters import CourseFilterSerializer, afacet_counts, facet_counts, filter_courses
+from .search import search_terms
 from accounts.models import User
+from accounts.authentication import ClaimsJWTAuthentication, get_user_instance
+from core.async_views import AsyncDispatchMixin, AsyncListMixin, AsyncRetrieveMixin
+from core.conditional import AsyncConditionalGetMixin, ConditionalGetMixin
+from uploads.images import replace_picture
+from uploads.serializers import save_with_picture
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Max
 from django.utils import timezone
 
-class CourseListView(generics.ListCreateAPIView):
+LIST_VALIDATORS = {
+    'last_modified': Max('updated_at'),
+    'count': Count('id'),
+}
+
+class CourseFilterMixin:
+    """Filters a course list by the query parameters in ``courses.filters``."""
+    def get_course_filters(self):
+        if not hasattr(self, '_course_filters'):
+            params = CourseFilterSerializer(data=self.request.query_params)
+            params.is_valid(raise_exception=True)
+            self._course_filters = params.validated_data
+        return self._course_filters
+
+    def filter_queryset(self, queryset):
+        return filter_courses(super().filter_queryset(queryset), self.get_course_filters())
+
+class CourseFacetsMixin(CourseFilterMixin):
+    """Adds facet counts to the page when ``?facets=true`` is given."""
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200 and self.get_course_filters()['facets']:
+            response.data['facets'] = facet_counts(self.filter_queryset(self.get_queryset()))
+        return response
+
+    async def alist(self, request, *args, **kwargs):
+        response = await super().alist(request, *args, **kwargs)
+        if response.status_code == 200 and self.get_course_filters()['facets']:
+            response.data['facets'] = await afacet_counts(self.filter_queryset(self.get_queryset()))
+        return response
+
+class CourseListConditionalMixin(ConditionalGetMixin):
+    def get_validators(self):
+        return self.validators(self.filter_queryset(self.get_queryset()).aggregate(**LIST_VALIDATORS))
+
+    def validators(self, stats):
+        if not self.get_course_filters()['facets']:
+            return stats['last_modified'], [stats['count']]
+        # Facet date windows count from today, so the page changes at midnight
+        midnight = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        last_modified = max(filter(None, [stats['last_modified'], midnight]))
+        return last_modified, [stats['count'], midnight.date()]
+
+class AsyncCourseListConditionalMixin(CourseListConditionalMixin, AsyncConditionalGetMixin):
+    async def aget_validators(self):
+        return self.validators(await self.filter_queryset(self.get_queryset()).aaggregate(**LIST_VALIDATORS))
+
+# The public catalogue is the most polled part of the API, so under ASGI
+# (ASYNC_VIEWS) its reads are served on the event loop. Writes keep running
+# in a thread. Under WSGI these are ordinary sync views.
+
+class CourseListView(AsyncDispatchMixin, AsyncCourseListConditionalMixin, AsyncCachedListMixin,
+                     CourseFacetsMixin, AsyncListMixin, generics.ListCreateAPIView):
     queryset = Course.objects.filter(is_active=True)
     serializer_class = CourseSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     parser_classes = [MultiPartParser, FormParser]
+    pagination_class = CourseKeysetPagination
 
     def perform_create(self, serializer):
         # Ensure new courses are always active by default
-        serializer.save(instructor=self.request.user, is_active=True)
+        save_with_picture(
+            serializer, 'course_picture',
+            instructor=get_user_instance(self.request.user), is_active=True
+        )
 
-class CourseDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CourseDetailView(AsyncDispatchMixin, AsyncConditionalGetMixin, AsyncCachedRetrieveMixin,
+                       AsyncRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     parser_classes = [MultiPartParser, FormParser]
 
+    def validator_queryset(self):
+        return self.get_queryset().filter(pk=self.kwargs['pk']).values_list('updated_at', flat=True)
+
+    def get_validators(self):
+        updated_at = self.validator_queryset().first()
+        if updated_at is None:
+            return None  # Let retrieve() answer 404
+        return updated_at, []
+
+    async def aget_validators(self):
+        updated_at = await self.validator_queryset().afirst()
+        if updated_at is None:
+            return None  # Let aretrieve() answer 404
+        return updated_at, []
+
     def perform_update(self, serializer):
         instance = self.get_object()
         
@@ -29,12 +121,14 @@ class CourseDetailView(generics.RetrieveUpdateDestroyAPIView):
         if 'is_active' in self.request.data:
             del self.request.data['is_active']
             
-        serializer.save(instructor=self.request.user)
+        save_with_picture(
+            serializer, 'course_picture', instructor=get_user_instance(self.request.user)
+        )
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         instance.is_active = False
-        instance.save()
+        instance.save(update_fields=['is_active', 'updated_at'])
         return Response(
             {"detail": "Course deactivated successfully"},
             status=status.HTTP_200_OK
@@ -53,13 +147,16 @@ class CoursePictureView(generics.GenericAPIView):
                 {"detail": "No image file provided"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        if course.course_picture:
-            course.course_picture.delete()
-        
-        course.course_picture = request.FILES['course_picture']
-        course.save()
-        
+
+        # Normalised here; variants are generated after commit
+        try:
+            replace_picture(course, 'course_picture', request.FILES['course_picture'])
+        except DjangoValidationError as e:
+            return Response(
+                {"detail": e.messages[0]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         return Response(
             {"detail": "Course picture updated successfully"},
             status=status.HTTP_200_OK
@@ -72,28 +169,119 @@ class CoursePictureView(generics.GenericAPIView):
                 {"detail": "No course picture to delete"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
-        course.course_picture.delete()
-        course.course_picture = None
-        course.save()
-        
+
+        replace_picture(course, 'course_picture', None)
+
         return Response(
             {"detail": "Course picture deleted successfully"},
             status=status.HTTP_200_OK
         )
 
-class ActiveCourseListView(generics.ListAPIView):
+class ActiveCourseListView(AsyncDispatchMixin, AsyncCourseListConditionalMixin, AsyncCachedListMixin,
+                           CourseFacetsMixin, AsyncListMixin, generics.ListAPIView):
     serializer_class = CourseSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = CourseKeysetPagination
 
     def get_queryset(self):
         return Course.objects.filter(is_active=True)
 
 
-class InactiveCourseListView(generics.ListAPIView):
+class InactiveCourseListView(CourseListConditionalMixin, CourseFacetsMixin, generics.ListAPIView):
     serializer_class = CourseSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = CourseKeysetPagination
 
     def get_queryset(self):
         return Course.objects.filter(is_active=False)
 
+
+class CourseSearchView(CachedListMixin, CourseFilterMixin, generics.ListAPIView):
+    """
+    ``?q=rough carp`` returns the best matching active courses, best first.
+    ``?limit=`` asks for up to ``COURSE_SEARCH_MAX_RESULTS`` of them, and
+    the course list filters (``?language=``, ``?has_free_slots=``, ...)
+    narrow the matches.
+    """
+    queryset = Course.objects.all()
+    serializer_class = CourseSerializer
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = None
+
+    def get(self, request, *args, **kwargs):
+        if not search_terms(request.query_params.get('q', '')):
+            return Response(
+                {"detail": "Search text is required (?q=)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().get(request, *args, **kwargs)
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            return settings.COURSE_SEARCH_RESULTS
+        return min(max(limit, 1), settings.COURSE_SEARCH_MAX_RESULTS)
+
+    def filter_queryset(self, queryset):
+        return super().filter_queryset(queryset).search(
+            self.request.query_params['q'], self.get_limit()
+        )
+
+
+def _sse(event):
+    return f"event: slots\ndata: {json.dumps(event)}\n\n"
+
+
+async def _slot_stream(course_ids):
+    broker = get_broker()
+    # Subscribe before reading the snapshot so no change falls in between
+    queue = broker.subscribe(course_ids)
+    try:
+        yield "retry: 5000\n\n"
+        async for row in Course.objects.filter(pk__in=course_ids, is_active=True).values(*SLOT_FIELDS):
+            yield _sse(slot_event(row))
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.SLOT_EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse(event)
+    finally:
+        broker.unsubscribe(queue, course_ids)
+
+
+async def course_events(request):
+    """
+    Server-Sent Events stream of slot counts for ``?courses=1,2,3``: the
+    current counts first, then one ``slots`` event each time a booking,
+    cancellation or hold changes them. Served under ASGI, each open browser
+    costs one idle coroutine instead of repeated list requests.
+
+    Under WSGI the stream would hold a worker thread per browser without
+    ever sending an event, so it answers 503 instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "Live slot updates need the ASGI server (core.asgi)"}, status=503
+        )
+    try:
+        course_ids = sorted({int(pk) for pk in request.GET.get('courses', '').split(',') if pk})
+    except ValueError:
+        return JsonResponse({"detail": "courses must be a comma-separated list of ids"}, status=400)
+    if not course_ids or len(course_ids) > settings.SLOT_EVENTS_MAX_COURSES:
+        return JsonResponse(
+            {"detail": f"Subscribe to between 1 and {settings.SLOT_EVENTS_MAX_COURSES} courses"},
+            status=400
+        )
+
+    response = StreamingHttpResponse(_slot_stream(course_ids), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
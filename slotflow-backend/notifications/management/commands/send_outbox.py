@@ -0,0 +1,81 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from notifications.models import OutboxMessage
+from profiling.stats import profile_task
+
+class Command(BaseCommand):
+    help = "Deliver queued booking and cancellation emails from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.OUTBOX_BATCH_SIZE,
+            help="Messages claimed and sent per SMTP connection"
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help="Keep polling the outbox instead of exiting once it is drained"
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help="Seconds to sleep between polls when --loop is set"
+        )
+        parser.add_argument(
+            '--email-backend',
+            default=None,
+            help="Override EMAIL_BACKEND, e.g. django.core.mail.backends.filebased.EmailBackend"
+        )
+
+    def handle(self, *args, **options):
+        sent = failed = 0
+        while True:
+            batch = OutboxMessage.objects.claim_due(options['batch_size'])
+            if batch:
+                batch_sent, batch_failed = self.deliver(batch, options['email_backend'])
+                sent += batch_sent
+                failed += batch_failed
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} message(s), {failed} failed"))
+
+    def deliver(self, batch, backend=None):
+        # One connection for the whole batch instead of one per email
+        connection = get_connection(backend=backend)
+        try:
+            connection.open()
+        except Exception as e:
+            for message in batch:
+                self.fail(message, e)
+            return 0, len(batch)
+
+        sent = failed = 0
+        try:
+            for message in batch:
+                with profile_task(f'outbox {message.template}'):
+                    try:
+                        message.build_email(connection).send()
+                    except Exception as e:
+                        self.fail(message, e)
+                        failed += 1
+                    else:
+                        message.mark_sent()
+                        sent += 1
+        finally:
+            connection.close()
+        return sent, failed
+
+    def fail(self, message, error):
+        message.mark_failed(error)
+        if message.status == OutboxMessage.STATUS_DEAD:
+            self.stderr.write(f"Dead-lettered {message}: {error}")
@@ -0,0 +1,162 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import models, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from bookings.models import Booking
+from profiling.recorder import span
+
+# Emails sent for each booking event: (template, audience)
+EVENT_MESSAGES = {
+    'booking': [
+        ('booking_confirmation', 'learner'),
+        ('admin_booking_notification', 'instructor'),
+    ],
+    # A waitlisted learner got the slot freed by a cancellation
+    'promotion': [
+        ('waitlist_promotion', 'learner'),
+        ('admin_booking_notification', 'instructor'),
+    ],
+    'cancellation': [
+        ('cancellation_confirmation', 'learner'),
+        ('admin_cancellation_notification', 'instructor'),
+    ],
+}
+
+SUBJECTS = {
+    'booking_confirmation': "Booking Confirmation: {course.title}",
+    'admin_booking_notification': "New Booking: {user.username} for {course.title}",
+    'waitlist_promotion': "Off the Waitlist: {course.title}",
+    'cancellation_confirmation': "Booking Cancelled: {course.title}",
+    'admin_cancellation_notification': "Booking Cancelled: {user.username} for {course.title}",
+}
+
+class OutboxMessageManager(models.Manager):
+    def enqueue(self, booking, event):
+        """
+        Queue the emails for a booking event.
+
+        Call this inside the transaction that changes the booking so the
+        messages commit (or roll back) together with it. Nothing is rendered
+        here; the worker builds the emails when it drains the outbox.
+        """
+        return self.bulk_create([
+            self.model(booking=booking, template=template, audience=audience)
+            for template, audience in EVENT_MESSAGES[event]
+        ])
+
+    def enqueue_many(self, booking_ids, event):
+        """``enqueue`` for many bookings of the same event, in one INSERT."""
+        return self.bulk_create([
+            self.model(booking_id=booking_id, template=template, audience=audience)
+            for booking_id in booking_ids
+            for template, audience in EVENT_MESSAGES[event]
+        ])
+
+    def claim_due(self, batch_size):
+        """
+        Lease up to ``batch_size`` due messages to the calling worker.
+
+        Claimed messages are pushed ``OUTBOX_LEASE_SECONDS`` into the future so
+        other workers skip them; a worker that dies mid-batch simply lets the
+        lease run out and the messages become due again.
+        """
+        now = timezone.now()
+        lease = timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        with transaction.atomic():
+            messages = list(
+                self.select_for_update(skip_locked=True)
+                .filter(status=OutboxMessage.STATUS_PENDING, next_attempt_at__lte=now)
+                .order_by('next_attempt_at', 'id')[:batch_size]
+            )
+            self.filter(pk__in=[m.pk for m in messages]).update(next_attempt_at=now + lease)
+
+        # Rendering needs the booking, learner, course and instructor
+        return list(
+            self.filter(pk__in=[m.pk for m in messages])
+            .select_related('booking__learner', 'booking__course__instructor')
+            .order_by('id')
+        )
+
+class OutboxMessage(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_DEAD, 'Dead'),
+    ]
+    AUDIENCE_CHOICES = [
+        ('learner', 'Learner'),
+        ('instructor', 'Instructor'),
+    ]
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='notifications')
+    template = models.CharField(max_length=100)
+    audience = models.CharField(max_length=20, choices=AUDIENCE_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OutboxMessageManager()
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.template} for booking {self.booking_id} ({self.status})"
+
+    def get_context(self):
+        booking = self.booking
+        return {
+            'course': booking.course,
+            'user': booking.learner,
+            'booking_date': booking.booked_at,
+            'cancellation_date': booking.cancelled_at,
+        }
+
+    def get_recipient(self):
+        if self.audience == 'instructor':
+            return self.booking.course.instructor.email
+        return self.booking.learner.email
+
+    def build_email(self, connection=None):
+        context = self.get_context()
+        with span('template'):
+            text = render_to_string(f'emails/{self.template}.txt', context)
+            html = render_to_string(f'emails/{self.template}.html', context)
+        email = EmailMultiAlternatives(
+            SUBJECTS[self.template].format(**context),
+            text,
+            settings.DEFAULT_FROM_EMAIL,
+            [self.get_recipient()],
+            connection=connection
+        )
+        email.attach_alternative(html, 'text/html')
+        return email
+
+    def mark_sent(self):
+        self.status = self.STATUS_SENT
+        self.sent_at = timezone.now()
+        self.last_error = ''
+        self.save(update_fields=['status', 'sent_at', 'last_error'])
+
+    def mark_failed(self, error):
+        """Schedule a retry with exponential backoff, or dead-letter the message."""
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            self.status = self.STATUS_DEAD
+        else:
+            delay = settings.OUTBOX_RETRY_BACKOFF_SECONDS * 2 ** (self.attempts - 1)
+            self.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        self.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
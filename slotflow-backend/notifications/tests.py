@@ -0,0 +1,101 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bookings.models import Booking
+from core.testing import make_admin, make_course, make_learner
+from .models import OutboxMessage
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.admin = make_admin()
+        self.learner = make_learner()
+        self.course = make_course(self.admin, title='Plumbing 101', slots_total=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.learner)
+
+    def drain(self):
+        call_command('send_outbox', stdout=StringIO(), stderr=StringIO())
+
+    def test_booking_queues_emails_instead_of_sending(self):
+        response = self.client.post('/api/bookings/', {'course': self.course.pk})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list('template', flat=True)),
+            ['admin_booking_notification', 'booking_confirmation']
+        )
+
+    def test_worker_sends_queued_emails(self):
+        self.client.post('/api/bookings/', {'course': self.course.pk})
+        self.drain()
+
+        self.assertEqual(
+            sorted((m.subject, m.to[0]) for m in mail.outbox),
+            [
+                ('Booking Confirmation: Plumbing 101', 'learner@slotflow.com'),
+                ('New Booking: learner for Plumbing 101', 'admin@slotflow.com'),
+            ]
+        )
+        self.assertFalse(OutboxMessage.objects.exclude(status=OutboxMessage.STATUS_SENT).exists())
+
+    def test_cancellation_queues_emails(self):
+        booking = Booking.objects.reserve(self.course, self.learner)
+        response = self.client.patch(f'/api/bookings/{booking.pk}/cancel/', {'confirm': True})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(booking.notifications.values_list('template', flat=True)),
+            ['admin_cancellation_notification', 'cancellation_confirmation']
+        )
+
+    def test_failed_booking_queues_nothing(self):
+        self.course.is_active = False
+        self.course.save()
+
+        response = self.client.post('/api/bookings/', {'course': self.course.pk})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_BACKOFF_SECONDS=60)
+    def test_failures_back_off_then_dead_letter(self):
+        booking = Booking.objects.reserve(self.course, self.learner)
+        OutboxMessage.objects.enqueue(booking, 'booking')
+
+        with mock.patch.object(OutboxMessage, 'build_email', side_effect=OSError('relay down')):
+            self.drain()
+            message = OutboxMessage.objects.first()
+            self.assertEqual(message.attempts, 1)
+            self.assertEqual(message.status, OutboxMessage.STATUS_PENDING)
+            self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=30))
+
+            OutboxMessage.objects.update(next_attempt_at=timezone.now())
+            self.drain()
+
+        self.assertEqual(
+            set(OutboxMessage.objects.values_list('status', flat=True)),
+            {OutboxMessage.STATUS_DEAD}
+        )
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_batch_reuses_one_connection(self):
+        booking = Booking.objects.reserve(self.course, self.learner)
+        OutboxMessage.objects.enqueue(booking, 'booking')
+        OutboxMessage.objects.enqueue(booking, 'booking')
+
+        with mock.patch('notifications.management.commands.send_outbox.get_connection',
+                        wraps=mail.get_connection) as get_connection:
+            self.drain()
+
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 4)
@@ -0,0 +1,55 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from profiling import stats
+
+class Command(BaseCommand):
+    help = "Show per-route request timings collected by the profiling middleware"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help="Print the full summary, histograms included, as JSON"
+        )
+        parser.add_argument(
+            '--route',
+            default='',
+            help="Only routes containing this text, e.g. api/bookings/"
+        )
+
+    def handle(self, *args, **options):
+        if not settings.REQUEST_PROFILING_DIR:
+            raise CommandError("REQUEST_PROFILING_DIR is not set, so workers keep their timings in memory")
+
+        summary = {
+            route: route_stats
+            for route, route_stats in stats.summarise(stats.collect()).items()
+            if options['route'] in route
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        if not summary:
+            self.stdout.write("No requests recorded yet (is REQUEST_PROFILING on?)")
+            return
+
+        headers = ['route', 'count', 'mean', 'p95', 'p99', 'max', 'queries', 'db', 'serialize', 'render', 'template']
+        rows = [
+            [
+                route, s['count'], s['mean_ms'], self.bound(s['p95_ms']), self.bound(s['p99_ms']), s['max_ms'],
+                s['queries_per_request'], s['db_mean_ms'], s['serialize_mean_ms'], s['render_mean_ms'],
+                s['template_mean_ms'],
+            ]
+            for route, s in summary.items()
+        ]
+        widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+        line = f'{{:<{widths[0]}}}  ' + '  '.join(f'{{:>{w}}}' for w in widths[1:])
+        self.stdout.write(line.format(*headers))
+        for row in rows:
+            self.stdout.write(line.format(*row))
+        self.stdout.write("Times in ms; p95/p99 are histogram bucket bounds, db/serialize/render/template are means")
+
+    def bound(self, value):
+        return f'<={value}' if value is not None else f'>{stats.BUCKETS[-1]}'
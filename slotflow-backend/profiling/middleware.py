@@ -0,0 +1,68 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import recorder, stats
+
+
+class ProfilingMiddleware:
+    """
+    Times each request and reports it in a ``Server-Timing`` header:
+
+        Server-Timing: total;dur=41.2, db;dur=3.1;desc="4 queries", serialize;dur=2.4, render;dur=0.6
+
+    and adds it to the per-route aggregates in ``profiling.stats``. Put it
+    first in ``MIDDLEWARE``. Unless ``REQUEST_PROFILING`` is on it removes
+    itself when the server starts, so a disabled profiler costs nothing.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        recorder.instrument()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profile, token = recorder.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            recorder.stop(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile, token = recorder.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            recorder.stop(token)
+        return self.finish(request, response, profile)
+
+    def process_template_response(self, request, response):
+        # Called just before the body is rendered (DRF responses included)
+        render = recorder.span('render')
+        render.__enter__()
+        response.add_post_render_callback(lambda rendered: render.__exit__(None, None, None))
+        return response
+
+    def finish(self, request, response, profile):
+        total_ms = profile.elapsed_ms()
+        metrics = [f'total;dur={total_ms:.1f}']
+        if profile.queries:
+            metrics.append(f'db;dur={profile.timings["db"]:.1f};desc="{profile.queries} queries"')
+        for category in ('serialize', 'render', 'template'):
+            if category in profile.timings:
+                metrics.append(f'{category};dur={profile.timings[category]:.1f}')
+        response['Server-Timing'] = ', '.join(metrics)
+
+        match = request.resolver_match
+        route = f"{request.method} /{match.route if match else '<unresolved>'}"
+        stats.record(route, profile, total_ms, failed=response.status_code >= 500)
+        return response
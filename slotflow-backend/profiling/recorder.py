@@ -0,0 +1,125 @@
+"""
+Timing of the work done for one request (or one background task).
+
+The profile being recorded lives in a context variable, so it follows the
+request into ``sync_to_async`` threads, and every hook below is a no-op
+when no profile is active. Nothing is hooked until ``instrument()`` is
+called, which only happens when ``REQUEST_PROFILING`` is on:
+
+* ``db``: every query, through an execute wrapper on each connection,
+* ``serialize``: DRF serializers building ``.data``,
+* ``render``: rendering the response body (added by the middleware),
+* ``template``: template rendering wrapped in ``span('template')``, such
+  as the outbox emails.
+
+Categories overlap: queries run while serializing count in both.
+"""
+import atexit
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_current = ContextVar('request_profile', default=None)
+_instrumented = False
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = defaultdict(float)  # category -> ms
+        self.queries = 0
+        self._active = set()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+class _Span:
+    def __init__(self, profile, category):
+        self.profile = profile
+        self.category = category
+
+    def __enter__(self):
+        self.profile._active.add(self.category)
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profile.timings[self.category] += (time.perf_counter() - self.started) * 1000
+        self.profile._active.discard(self.category)
+
+
+class _NoSpan:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(category):
+    """Time the block under ``category`` if a profile is being recorded."""
+    profile = _current.get()
+    if profile is None or category in profile._active:
+        # Nested spans of the same category are counted once
+        return _NO_SPAN
+    return _Span(profile, category)
+
+
+def start():
+    """Begin recording a profile in the current context."""
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.timings['db'] += (time.perf_counter() - started) * 1000
+
+
+def _wrap_connection(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+def _timed_serializer_data(data):
+    def timed(self):
+        with span('serialize'):
+            return data.fget(self)
+    return property(timed)
+
+
+def instrument():
+    """Install the hooks; called once, only when profiling is enabled."""
+    global _instrumented
+    if _instrumented or not settings.REQUEST_PROFILING:
+        return
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    from rest_framework.serializers import BaseSerializer
+    from .stats import flush
+
+    # Connections are per thread: wrap the ones that exist and every new one
+    connection_created.connect(_wrap_connection, weak=False)
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+    # Serializer and ListSerializer build .data through BaseSerializer.data
+    BaseSerializer.data = _timed_serializer_data(BaseSerializer.data)
+    # Keep the last few seconds' aggregates when the process stops
+    atexit.register(flush)
+    _instrumented = True
@@ -0,0 +1,178 @@
+"""
+Per-route aggregates of recorded profiles.
+
+Each process keeps its own totals and a latency histogram per route, and
+every ``REQUEST_PROFILING_FLUSH_SECONDS`` writes them to a snapshot file in
+``REQUEST_PROFILING_DIR``. ``collect()`` merges the snapshots of every
+process (including ones that have since exited), so the management command
+and the endpoint see the whole deployment rather than a single worker.
+Delete the directory to start afresh.
+"""
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+from . import recorder
+
+# Upper bounds of the latency histogram buckets, in ms; the last is open
+BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+TIMED = ('db', 'serialize', 'render', 'template')
+
+_routes = {}
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _empty():
+    return {
+        'count': 0,
+        'errors': 0,
+        'total_ms': 0.0,
+        'max_ms': 0.0,
+        'queries': 0,
+        **{f'{category}_ms': 0.0 for category in TIMED},
+        'buckets': [0] * (len(BUCKETS) + 1),
+    }
+
+
+def _bucket(ms):
+    for index, bound in enumerate(BUCKETS):
+        if ms <= bound:
+            return index
+    return len(BUCKETS)
+
+
+def record(route, profile, total_ms, failed=False):
+    with _lock:
+        stats = _routes.setdefault(route, _empty())
+        stats['count'] += 1
+        stats['errors'] += failed
+        stats['total_ms'] += total_ms
+        stats['max_ms'] = max(stats['max_ms'], total_ms)
+        stats['queries'] += profile.queries
+        for category in TIMED:
+            stats[f'{category}_ms'] += profile.timings.get(category, 0.0)
+        stats['buckets'][_bucket(total_ms)] += 1
+    flush_if_due()
+
+
+@contextmanager
+def profile_task(route):
+    """Profile background work, such as sending an email, under ``route``."""
+    if not settings.REQUEST_PROFILING:
+        yield
+        return
+    recorder.instrument()
+    profile, token = recorder.start()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        recorder.stop(token)
+        record(route, profile, profile.elapsed_ms(), failed)
+
+
+def reset():
+    global _last_flush
+    with _lock:
+        _routes.clear()
+        _last_flush = time.monotonic()
+
+
+def snapshot():
+    """This process's aggregates."""
+    with _lock:
+        return json.loads(json.dumps(_routes))
+
+
+def _snapshot_path():
+    return Path(settings.REQUEST_PROFILING_DIR) / f'{socket.gethostname()}-{os.getpid()}.json'
+
+
+def flush():
+    """Write this process's aggregates to its snapshot file."""
+    global _last_flush
+    if not settings.REQUEST_PROFILING_DIR:
+        return
+    data = snapshot()
+    _last_flush = time.monotonic()
+    if not data:
+        return
+    directory = Path(settings.REQUEST_PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    # Written aside and renamed so readers never see half a file
+    with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as f:
+        json.dump(data, f)
+    os.replace(f.name, _snapshot_path())
+
+
+def flush_if_due():
+    if time.monotonic() - _last_flush >= settings.REQUEST_PROFILING_FLUSH_SECONDS:
+        flush()
+
+
+def _merge(into, stats):
+    for key, value in stats.items():
+        if key == 'buckets':
+            into[key] = [a + b for a, b in zip(into[key], value)]
+        elif key == 'max_ms':
+            into[key] = max(into[key], value)
+        else:
+            into[key] += value
+
+
+def collect():
+    """Aggregates of every process that flushed to ``REQUEST_PROFILING_DIR``."""
+    if not settings.REQUEST_PROFILING_DIR:
+        return snapshot()
+    merged = {}
+    for path in sorted(Path(settings.REQUEST_PROFILING_DIR).glob('*.json')):
+        try:
+            routes = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # Removed or replaced while reading
+        for route, stats in routes.items():
+            _merge(merged.setdefault(route, _empty()), stats)
+    return merged
+
+
+def percentile(buckets, p):
+    """Upper bound of the bucket holding the ``p``th percentile, in ms."""
+    count = sum(buckets)
+    if not count:
+        return None
+    seen = 0
+    for index, n in enumerate(buckets):
+        seen += n
+        if seen * 100 >= p * count:
+            return BUCKETS[index] if index < len(BUCKETS) else None
+    return None
+
+
+def summarise(routes):
+    """Per-route means and percentile estimates, slowest total first."""
+    summary = {}
+    for route, stats in sorted(routes.items(), key=lambda item: -item[1]['total_ms']):
+        count = stats['count']
+        summary[route] = {
+            'count': count,
+            'errors': stats['errors'],
+            'mean_ms': round(stats['total_ms'] / count, 2),
+            'max_ms': round(stats['max_ms'], 2),
+            **{f'p{p}_ms': percentile(stats['buckets'], p) for p in (50, 95, 99)},
+            'queries_per_request': round(stats['queries'] / count, 2),
+            **{
+                f'{category}_mean_ms': round(stats[f'{category}_ms'] / count, 2)
+                for category in TIMED
+            },
+            'histogram': dict(zip([str(b) for b in BUCKETS] + ['inf'], stats['buckets'])),
+        }
+    return summary
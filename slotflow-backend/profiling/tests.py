@@ -0,0 +1,145 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from bookings.models import Booking
+from core.testing import authenticate, make_admin, make_course, make_learner
+from notifications.models import OutboxMessage
+from . import stats
+from .middleware import ProfilingMiddleware
+
+
+def server_timing(response):
+    metrics = {}
+    for metric in response['Server-Timing'].split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+class ProfilingTestCase(TestCase):
+    def setUp(self):
+        self.stats_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            REQUEST_PROFILING=True, REQUEST_PROFILING_DIR=self.stats_dir, REQUEST_PROFILING_FLUSH_SECONDS=3600
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.stats_dir, ignore_errors=True)
+        self.addCleanup(stats.reset)
+        stats.reset()
+
+        self.admin = make_admin(is_staff=True)
+        self.learner = make_learner()
+        self.course = make_course(self.admin)
+        # Created after the override so the middleware is loaded enabled
+        self.client = APIClient()
+
+
+class ServerTimingTests(ProfilingTestCase):
+    def test_header_reports_queries_and_phases(self):
+        authenticate(self.client, self.learner)
+        Booking.objects.reserve(self.course, self.learner)
+
+        with self.assertNumQueries(2) as queries:
+            response = self.client.get('/api/bookings/')
+        metrics = server_timing(response)
+
+        self.assertEqual(metrics['db']['desc'], f'"{len(queries.captured_queries)} queries"')
+        for name in ('total', 'db', 'serialize', 'render'):
+            self.assertGreaterEqual(float(metrics[name]['dur']), 0)
+        self.assertGreaterEqual(float(metrics['total']['dur']), float(metrics['db']['dur']))
+
+    def test_async_views_are_profiled(self):
+        with self.settings(ASYNC_VIEWS=True):
+            response = self.client.get('/api/courses/')
+        metrics = server_timing(response)
+        # The async ORM runs queries in another thread; they still count
+        self.assertEqual(metrics['db']['desc'], '"2 queries"')
+        self.assertIn('serialize', metrics)
+
+    def test_aggregates_per_route(self):
+        self.client.get(f'/api/courses/{self.course.pk}/')
+        self.client.get(f'/api/courses/{self.course.pk}/')
+        self.client.get('/api/courses/')
+        self.client.get('/no-such-page/')
+
+        routes = stats.snapshot()
+        self.assertEqual(routes['GET /api/courses/<int:pk>/']['count'], 2)
+        self.assertEqual(routes['GET /api/courses/']['count'], 1)
+        self.assertEqual(routes['GET /<unresolved>']['count'], 1)
+        self.assertEqual(sum(routes['GET /api/courses/<int:pk>/']['buckets']), 2)
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_disabled_profiler_is_not_loaded(self):
+        client = APIClient()
+        response = client.get('/api/courses/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertFalse(any(
+            isinstance(getattr(m, '__self__', None), ProfilingMiddleware)
+            for m in client.handler._view_middleware + client.handler._template_response_middleware
+        ))
+        self.assertEqual(stats.snapshot(), {})
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxProfilingTests(ProfilingTestCase):
+    def test_email_rendering_is_timed(self):
+        booking = Booking.objects.reserve(self.course, self.learner)
+        OutboxMessage.objects.enqueue(booking, 'booking')
+
+        call_command('send_outbox', stdout=StringIO(), stderr=StringIO())
+
+        route = stats.snapshot()['outbox booking_confirmation']
+        self.assertEqual(route['count'], 1)
+        self.assertGreater(route['template_ms'], 0)
+        self.assertGreater(route['queries'], 0)
+
+
+class ProfilingStatsTests(ProfilingTestCase):
+    def test_endpoint_is_staff_only(self):
+        self.client.get('/api/courses/')
+
+        authenticate(self.client, self.learner)
+        self.assertEqual(self.client.get('/api/profiling/').status_code, 403)
+
+        authenticate(self.client, self.admin)
+        response = self.client.get('/api/profiling/')
+        self.assertEqual(response.status_code, 200)
+        route = response.data['routes']['GET /api/courses/']
+        self.assertEqual(route['count'], 1)
+        self.assertEqual(route['queries_per_request'], 2)
+
+    def test_command_merges_every_process(self):
+        self.client.get('/api/courses/')
+        stats.flush()
+        # Another worker's snapshot, slower than any real request here
+        other = stats._empty()
+        other.update(count=3, total_ms=30_000.0, max_ms=10_000.0, queries=6)
+        other['buckets'][stats._bucket(10_000)] = 3
+        with open(f'{self.stats_dir}/otherhost-1.json', 'w') as f:
+            json.dump({'GET /api/courses/': other}, f)
+
+        out = StringIO()
+        call_command('profiling_stats', '--json', stdout=out)
+        route = json.loads(out.getvalue())['GET /api/courses/']
+        self.assertEqual(route['count'], 4)
+        self.assertEqual(route['max_ms'], 10_000.0)
+
+        out = StringIO()
+        call_command('profiling_stats', '--route', 'api/courses', stdout=out)
+        self.assertIn('GET /api/courses/', out.getvalue())
+
+    def test_percentiles_from_buckets(self):
+        buckets = [0] * (len(stats.BUCKETS) + 1)
+        buckets[stats._bucket(3)] = 90
+        buckets[stats._bucket(400)] = 9
+        buckets[-1] = 1
+        self.assertEqual(stats.percentile(buckets, 50), 5)
+        self.assertEqual(stats.percentile(buckets, 95), 500)
+        self.assertIsNone(stats.percentile(buckets, 100))
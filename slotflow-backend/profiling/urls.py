@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import ProfilingStatsView
+
+urlpatterns = [
+    path('', ProfilingStatsView.as_view(), name='profiling-stats'),
+]
@@ -0,0 +1,20 @@
+from django.conf import settings
+from rest_framework import generics, permissions
+from rest_framework.response import Response
+
+from accounts.authentication import ClaimsJWTAuthentication
+from . import stats
+
+
+class ProfilingStatsView(generics.GenericAPIView):
+    """Per-route timings of every worker, for staff; see ``profiling.stats``."""
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        # Include this worker's latest requests in the merged snapshots
+        stats.flush()
+        return Response({
+            'enabled': settings.REQUEST_PROFILING,
+            'routes': stats.summarise(stats.collect()),
+        })
@@ -0,0 +1,325 @@
+"""
+Normalised uploads and pre-generated variants for course and profile pictures.
+
+Uploads are normalised on the request thread: decoded once (JPEGs at a
+reduced scale where possible), rotated according to their EXIF orientation,
+capped at ``IMAGE_MAX_DIMENSION`` and re-encoded without metadata, so GPS
+tags and camera details never reach disk.
+
+The resized variants in ``IMAGE_VARIANTS``, each as JPEG and WebP, are built
+after the transaction commits on a small worker pool and recorded in the
+model's ``<field>_variants`` JSON field. Until they exist, clients fall back
+to the normalised original.
+
+With ``ContentAddressedStorage`` (see uploads.storage) uploading a file that
+was uploaded before reuses its stored picture and variants without decoding
+anything.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Blob
+from .storage import ContentAddressedStorage, hash_file
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'jpeg': 'JPEG', 'webp': 'WEBP'}
+
+# (model, field name) -> callback run with the pk once new variants are recorded
+_pictures = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def register_picture(model, field_name, on_change=None):
+    """Declare an image field whose variants live in ``<field_name>_variants``."""
+    _pictures[(model, field_name)] = on_change
+
+
+def registered_pictures():
+    return list(_pictures)
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _encode(image, fmt, quality=None):
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        image.convert('RGB').save(
+            buffer, 'JPEG', quality=quality or settings.IMAGE_JPEG_QUALITY,
+            optimize=True, progressive=True
+        )
+    elif fmt == 'WEBP':
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+        image.save(buffer, 'WEBP', quality=quality or settings.IMAGE_WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def _open(fp, max_dimension=None):
+    try:
+        image = Image.open(fp)
+        if max_dimension:
+            # JPEGs decode straight at the nearest smaller scale
+            image.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise ValidationError("Upload a valid image file")
+    return image
+
+
+def normalize_image(upload):
+    """
+    Return ``upload`` re-encoded as a metadata-free JPEG (or PNG, when it has
+    transparency) no larger than ``IMAGE_MAX_DIMENSION`` on either side.
+
+    Raises ``ValidationError`` for oversized or undecodable uploads.
+    """
+    if upload.size > settings.IMAGE_MAX_UPLOAD_BYTES:
+        raise ValidationError(
+            f"Image must be at most {settings.IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+        )
+
+    max_dimension = settings.IMAGE_MAX_DIMENSION
+    image = _open(upload, max_dimension)
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+    stem = os.path.splitext(os.path.basename(upload.name))[0] or 'image'
+    if _has_alpha(image):
+        return ContentFile(_encode(image, 'PNG'), name=f'{stem}.png')
+    return ContentFile(_encode(image, 'JPEG'), name=f'{stem}.jpg')
+
+
+def _resize(image, spec):
+    if spec.get('crop'):
+        return ImageOps.fit(image, spec['size'], Image.Resampling.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail(spec['size'], Image.Resampling.LANCZOS)
+    return resized
+
+
+def generate_variants(storage, name):
+    """
+    Write every configured variant of the stored image ``name`` and return
+    ``{variant: {format: stored name}}``.
+    """
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    with storage.open(name, 'rb') as fp:
+        image = _open(fp)
+
+    variants = {}
+    for variant, spec in settings.IMAGE_VARIANTS.items():
+        resized = _resize(image, spec)
+        variants[variant] = {
+            key: storage.save(
+                os.path.join(directory, 'variants', f'{stem}_{variant}.{key}'),
+                ContentFile(_encode(resized, fmt))
+            )
+            for key, fmt in FORMATS.items()
+        }
+    return variants
+
+
+def variant_names(variants):
+    return [name for formats in (variants or {}).values() for name in formats.values()]
+
+
+def delete_files(storage, names):
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning("Could not delete %s", name, exc_info=True)
+
+
+def acquire_variants(storage, variants):
+    """
+    Take references on previously generated ``variants`` so another picture
+    with the same content can share them. Returns ``{}`` (holding nothing)
+    if any of them is gone or they no longer match ``IMAGE_VARIANTS``.
+    """
+    if not variants or set(variants) != set(settings.IMAGE_VARIANTS):
+        return {}
+    acquired = []
+    for name in variant_names(variants):
+        if not storage.acquire(name):
+            delete_files(storage, acquired)
+            return {}
+        acquired.append(name)
+    return variants
+
+
+def build_variants(model, pk, field_name, reuse=True):
+    """
+    Generate the variants of one stored picture and record them on its row.
+
+    With content-addressed storage, variants already built for the same
+    picture are shared instead of generated again, unless ``reuse`` is off.
+    The row is only updated if it still points at the same picture, so a
+    slow job never overwrites the variants of a newer upload; its own files
+    are released instead. Variants recorded earlier are released once
+    replaced. Returns the recorded variants, or ``None``.
+    """
+    target = variants_field(field_name)
+    row = model.objects.filter(pk=pk).values_list(field_name, target).first()
+    if not row or not row[0]:
+        return None
+    name, previous = row
+
+    storage = model._meta.get_field(field_name).storage
+    content_addressed = isinstance(storage, ContentAddressedStorage)
+    variants = {}
+    if reuse and content_addressed:
+        recorded = Blob.objects.filter(name=name).values_list('variants', flat=True).first()
+        variants = acquire_variants(storage, recorded)
+    if not variants:
+        variants = generate_variants(storage, name)
+
+    updates = {target: variants}
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        updates['updated_at'] = timezone.now()
+    with transaction.atomic():
+        if not model.objects.filter(pk=pk, **{field_name: name}).update(**updates):
+            delete_files(storage, variant_names(variants))
+            return None
+        delete_files(storage, variant_names(previous))
+        if content_addressed:
+            Blob.objects.filter(name=name).update(variants=variants)
+
+    on_change = _pictures.get((model, field_name))
+    if on_change:
+        on_change(pk)
+    return variants
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS, thread_name_prefix='images'
+            )
+        return _executor
+
+
+def _run(fn, *args):
+    try:
+        fn(*args)
+    except Exception:
+        logger.exception("Image job %s%r failed", fn.__name__, args)
+
+
+def _run_in_thread(fn, *args):
+    try:
+        _run(fn, *args)
+    finally:
+        connection.close()
+
+
+def run_after_commit(fn, *args):
+    """
+    Run ``fn(*args)`` on the image worker pool once the current transaction
+    commits, or inline when ``IMAGE_PROCESSING_ASYNC`` is off.
+    """
+    def submit():
+        if settings.IMAGE_PROCESSING_ASYNC:
+            _get_executor().submit(_run_in_thread, fn, *args)
+        else:
+            _run(fn, *args)
+
+    transaction.on_commit(submit)
+
+
+def schedule_variants(instance, field_name):
+    """Queue variant generation for the picture currently on ``instance``."""
+    if getattr(instance, field_name):
+        run_after_commit(build_variants, type(instance), instance.pk, field_name)
+
+
+def release_files(storage, names):
+    """
+    Drop references to stored files within the current transaction. Plain
+    file storage has no references, so its files are deleted after commit.
+    """
+    if isinstance(storage, ContentAddressedStorage):
+        delete_files(storage, names)
+    elif names:
+        run_after_commit(delete_files, storage, names)
+
+
+def _store_upload(instance, field_name, upload):
+    target = variants_field(field_name)
+    field_file = getattr(instance, field_name)
+    storage = field_file.storage
+
+    source_digest = None
+    if isinstance(storage, ContentAddressedStorage):
+        # The same file uploaded before: share its picture and variants
+        source_digest = hash_file(upload)
+        blob = Blob.objects.filter(source_digest=source_digest).first()
+        if blob and storage.acquire(blob.name):
+            setattr(instance, field_name, blob.name)
+            setattr(instance, target, acquire_variants(storage, blob.variants))
+            return
+
+    normalized = normalize_image(upload)
+    field_file.save(normalized.name, normalized, save=False)
+    setattr(instance, target, {})
+    if source_digest:
+        Blob.objects.filter(name=field_file.name, source_digest='').update(
+            source_digest=source_digest
+        )
+
+
+def replace_picture(instance, field_name, upload):
+    """
+    Store ``upload`` (normalised) as ``instance``'s picture, or clear it when
+    ``upload`` is ``None``, and queue variant generation if needed.
+
+    The previous picture and its variants are released in the same
+    transaction that saves the row.
+    """
+    target = variants_field(field_name)
+    field_file = getattr(instance, field_name)
+    storage = field_file.storage
+    stale = ([field_file.name] if field_file else []) + variant_names(getattr(instance, target))
+
+    with transaction.atomic():
+        if upload is None:
+            setattr(instance, field_name, None)
+            setattr(instance, target, {})
+        else:
+            _store_upload(instance, field_name, upload)
+        if instance._state.adding:
+            instance.save()
+        else:
+            # Only the picture columns: the rest of the row may have changed
+            # since the instance was read (a course's booked seats, say)
+            update_fields = [field_name, target]
+            if any(field.name == 'updated_at' for field in instance._meta.concrete_fields):
+                update_fields.append('updated_at')
+            instance.save(update_fields=update_fields)
+        release_files(storage, stale)
+        if not getattr(instance, target):
+            schedule_variants(instance, field_name)
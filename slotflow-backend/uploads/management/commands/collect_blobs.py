@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from uploads.storage import ContentAddressedStorage
+
+class Command(BaseCommand):
+    help = "Delete stored blobs that no longer have any references"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=settings.BLOB_GC_GRACE_SECONDS,
+            help="Only collect blobs unreferenced for at least this many seconds"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Blobs deleted per transaction"
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError("The default storage is not content-addressed")
+
+        removed, freed = default_storage.collect(options['grace'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {removed} file(s), freed {freed / (1024 * 1024):.1f} MB"
+        ))
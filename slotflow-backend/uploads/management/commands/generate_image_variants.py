@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from uploads.images import build_variants, registered_pictures, variants_field
+
+class Command(BaseCommand):
+    help = "Generate missing thumbnail/card/full variants for stored pictures"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Regenerate every picture, e.g. after changing IMAGE_VARIANTS"
+        )
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        for model, field_name in registered_pictures():
+            pictures = model.objects.exclude(
+                Q(**{f'{field_name}__isnull': True}) | Q(**{field_name: ''})
+            )
+            if not options['all']:
+                pictures = pictures.filter(**{variants_field(field_name): {}})
+
+            for pk in pictures.values_list('pk', flat=True).iterator():
+                try:
+                    build_variants(model, pk, field_name)
+                except Exception as e:
+                    self.stderr.write(f"{model.__name__} {pk}: {e}")
+                    failed += 1
+                else:
+                    built += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Generated variants for {built} picture(s), {failed} failed"))
@@ -0,0 +1,56 @@
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+class BlobManager(models.Manager):
+    def acquire(self, name, digest=None, size=None):
+        """
+        Take a reference on the blob stored as ``name``.
+
+        With ``digest`` and ``size`` the row is created when missing (a new
+        file is being stored); without them only an existing row is counted,
+        and ``False`` means the blob has already been collected.
+        """
+        now = timezone.now()
+        if self.filter(name=name).update(refcount=F('refcount') + 1, updated_at=now):
+            return True
+        if digest is None:
+            return False
+        try:
+            with transaction.atomic():
+                self.create(name=name, digest=digest, size=size, refcount=1)
+        except IntegrityError:
+            # Created concurrently by another upload of the same content
+            self.filter(name=name).update(refcount=F('refcount') + 1, updated_at=now)
+        return True
+
+    def release(self, name):
+        """Drop a reference; unreferenced blobs are removed by collect_blobs."""
+        return self.filter(name=name, refcount__gt=0).update(
+            refcount=F('refcount') - 1, updated_at=timezone.now()
+        )
+
+class Blob(models.Model):
+    """One stored file, shared by every field that references the same content."""
+    name = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64)
+    size = models.BigIntegerField()
+    refcount = models.IntegerField(default=0)
+    # Digest of the raw upload this blob was normalised from, so uploading the
+    # same file again can skip the work entirely
+    source_digest = models.CharField(max_length=64, blank=True, db_index=True)
+    # Variants generated from this blob, reused when it is referenced again
+    variants = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BlobManager()
+
+    class Meta:
+        indexes = [
+            # Garbage collection: unreferenced blobs, oldest first
+            models.Index(fields=['refcount', 'updated_at'], name='blob_unreferenced_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
@@ -0,0 +1,50 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import serializers
+
+from .images import replace_picture
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Renders a ``<field>_variants`` mapping as
+    ``{variant: {'jpeg': url, 'webp': url}}``; empty until they are generated.
+    """
+
+    def __init__(self, storage=None, **kwargs):
+        self.storage = storage
+        super().__init__(**kwargs)
+
+    def get_storage(self):
+        if self.storage is None:
+            model = self.parent.Meta.model
+            image_field = self.source.removesuffix('_variants')
+            self.storage = model._meta.get_field(image_field).storage
+        return self.storage
+
+    def to_representation(self, value):
+        storage = self.get_storage()
+        request = self.context.get('request')
+        urls = {}
+        for variant, formats in (value or {}).items():
+            urls[variant] = {}
+            for key, name in formats.items():
+                url = storage.url(name)
+                urls[variant][key] = request.build_absolute_uri(url) if request else url
+        return urls
+
+
+def save_with_picture(serializer, field_name, **kwargs):
+    """
+    ``serializer.save(**kwargs)``, with an uploaded ``field_name`` stored
+    through ``replace_picture`` so it is normalised and gets its variants.
+    """
+    upload = serializer.validated_data.pop(field_name, False)
+    with transaction.atomic():
+        instance = serializer.save(**kwargs)
+        if upload is not False:
+            try:
+                replace_picture(instance, field_name, upload)
+            except DjangoValidationError as e:
+                raise serializers.ValidationError({field_name: e.messages})
+    return instance
@@ -0,0 +1,159 @@
+"""
+Content-addressed file storage.
+
+Every file saved through ``ContentAddressedStorage`` is streamed to a
+temporary file in chunks while it is hashed, then stored once as
+``blobs/<aa>/<bb>/<sha256><ext>``. Saving content that is already stored
+costs no extra disk space; it just takes another reference on the
+``Blob`` row. ``delete()`` drops a reference instead of removing the file,
+and ``collect_blobs`` later sweeps blobs nobody references any more.
+
+Files saved before this storage was introduced keep their old names and are
+deleted directly, as before.
+
+The reference is taken in the same transaction as the file lands in place,
+and the sweep removes a blob row and its file while holding the row lock,
+so a concurrent upload of the same content either keeps the blob alive or
+writes the file again.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils import timezone
+
+BLOB_PREFIX = 'blobs'
+TEMP_DIR = 'tmp'
+
+
+def hash_file(content):
+    """Return the SHA-256 hex digest of ``content``, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def blob_name(digest, ext):
+    return '/'.join([BLOB_PREFIX, digest[:2], digest[2:4], f'{digest}{ext}'])
+
+
+def is_blob(name):
+    return name.startswith(BLOB_PREFIX + '/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The stored name comes from the content, so there is nothing to avoid
+        return name
+
+    def _save(self, name, content):
+        from .models import Blob
+
+        ext = os.path.splitext(name)[1].lower()
+        temp_dir = self.path(TEMP_DIR)
+        os.makedirs(temp_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+
+            digest = digest.hexdigest()
+            name = blob_name(digest, ext)
+            path = self.path(name)
+            with transaction.atomic():
+                Blob.objects.acquire(name, digest, size)
+                if os.path.exists(path):
+                    # Already stored; refresh mtime so the orphan sweep spares it
+                    os.utime(path)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(temp_path, self.file_permissions_mode)
+                    os.replace(temp_path, path)
+                    temp_path = None
+        finally:
+            if temp_path is not None:
+                os.remove(temp_path)
+        return name
+
+    def acquire(self, name):
+        """Reference an already stored blob again; ``False`` if it is gone."""
+        from .models import Blob
+        return Blob.objects.acquire(name)
+
+    def delete(self, name):
+        from .models import Blob
+
+        if not is_blob(name):
+            return super().delete(name)
+        Blob.objects.release(name)
+
+    def collect(self, grace_seconds=None, batch_size=500):
+        """
+        Delete blobs that have been unreferenced for ``grace_seconds``, plus
+        stray files left by uploads whose transaction rolled back.
+
+        Returns the number of files and bytes removed.
+        """
+        from .models import Blob
+
+        if grace_seconds is None:
+            grace_seconds = settings.BLOB_GC_GRACE_SECONDS
+        cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+
+        removed = freed = 0
+        while True:
+            with transaction.atomic():
+                blobs = list(
+                    Blob.objects.select_for_update()
+                    .filter(refcount=0, updated_at__lt=cutoff)
+                    .order_by('updated_at')[:batch_size]
+                )
+                if not blobs:
+                    break
+                Blob.objects.filter(pk__in=[b.pk for b in blobs]).delete()
+                for blob in blobs:
+                    super().delete(blob.name)
+                    removed += 1
+                    freed += blob.size
+
+        stray_removed, stray_freed = self._collect_stray_files(time.time() - grace_seconds)
+        return removed + stray_removed, freed + stray_freed
+
+    def _collect_stray_files(self, cutoff):
+        from .models import Blob
+
+        removed = freed = 0
+        for directory in (BLOB_PREFIX, TEMP_DIR):
+            root = self.path(directory)
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    name = os.path.relpath(path, self.location).replace(os.sep, '/')
+                    # Checked under a write transaction so a concurrent _save
+                    # of the same content cannot take a reference in between
+                    with transaction.atomic():
+                        try:
+                            stat = os.stat(path)
+                        except FileNotFoundError:
+                            continue
+                        if stat.st_mtime >= cutoff:
+                            continue
+                        if directory == BLOB_PREFIX and Blob.objects.filter(name=name).exists():
+                            continue
+                        os.remove(path)
+                    removed += 1
+                    freed += stat.st_size
+        return removed, freed
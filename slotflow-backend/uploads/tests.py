@@ -0,0 +1,207 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from core.testing import make_admin, make_course, make_learner
+from courses.models import Course
+from .images import replace_picture, variant_names
+from .models import Blob
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(size=(3000, 2000), fmt='JPEG', orientation=None, name='photo.jpg', colour=(200, 120, 40)):
+    image = Image.new('RGB', size, colour)
+    exif = Image.Exif()
+    exif[0x010F] = 'CameraMaker'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    image.save(buffer, fmt, exif=exif.tobytes())
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESSING_ASYNC=False, IMAGE_MAX_DIMENSION=1200)
+class PicturePipelineTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.admin = make_admin()
+        self.course = make_course(self.admin, title='Plumbing', slots_total=4)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def upload_course_picture(self, upload, course=None):
+        course = course or self.course
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.put(
+                f'/api/courses/{course.pk}/course-picture/', {'course_picture': upload}, format='multipart'
+            )
+
+    def test_upload_is_normalised(self):
+        response = self.upload_course_picture(make_image(size=(3000, 2000), orientation=6))
+        self.assertEqual(response.status_code, 200)
+
+        self.course.refresh_from_db()
+        with Image.open(self.course.course_picture.path) as stored:
+            # Rotated upright, capped and re-encoded without EXIF
+            self.assertEqual(stored.size, (800, 1200))
+            self.assertEqual(len(stored.getexif()), 0)
+
+    def test_variants_are_generated_and_exposed(self):
+        self.upload_course_picture(make_image())
+
+        response = self.client.get(f'/api/courses/{self.course.pk}/')
+        variants = response.data['course_picture_variants']
+
+        self.assertEqual(set(variants), {'thumbnail', 'card', 'full'})
+        self.assertTrue(variants['card']['webp'].startswith('http://testserver/media/blobs/'))
+        names = Course.objects.get(pk=self.course.pk).course_picture_variants
+        with default_storage.open(names['thumbnail']['webp']) as fp, Image.open(fp) as thumbnail:
+            self.assertEqual(thumbnail.size, (160, 160))
+            self.assertEqual(thumbnail.format, 'WEBP')
+
+    def test_replacing_picture_releases_old_files(self):
+        self.upload_course_picture(make_image(name='first.jpg'))
+        old = Course.objects.get(pk=self.course.pk)
+        old_names = [old.course_picture.name] + variant_names(old.course_picture_variants)
+
+        self.upload_course_picture(make_image(name='second.jpg', colour=(10, 90, 160)))
+
+        self.assertEqual(
+            set(Blob.objects.filter(name__in=old_names).values_list('refcount', flat=True)), {0}
+        )
+        self.assertTrue(Course.objects.get(pk=self.course.pk).course_picture_variants)
+
+        default_storage.collect(grace_seconds=0)
+        for name in old_names:
+            self.assertFalse(default_storage.exists(name), name)
+
+    def test_upload_keeps_seats_claimed_since_the_course_was_read(self):
+        stale = Course.objects.get(pk=self.course.pk)
+        Course.objects.filter(pk=self.course.pk).claim_slots(2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            replace_picture(stale, 'course_picture', make_image())
+
+        self.course.refresh_from_db()
+        self.assertTrue(self.course.course_picture)
+        self.assertEqual(self.course.slots_booked, 2)
+
+    def test_invalid_and_oversized_uploads_are_rejected(self):
+        response = self.upload_course_picture(SimpleUploadedFile('notes.jpg', b'not an image'))
+        self.assertEqual(response.status_code, 400)
+
+        with self.settings(IMAGE_MAX_UPLOAD_BYTES=1024):
+            response = self.upload_course_picture(make_image())
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Course.objects.get(pk=self.course.pk).course_picture)
+
+    def test_profile_picture_variants(self):
+        learner = make_learner()
+        self.client.force_authenticate(learner)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                '/api/auth/me/profile-picture/', {'profile_picture': make_image(size=(400, 400))},
+                format='multipart'
+            )
+        self.assertEqual(response.status_code, 200)
+
+        learner.refresh_from_db()  # force_authenticate reuses this instance
+        response = self.client.get('/api/auth/me/')
+        self.assertIn('thumbnail', response.data['profile_picture_variants'])
+
+    def test_command_backfills_missing_variants(self):
+        self.course.course_picture.save('legacy.jpg', make_image(size=(800, 600)))
+        self.assertEqual(self.course.course_picture_variants, {})
+
+        out = StringIO()
+        call_command('generate_image_variants', stdout=out)
+
+        self.assertIn('Generated variants for 1 picture(s)', out.getvalue())
+        self.course.refresh_from_db()
+        self.assertEqual(set(self.course.course_picture_variants), {'thumbnail', 'card', 'full'})
+
+    def test_reupload_shares_picture_and_variants(self):
+        photo = make_image()
+        self.upload_course_picture(photo)
+        other = make_course(self.admin, title='Roofing', slots_total=4)
+        photo.seek(0)
+
+        with mock.patch('uploads.images.normalize_image') as normalize, \
+                mock.patch('uploads.images.generate_variants') as generate:
+            response = self.upload_course_picture(photo, course=other)
+        self.assertEqual(response.status_code, 200)
+        # Neither decoded nor resized again
+        normalize.assert_not_called()
+        generate.assert_not_called()
+
+        first = Course.objects.get(pk=self.course.pk)
+        other.refresh_from_db()
+        self.assertEqual(other.course_picture.name, first.course_picture.name)
+        self.assertEqual(other.course_picture_variants, first.course_picture_variants)
+        self.assertEqual(Blob.objects.get(name=first.course_picture.name).refcount, 2)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    def test_identical_content_is_stored_once(self):
+        first = default_storage.save('course_pics/a.jpg', ContentFile(b'x' * 100000))
+        second = default_storage.save('profile_pics/b.jpg', ContentFile(b'x' * 100000))
+        other = default_storage.save('course_pics/a.jpg', ContentFile(b'y' * 100000))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(first.startswith('blobs/') and first.endswith('.jpg'))
+        self.assertEqual(Blob.objects.get(name=first).refcount, 2)
+        self.assertEqual(Blob.objects.get(name=first).size, 100000)
+
+    def test_blob_is_collected_only_once_unreferenced(self):
+        name = default_storage.save('a.jpg', ContentFile(b'content'))
+        default_storage.save('b.jpg', ContentFile(b'content'))
+
+        default_storage.delete(name)
+        default_storage.collect(grace_seconds=0)
+        self.assertTrue(default_storage.exists(name))
+
+        default_storage.delete(name)
+        default_storage.collect(grace_seconds=3600)
+        self.assertTrue(default_storage.exists(name))
+
+        out = StringIO()
+        call_command('collect_blobs', grace=0, stdout=out)
+        self.assertIn('Removed 1 file(s)', out.getvalue())
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+
+    def test_stray_files_without_references_are_collected(self):
+        name = default_storage.save('a.jpg', ContentFile(b'rolled back'))
+        Blob.objects.filter(name=name).delete()  # as if the upload's transaction rolled back
+
+        default_storage.collect(grace_seconds=0)
+
+        self.assertFalse(default_storage.exists(name))
+
+    def test_legacy_files_are_deleted_directly(self):
+        legacy = os.path.join(MEDIA_ROOT, 'course_pics', 'legacy.jpg')
+        os.makedirs(os.path.dirname(legacy), exist_ok=True)
+        with open(legacy, 'wb') as f:
+            f.write(b'old')
+
+        default_storage.delete('course_pics/legacy.jpg')
+
+        self.assertFalse(os.path.exists(legacy))
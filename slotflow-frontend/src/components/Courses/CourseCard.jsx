@@ -15,13 +15,18 @@ const CourseCard = ({ course, onBook, onCancel, isBooked }) => {
     }
   };
 
-  const isFull = course.slots_booked >= course.slots_total
+  // Seats on hold during checkout count as taken
+  const isFull = course.slots_booked + (course.slots_held || 0) >= course.slots_total
   const isUpcoming = new Date(course.start_date) > new Date()
 
   return (
     <Card className="mb-4">
       {course.course_picture && (
-        <Card.Img variant="top" src={course.course_picture} />
+        <Card.Img
+          variant="top"
+          src={course.course_picture_variants?.card?.webp || course.course_picture}
+          loading="lazy"
+        />
       )}
       <Card.Body>
         <Card.Title>{course.title}</Card.Title>
@@ -68,7 +73,8 @@ const CourseCard = ({ course, onBook, onCancel, isBooked }) => {
         </div>
       </Card.Body>
       <Card.Footer className="text-muted">
-        {course.slots_booked}/{course.slots_total} slots filled • Starts: {formatDate(course.start_date)}
+        {course.slots_booked}/{course.slots_total} slots filled
+        {course.slots_held > 0 && ` (${course.slots_held} on hold)`} • Starts: {formatDate(course.start_date)}
       </Card.Footer>
     </Card>
   )
@@ -2,13 +2,18 @@ import { Card, Button, Badge, ButtonGroup } from 'react-bootstrap'
 import { Link } from 'react-router-dom'
 
 const CourseCardAdmin = ({ course, onEdit, onDelete }) => {
-  const isFull = course.slots_booked >= course.slots_total
+  const slotsTaken = course.slots_booked + (course.slots_held || 0)
+  const isFull = slotsTaken >= course.slots_total
   const isActive = course.is_active
 
   return (
     <Card className="mb-4">
       {course.course_picture && (
-        <Card.Img variant="top" src={course.course_picture} />
+        <Card.Img
+          variant="top"
+          src={course.course_picture_variants?.card?.webp || course.course_picture}
+          loading="lazy"
+        />
       )}
       <Card.Body>
         <Card.Title>{course.title}</Card.Title>
@@ -19,7 +24,7 @@ const CourseCardAdmin = ({ course, onEdit, onDelete }) => {
             {isActive ? 'Active' : 'Inactive'}
           </Badge>
           <Badge bg={isFull ? 'danger' : 'success'} className="me-2">
-            {isFull ? 'Full' : `${course.slots_total - course.slots_booked} slots available`}
+            {isFull ? 'Full' : `${course.slots_total - slotsTaken} slots available`}
           </Badge>
           <Badge bg="info" className="me-2">
             {course.duration_hours} hours
@@ -0,0 +1,19 @@
+import { Button, Spinner } from 'react-bootstrap'
+
+const LoadMoreButton = ({ hasMore, isLoading, onClick }) => {
+  if (!hasMore) return null
+
+  return (
+    <div className="text-center mb-4">
+      <Button variant="outline-primary" onClick={onClick} disabled={isLoading}>
+        {isLoading ? (
+          <Spinner as="span" animation="border" size="sm" role="status" aria-hidden="true" />
+        ) : (
+          'Load more courses'
+        )}
+      </Button>
+    </div>
+  )
+}
+
+export default LoadMoreButton
@@ -0,0 +1,54 @@
+import { useCallback, useEffect, useState } from 'react'
+import api from '../utils/api'
+
+// Loads a keyset-paginated course list (/courses/, /courses/active/, ...)
+// a page at a time: the first page on mount, then the page after the last
+// one loaded on each loadMore(). The API only hands out `next` links, so
+// there is no jumping to page N.
+export const useCoursePages = (path) => {
+  const [courses, setCourses] = useState([])
+  const [next, setNext] = useState(null)
+  const [isLoading, setIsLoading] = useState(true)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
+  const [error, setError] = useState(null)
+
+  const reload = useCallback(async () => {
+    setIsLoading(true)
+    setError(null)
+    try {
+      const response = await api.get(path)
+      setCourses(response.data.results)
+      setNext(response.data.next)
+    } catch (err) {
+      setError(err)
+    } finally {
+      setIsLoading(false)
+    }
+  }, [path])
+
+  const loadMore = async () => {
+    if (!next || isLoadingMore) return
+    setIsLoadingMore(true)
+    try {
+      // `next` is an absolute URL, which axios uses as is
+      const response = await api.get(next)
+      setCourses(prev => {
+        const loaded = new Set(prev.map(c => c.id))
+        return [...prev, ...response.data.results.filter(c => !loaded.has(c.id))]
+      })
+      setNext(response.data.next)
+    } catch (err) {
+      setError(err)
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }
+
+  useEffect(() => {
+    reload()
+  }, [reload])
+
+  return {
+    courses, setCourses, hasMore: Boolean(next), isLoading, isLoadingMore, error, reload, loadMore
+  }
+}
@@ -0,0 +1,25 @@
+import { useEffect } from 'react'
+
+const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api'
+
+// The stream only works when the backend runs under ASGI (uvicorn
+// core.asgi:application); under runserver/WSGI it answers 503. Set
+// VITE_SLOT_EVENTS=true for such deployments.
+const SLOT_EVENTS_ENABLED = import.meta.env.VITE_SLOT_EVENTS === 'true'
+
+// Streams live slot counts for the given courses (server-sent events) and
+// calls onUpdate({ id, slots_total, slots_booked, slots_held, is_full })
+// whenever one changes, instead of re-fetching the course list. Without the
+// stream, counts refresh whenever the page reloads its data, as before.
+export const useSlotUpdates = (courseIds, onUpdate) => {
+  const key = [...courseIds].sort((a, b) => a - b).join(',')
+
+  useEffect(() => {
+    if (!SLOT_EVENTS_ENABLED || !key) return undefined
+    const source = new EventSource(`${API_URL}/courses/events/?courses=${key}`)
+    source.addEventListener('slots', (event) => onUpdate(JSON.parse(event.data)))
+    return () => source.close()
+    // onUpdate is expected to be a state setter wrapper; only the ids matter
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [key])
+}
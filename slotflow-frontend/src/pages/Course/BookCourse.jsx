@@ -22,7 +22,7 @@ const BookCourse = () => {
         setIsFull(response.data.slots_booked >= response.data.slots_total)
         
         if (user?.is_learner) {
-          const bookings = await api.get('/bookings/')
+          const bookings = await api.get('/bookings/', { params: { expand: 'course' } })
           const booking = bookings.data.find(
             b => b.course.id === parseInt(id) && !b.is_cancelled
           )
@@ -41,7 +41,12 @@ const BookCourse = () => {
 
   const handleBookCourse = async () => {
     try {
-      await api.post('/bookings/', { course: id })
+      const response = await api.post('/bookings/', { course: id })
+      if (response.status === 202) {
+        // Full: the learner is queued and booked automatically when a slot frees up
+        toast.success(`Course is full, you are #${response.data.waitlist.position} on the waitlist`)
+        return
+      }
       toast.success('Course booked successfully!')
       setIsBooked(true)
       setIsFull(prev => {
@@ -57,7 +62,7 @@ const BookCourse = () => {
   const handleCancelBooking = async () => {
     if (window.confirm('Are you sure you want to cancel this booking?')) {
       try {
-        const bookings = await api.get('/bookings/')
+        const bookings = await api.get('/bookings/', { params: { expand: 'course' } })
         const booking = bookings.data.find(
           b => b.course.id === parseInt(id) && !b.is_cancelled
         )
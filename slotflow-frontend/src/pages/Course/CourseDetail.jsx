@@ -21,7 +21,7 @@ const CourseDetail = () => {
         setCourse(response.data)
         
         if (user?.is_learner) {
-          const bookings = await api.get('/bookings/')
+          const bookings = await api.get('/bookings/', { params: { expand: 'course' } })
           const booking = bookings.data.find(
             b => b.course.id === parseInt(id) && !b.is_cancelled
           )
@@ -40,7 +40,12 @@ const CourseDetail = () => {
 
   const handleBookCourse = async () => {
     try {
-      await api.post('/bookings/', { course: id })
+      const response = await api.post('/bookings/', { course: id })
+      if (response.status === 202) {
+        // Full: the learner is queued and booked automatically when a slot frees up
+        toast.success(`Course is full, you are #${response.data.waitlist.position} on the waitlist`)
+        return
+      }
       toast.success('Course booked successfully!')
       setIsBooked(true)
     } catch (error) {
@@ -51,7 +56,7 @@ const CourseDetail = () => {
   const handleCancelBooking = async () => {
     if (window.confirm('Are you sure you want to cancel this booking?')) {
       try {
-        const bookings = await api.get('/bookings/')
+        const bookings = await api.get('/bookings/', { params: { expand: 'course' } })
         const booking = bookings.data.find(
           b => b.course.id === parseInt(id) && !b.is_cancelled
         )
@@ -86,7 +91,7 @@ const CourseDetail = () => {
       
       <Card>
         {course.course_picture && (
-          <Card.Img variant="top" src={course.course_picture} style={{ maxHeight: '400px', objectFit: 'cover' }} />
+          <Card.Img variant="top" src={course.course_picture_variants?.full?.webp || course.course_picture} style={{ maxHeight: '400px', objectFit: 'cover' }} />
         )}
         <Card.Body>
           <Card.Title>{course.title}</Card.Title>
@@ -5,28 +5,20 @@ import CourseForm from '../../components/Courses/CourseForm'
 import api from '../../utils/api'
 import { toast } from 'react-toastify'
 import LoadingSpinner from '../../components/Common/LoadingSpinner'
+import LoadMoreButton from '../../components/Courses/LoadMoreButton'
+import { useCoursePages } from '../../hooks/useCoursePages'
 
 const AdminDashboard = () => {
-  const [courses, setCourses] = useState([])
+  // The catalogue is paginated; further pages load on demand
+  const {
+    courses, setCourses, hasMore, isLoading, isLoadingMore, error, loadMore
+  } = useCoursePages('/courses/')
   const [showModal, setShowModal] = useState(false)
   const [currentCourse, setCurrentCourse] = useState(null)
-  const [isLoading, setIsLoading] = useState(true)
 
   useEffect(() => {
-    fetchCourses()
-  }, [])
-
-  const fetchCourses = async () => {
-    setIsLoading(true)
-    try {
-      const response = await api.get('/courses/')
-      setCourses(response.data)
-    } catch (error) {
-      toast.error('Failed to fetch courses')
-    } finally {
-      setIsLoading(false)
-    }
-  }
+    if (error) toast.error('Failed to fetch courses')
+  }, [error])
 
   const handleCreateCourse = () => {
     setCurrentCourse(null)
@@ -110,7 +102,7 @@ const handleSubmitCourse = async (data) => {
     setCourses(prev => 
       currentCourse
         ? prev.map(c => c.id === currentCourse.id ? response.data : c)
-        : [...prev, response.data]
+        : [response.data, ...prev]
     );
     
     toast.success(`Course ${currentCourse ? 'updated' : 'created'} successfully`);
@@ -163,6 +155,9 @@ const handleSubmitCourse = async (data) => {
           ))}
         </Row>
       )}
+      {!isLoading && (
+        <LoadMoreButton hasMore={hasMore} isLoading={isLoadingMore} onClick={loadMore} />
+      )}
       
       <Modal show={showModal} onHide={() => setShowModal(false)} size="lg">
         <Modal.Header closeButton>
@@ -4,12 +4,24 @@ import CourseCard from '../../components/Courses/CourseCard';
 import api from '../../utils/api';
 import { toast } from 'react-toastify';
 import { useAuth } from '../../hooks/useAuth';
+import { useSlotUpdates } from '../../hooks/useSlotUpdates';
+import { useCoursePages } from '../../hooks/useCoursePages';
+import LoadMoreButton from '../../components/Courses/LoadMoreButton';
 
 const LearnerDashboard = () => {
   const { user, logout } = useAuth();
-  const [availableCourses, setAvailableCourses] = useState([]);
+  // The catalogue is paginated; further pages load on demand
+  const {
+    courses: availableCourses,
+    setCourses: setAvailableCourses,
+    hasMore,
+    isLoading: coursesLoading,
+    isLoadingMore,
+    error: coursesError,
+    loadMore
+  } = useCoursePages('/courses/');
   const [bookedCourses, setBookedCourses] = useState([]);
-  const [isLoading, setIsLoading] = useState(true);
+  const [bookingsLoading, setBookingsLoading] = useState(true);
   const [activeTab, setActiveTab] = useState('available');
   const [error, setError] = useState(null);
 
@@ -23,35 +35,61 @@ const LearnerDashboard = () => {
     }
   };
 
-  const fetchData = async () => {
-    setIsLoading(true);
-    setError(null);
+  const isLoading = coursesLoading || bookingsLoading;
+
+  const handleFetchError = (err) => {
+    console.error('Fetch error:', err);
+    setError('Failed to load data. Please try again.');
+
+    // Handle 401 unauthorized
+    if (err.response?.status === 401) {
+      logout();
+      toast.error('Session expired. Please log in again.');
+    }
+  };
+
+  const fetchBookings = async () => {
     try {
-      const [coursesResponse, bookingsResponse] = await Promise.all([
-        api.get('/courses/'),
-        api.get('/bookings/')
-      ]);
-      
-      setAvailableCourses(coursesResponse.data);
-      setBookedCourses(bookingsResponse.data);
+      const response = await api.get('/bookings/', { params: { expand: 'course' } });
+      setBookedCourses(response.data);
     } catch (err) {
-      console.error('Fetch error:', err);
-      setError('Failed to load data. Please try again.');
-      
-      // Handle 401 unauthorized
-      if (err.response?.status === 401) {
-        logout();
-        toast.error('Session expired. Please log in again.');
-      }
+      handleFetchError(err);
     } finally {
-      setIsLoading(false);
+      setBookingsLoading(false);
+    }
+  };
+
+  // After booking or cancelling, refresh the bookings and that one course,
+  // keeping the pages already loaded
+  const refreshCourse = async (courseId) => {
+    try {
+      const [courseResponse] = await Promise.all([
+        api.get(`/courses/${courseId}/`),
+        fetchBookings()
+      ]);
+      setAvailableCourses(courses => courses.map(
+        c => (c.id === courseId ? courseResponse.data : c)
+      ));
+    } catch (err) {
+      handleFetchError(err);
     }
   };
 
   useEffect(() => {
-    fetchData();
+    fetchBookings();
   }, []);
 
+  useEffect(() => {
+    if (coursesError) handleFetchError(coursesError);
+  }, [coursesError]);
+
+  // Keep slot counts current without polling the course list
+  useSlotUpdates(availableCourses.map(c => c.id), (slots) => {
+    setAvailableCourses(courses => courses.map(
+      c => (c.id === slots.id ? { ...c, ...slots } : c)
+    ));
+  });
+
   const handleBookCourse = async (courseId) => {
     try {
       // Check if course is already booked
@@ -70,7 +108,7 @@ const LearnerDashboard = () => {
       }
 
       await api.post('/bookings/', { course: courseId });
-      await fetchData(); // Refresh all data
+      await refreshCourse(courseId);
       toast.success('Course booked successfully!');
     } catch (err) {
       console.error('Booking error:', err);
@@ -95,7 +133,7 @@ const LearnerDashboard = () => {
       }
 
       await api.patch(`/bookings/${booking.id}/cancel/`, { confirm: true });
-      await fetchData(); // Refresh all data
+      await refreshCourse(courseId);
       toast.success('Booking cancelled successfully');
     } catch (err) {
       console.error('Cancellation error:', err);
@@ -151,6 +189,9 @@ const LearnerDashboard = () => {
       })}
     </Row>
   )}
+  {!isLoading && (
+    <LoadMoreButton hasMore={hasMore} isLoading={isLoadingMore} onClick={loadMore} />
+  )}
 </Tab>
         
 <Tab eventKey="booked" title="My Bookings">